@@ -1,56 +1,151 @@
 import eikon as ek
 import datetime
 import asyncio
+import time
+from conflation import Conflator
+from latency import LatencyRecorder, source_ns
+from log_sink import LogSink
+from quote_book import QuoteBook
+from subscription import QuoteHub
 
 class EikonStreamingPrices:
-    def __init__(self, app_key):
+    def __init__(self, app_key, sink=None, instruments=None, feed_factory=None, conflate_window=None, on_conflated=None, journal=None, shared_board=None,
+                 latency=False, latency_report_interval=None, source_ts_field='QUOTIM_MS'):
         self.app_key = app_key
-        self.instruments = ["AUD=", "EUR="]
-        self.bid_offer = {inst: [0.0, 0.0] for inst in self.instruments}
-        ek.set_app_key(self.app_key)
+        self.instruments = list(instruments) if instruments is not None else ["AUD=", "EUR="]
+        # With shared_board set, other processes can read the board via shared_board.SharedBoardReader(name)
+        self.bid_offer = QuoteBook(self.instruments, shared_name=shared_board)
+        self.sink = sink if sink is not None else LogSink()
+        # Anything with the ek.StreamingPrices constructor, e.g. feed.SimulatedFeed for offline runs
+        self.feed_factory = feed_factory if feed_factory is not None else ek.StreamingPrices
+        # Opt-in conflation: publish the latest quote per RIC once per window instead of every raw tick
+        self.on_conflated = on_conflated
+        self.conflator = Conflator(self.bid_offer, self.publish_conflated, window=conflate_window) if conflate_window else None
+        self.hub = QuoteHub()
+        # Optional tick_journal.TickJournal over self.instruments; records every tick as it lands in the book
+        self.journal = journal
+        # RIC -> bars.BarBuilder, fed from raw ticks before any conflation
+        self.bar_builders = {}
+        # Per-RIC source -> callback -> processed latency histograms; cheap enough to leave on
+        self.latency = LatencyRecorder(self.instruments) if latency else None
+        # Quote time field (ms since UTC midnight) requested alongside the prices for feed latency
+        self.source_ts_field = source_ts_field
+        if self.latency is not None and latency_report_interval:
+            self.latency.start_reporting(self.sink, latency_report_interval)
+        self.streaming_prices = None
+        self._stopped = None
+        if self.app_key:
+            ek.set_app_key(self.app_key)
 
     def display_refreshed_fields(self, streaming_price, instrument_name, fields):
         current_time = datetime.datetime.now().time()
-        print(f"{current_time} - Refresh received for {instrument_name}: {fields}")
+        self.sink.log("{} - Refresh received for {}: {}", current_time, instrument_name, fields)
         self.update_bid_offer(instrument_name, fields)
 
     def display_updated_fields(self, streaming_price, instrument_name, fields):
-        current_time = datetime.datetime.now().time()
-        print(f"{current_time} - Update received for {instrument_name}: {fields}")
-        self.update_bid_offer(instrument_name, fields)
+        entry_ns = time.time_ns() if self.latency is not None else 0
+        if self.conflator is None:
+            current_time = datetime.datetime.now().time()
+            self.sink.log("{} - Update received for {}: {}", current_time, instrument_name, fields)
+        row = self.update_bid_offer(instrument_name, fields)
+        if self.latency is not None:
+            self.latency.record(row, source_ns(fields, self.source_ts_field, entry_ns), entry_ns, time.time_ns())
 
     def display_status(self, streaming_price, instrument_name, status):
         current_time = datetime.datetime.now().time()
-        print(f"{current_time} - Status received for {instrument_name}: {status}")
+        self.sink.log("{} - Status received for {}: {}", current_time, instrument_name, status)
 
     def display_complete_snapshot(self, streaming_prices):
         current_time = datetime.datetime.now().time()
-        print(f"{current_time} - StreamingPrice is complete. Full snapshot:")
-        print(streaming_prices.get_snapshot())
+        self.sink.log("{} - StreamingPrice is complete. Full snapshot:\n{}", current_time, streaming_prices.get_snapshot())
 
     def update_bid_offer(self, instrument_name, fields):
-        bid = fields.get('CF_BID', self.bid_offer[instrument_name][0])
-        ask = fields.get('CF_ASK', self.bid_offer[instrument_name][1])
-        self.bid_offer[instrument_name] = [bid, ask]
+        row = self.bid_offer.update(instrument_name, fields.get('CF_BID'), fields.get('CF_ASK'))
+        if self.journal is not None or self.bar_builders:
+            bid, ask, ts_ns = self.bid_offer.last(row)
+            if self.journal is not None:
+                self.journal.append(ts_ns, row, bid, ask)
+            builder = self.bar_builders.get(instrument_name)
+            if builder is not None:
+                builder.on_tick(ts_ns, bid, ask)
+        if self.conflator is not None:
+            self.conflator.mark(row)
+            return row
+        if self.hub.subscribers:
+            bid, ask, ts_ns = self.bid_offer.last(row)
+            self.hub.publish(instrument_name, bid, ask, ts_ns)
         self.print_bid_offer(instrument_name)
+        return row
+
+    def publish_conflated(self, instrument_name, bid, ask, ticks):
+        self.sink.log("{}: Bid = {}, Offer = {} ({} ticks)", instrument_name, bid, ask, ticks)
+        if self.hub.subscribers:
+            _, _, ts_ns = self.bid_offer.last(self.bid_offer.index[instrument_name])
+            self.hub.publish(instrument_name, bid, ask, ts_ns, ticks)
+        if self.on_conflated is not None:
+            self.on_conflated(instrument_name, bid, ask, ticks)
+
+    def attach_bars(self, instrument_name, builder, flush_interval=1.0):
+        # The timed flush closes the last bar when ticks stop, rather than at the next tick
+        self.bar_builders[instrument_name] = builder
+        if flush_interval:
+            builder.start_flushing(flush_interval)
+        return builder
+
+    def subscribe(self, rics=None, maxsize=1000, policy='drop_oldest'):
+        # async for quote in streamer.subscribe(["AUD="]): ...  -- must be called inside the event loop
+        return self.hub.subscribe(rics, maxsize=maxsize, policy=policy)
 
     def print_bid_offer(self, instrument_name):
         bid, ask = self.bid_offer[instrument_name]
-        print(f"{instrument_name}: Bid = {bid}, Offer = {ask}")
+        self.sink.log("{}: Bid = {}, Offer = {}", instrument_name, bid, ask)
 
-    def start_streaming(self):
-        streaming_prices = ek.StreamingPrices(
+    def fields(self, price_fields):
+        if self.latency is not None and self.source_ts_field:
+            return price_fields + [self.source_ts_field]
+        return price_fields
+
+    def open_stream(self):
+        self.streaming_prices = self.feed_factory(
             instruments=self.instruments,
-            fields=['CF_BID', 'CF_ASK'],
+            fields=self.fields(['CF_BID', 'CF_ASK']),
             on_refresh=self.display_refreshed_fields,
             on_update=self.display_updated_fields,
             on_status=self.display_status,
             on_complete=self.display_complete_snapshot
         )
-        streaming_prices.open()
+        self.streaming_prices.open()
+        return self.streaming_prices
+
+    async def run_async(self):
+        # Streams until stop() is called; subscribers, risk and order logic share this event loop
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._loop = loop
+        self.open_stream()
+        try:
+            await self._stopped.wait()
+        finally:
+            # Close subscribers first so a feed thread blocked on a full 'block' subscriber can exit
+            self.hub.close()
+            self.streaming_prices.close()
+            if self.conflator is not None:
+                self.conflator.stop()
+            if self.journal is not None:
+                self.journal.close()
+            for builder in self.bar_builders.values():
+                builder.stop_flushing()
+            if self.latency is not None:
+                self.latency.stop_reporting()
+            self.bid_offer.close()
 
+    def stop(self):
+        if self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    def start_streaming(self):
         # Keep the script running to receive streaming updates
-        asyncio.get_event_loop().run_forever()
+        asyncio.get_event_loop().run_until_complete(self.run_async())
 
 # Usage example
 if __name__ == "__main__":
@@ -1,43 +1,167 @@
 import eikon as ek
+import asyncio
 import time
+from conflation import Conflator
+from latency import LatencyRecorder, source_ns
+from log_sink import LogSink
+from quote_book import QuoteBook
+from subscription import QuoteHub
 
 class pricing:
-    def __init__(self):
-        self.major_ccys = ["AUDUSD", "EURUSD", "GBPUSD", "USDJPY", "NZDUSD", "USDCAD", "USDCHF", "USDSGD", "USDNOK"]
-        self.bid_offer = {k: [0.0, 0.0] for k in self.major_ccys}
+    def __init__(self, ccys=None, shared_board=None):
+        self.major_ccys = list(ccys) if ccys is not None else ["AUDUSD", "EURUSD", "GBPUSD", "USDJPY", "NZDUSD", "USDCAD", "USDCHF", "USDSGD", "USDNOK"]
+        # With shared_board set, other processes (e.g. the dashboard) can read live prices by name
+        self.bid_offer = QuoteBook(self.major_ccys, shared_name=shared_board)
 
 class eikon_pricing:
-    def __init__(self, pricing_obj, app_key):
+    def __init__(self, pricing_obj, app_key, sink=None, conflate_window=None, on_conflated=None, journal=None,
+                 latency=False, latency_report_interval=None, source_ts_field='QUOTIM_MS'):
         self.pricing_obj = pricing_obj
         self.ccys = self.pricing_obj.major_ccys
         self.app_key = app_key
+        self.sink = sink if sink is not None else LogSink()
+        self.on_conflated = on_conflated
+        self.conflator = Conflator(self.pricing_obj.bid_offer, self.publish_conflated, window=conflate_window) if conflate_window else None
+        self.hub = QuoteHub()
+        # Optional tick_journal.TickJournal over pricing_obj.major_ccys
+        self.journal = journal
+        # ccy -> bars.BarBuilder, fed from raw ticks before any conflation
+        self.bar_builders = {}
+        # Per-ccy source -> callback -> processed latency histograms; cheap enough to leave on
+        self.latency = LatencyRecorder(self.ccys) if latency else None
+        # Quote time field (ms since UTC midnight) requested alongside the prices for feed latency
+        self.source_ts_field = source_ts_field
+        if self.latency is not None and latency_report_interval:
+            self.latency.start_reporting(self.sink, latency_report_interval)
+        self.feed = None
+        self._stopped = None
 
     def create_rics(self):
         self.rics = [f"{ccy[:3]}{ccy[3:]}=R" for ccy in self.ccys]
 
     def on_update(self, upd):
+        entry_ns = time.time_ns() if self.latency is not None else 0
         try:
-            ric = upd['ric']
-            ccy = ric[:6]
-            self.pricing_obj.bid_offer[ccy][0] = upd['BID']
-            self.pricing_obj.bid_offer[ccy][1] = upd['ASK']
-            print(f"{ccy}: Bid - {self.pricing_obj.bid_offer[ccy][0]}, Offer - {self.pricing_obj.bid_offer[ccy][1]}")
+            row = self.handle_quote(upd['ric'], upd.get('BID'), upd.get('ASK'))
+            if self.latency is not None:
+                self.latency.record(row, source_ns(upd, self.source_ts_field, entry_ns), entry_ns, time.time_ns())
         except Exception as e:
-            print(f"Error processing update: {e}")
+            self.sink.log("Error processing update: {}", e)
 
-    def run(self):
-        ek.set_app_key(self.app_key)
+    def on_feed_update(self, streaming_price, instrument_name, fields):
+        # Per-instrument callback signature used by ek.StreamingPrices and feed.SimulatedFeed
+        entry_ns = time.time_ns() if self.latency is not None else 0
+        try:
+            row = self.handle_quote(instrument_name, fields.get('BID'), fields.get('ASK'))
+            if self.latency is not None:
+                self.latency.record(row, source_ns(fields, self.source_ts_field, entry_ns), entry_ns, time.time_ns())
+        except Exception as e:
+            self.sink.log("Error processing update: {}", e)
+
+    def handle_quote(self, ric, bid, ask):
+        ccy = ric[:6]
+        row = self.pricing_obj.bid_offer.update(ccy, bid, ask)
+        if self.journal is not None or self.bar_builders:
+            # The update may carry only one side (the other is None); the book holds both
+            bid, ask, ts_ns = self.pricing_obj.bid_offer.last(row)
+            if self.journal is not None:
+                self.journal.append(ts_ns, row, bid, ask)
+            builder = self.bar_builders.get(ccy)
+            if builder is not None:
+                builder.on_tick(ts_ns, bid, ask)
+        if self.conflator is not None:
+            self.conflator.mark(row)
+            return row
+        # Subscribers and the log get the book's merged quote, not the update's possibly one-sided fields
+        bid, ask, ts_ns = self.pricing_obj.bid_offer.last(row)
+        if self.hub.subscribers:
+            self.hub.publish(ccy, bid, ask, ts_ns)
+        self.sink.log("{}: Bid - {}, Offer - {}", ccy, bid, ask)
+        return row
+
+    def publish_conflated(self, ccy, bid, ask, ticks):
+        self.sink.log("{}: Bid - {}, Offer - {} ({} ticks)", ccy, bid, ask, ticks)
+        if self.hub.subscribers:
+            book = self.pricing_obj.bid_offer
+            _, _, ts_ns = book.last(book.index[ccy])
+            self.hub.publish(ccy, bid, ask, ts_ns, ticks)
+        if self.on_conflated is not None:
+            self.on_conflated(ccy, bid, ask, ticks)
+
+    def attach_bars(self, ccy, builder, flush_interval=1.0):
+        # The timed flush closes the last bar when ticks stop, rather than at the next tick
+        self.bar_builders[ccy[:6]] = builder
+        if flush_interval:
+            builder.start_flushing(flush_interval)
+        return builder
+
+    def subscribe(self, rics=None, maxsize=1000, policy='drop_oldest'):
+        # Quotes are keyed by ccy, so "AUDUSD=R" and "AUDUSD" subscribe to the same stream
+        ccys = None if rics is None else [ric[:6] for ric in rics]
+        return self.hub.subscribe(ccys, maxsize=maxsize, policy=policy)
+
+    def fields(self, price_fields):
+        if self.latency is not None and self.source_ts_field:
+            return price_fields + [self.source_ts_field]
+        return price_fields
+
+    def open_feed(self, feed_factory):
+        feed = feed_factory(instruments=self.rics, fields=self.fields(['BID', 'ASK']),
+                            on_refresh=self.on_feed_update, on_update=self.on_feed_update)
+        feed.open()
+        return feed
+
+    async def run_async(self, feed_factory=None):
+        if self.app_key:
+            ek.set_app_key(self.app_key)
 
         self.create_rics()
-        print("Created list of RICs")
+        self.sink.log("Created list of RICs")
 
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
         try:
-            ek.streaming.StreamingPrices(self.on_update, self.rics, ['BID', 'ASK'])
-            time.sleep(1)  # Delay to ensure connection before checking for updates
-            while True:
-                time.sleep(1)  # Keep the script running to receive updates
+            if feed_factory is not None:
+                self.feed = self.open_feed(feed_factory)
+            else:
+                self.feed = ek.streaming.StreamingPrices(self.on_update, self.rics, self.fields(['BID', 'ASK']))
+            # Park on an event instead of a sleep loop; stop() or task cancellation ends the run
+            await self._stopped.wait()
         except ek.EikonError as e:
-            print(f"Eikon Error: {e}")
+            self.sink.log("Eikon Error: {}", e)
+        finally:
+            # Close subscribers first so a feed thread blocked on a full 'block' subscriber can exit
+            self.hub.close()
+            if self.feed is not None and hasattr(self.feed, 'close'):
+                self.feed.close()
+            if self.conflator is not None:
+                self.conflator.stop()
+            if self.journal is not None:
+                self.journal.close()
+            for builder in self.bar_builders.values():
+                builder.stop_flushing()
+            if self.latency is not None:
+                self.latency.stop_reporting()
+            self.pricing_obj.bid_offer.close()
+
+    def stop(self):
+        if self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    def run_sharded(self, n_workers=4, feed_factory=None, rebalance_interval=5.0):
+        # Splits self.rics across worker processes that write straight into the shared quote book;
+        # needs pricing(shared_board=...) so the workers have a board to attach to
+        from sharding import ShardedPricer
+        self.create_rics()
+        book = self.pricing_obj.bid_offer
+        sharded = ShardedPricer(book, self.rics, rows=[book.index[ric[:6]] for ric in self.rics],
+                                n_workers=n_workers, feed_factory=feed_factory, app_key=self.app_key, sink=self.sink)
+        sharded.start(rebalance_interval=rebalance_interval)
+        self.sink.log("Started {} pricing shards for {} RICs", n_workers, len(self.rics))
+        return sharded
+
+    def run(self, feed_factory=None):
+        asyncio.run(self.run_async(feed_factory))
 
 def main():
     pricing_obj = pricing()
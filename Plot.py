@@ -1,12 +1,46 @@
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from decimate import SERIES_CACHE
+
+
+def _level_segments(df, column, left_bars, right_bars):
+    # One row per pivot: its level and the bars from left_bars before to right_bars after it
+    values = df[column].to_numpy(dtype=float)
+    positions = np.flatnonzero(~np.isnan(values))
+    return values[positions], df.index[positions - left_bars], df.index[positions + right_bars]
+
+
+def _confluence_segments(levels, min_count):
+    # Levels confirmed often enough, with their first time and a width scaled by the count
+    if hasattr(levels, 'confluent'):
+        prices, counts, times = levels.confluent(min_count)
+        return tuple(prices), tuple(times), tuple(0.5 * counts)
+    kept = [(level, details['time'], 0.5 * details['count']) for level, details in levels.items()
+            if details['count'] >= min_count]
+    return tuple(zip(*kept)) if kept else ((), (), ())
+
+
 class PositionManager:
     # Existing methods...
 
-    def plot_trades(self, show_position_size=False, plot_levels=True):
+    def plot_trades(self, show_position_size=False, plot_levels=True, decimate=None):
+        # decimate='minmax' or 'lttb' plots about one bucket per pixel column instead of every bar,
+        # keeping the bars trades happened on; zooming re-decimates the visible window
         df = self.srf.df
 
         fig, ax1 = plt.subplots(figsize=(20, 10))
+        width = int(fig.get_figwidth() * fig.dpi)
+        trade_times = pd.DatetimeIndex(self.trade_history['datetime']).sort_values()
 
-        ax1.plot(df['Close'], label='Close Price', color='black')
+        # One Close series object for the plot and every zoom, so the cache hashes its values once
+        close_prices = df['Close']
+        close = close_prices
+        if decimate:
+            close = SERIES_CACHE.decimate(close_prices, width, name='Close', method=decimate, keep=trade_times)
+        close_line, = ax1.plot(close, label='Close Price', color='black')
         ax1.set_xlabel('Time')
         ax1.set_ylabel('Price', color='black')
         ax1.tick_params(axis='y', labelcolor='black')
@@ -15,20 +49,31 @@ class PositionManager:
         ax2.set_ylabel('Cumulative PnL', color='blue')
         ax2.tick_params(axis='y', labelcolor='blue')
 
-        labels = []
-
-        for i, trade in self.trade_history.iterrows():
-            color = 'g' if trade['direction'] == 'long' else 'r'
-            marker = '^' if trade['action'] == 'open' else 'v'
-            label = f"{trade['direction'].capitalize()} {'Open' if trade['action'] == 'open' else 'Close'}"
-            if label not in labels:
-                labels.append(label)
-                ax1.scatter(trade['datetime'], trade['entry_price'], color=color, marker=marker, label=label)
-            else:
-                ax1.scatter(trade['datetime'], trade['entry_price'], color=color, marker=marker)
+        # One scatter per direction/action, in order of first appearance so the legend reads as before
+        history = self.trade_history
+        categories = history['direction'] + '/' + history['action']
+        for category in pd.unique(categories):
+            direction, action = category.split('/')
+            rows = history[categories == category]
+            label = f"{direction.capitalize()} {'Open' if action == 'open' else 'Close'}"
+            ax1.scatter(rows['datetime'], rows['entry_price'], color='g' if direction == 'long' else 'r',
+                        marker='^' if action == 'open' else 'v', label=label)
 
         self.trade_history['cumulative_pnl'] = self.trade_history['realized_pnl'].cumsum()
-        ax2.plot(self.trade_history['datetime'], self.trade_history['cumulative_pnl'], label='Cumulative PnL', color='blue')
+        cumulative_pnl = pd.Series(self.trade_history['cumulative_pnl'].to_numpy(), index=pd.DatetimeIndex(self.trade_history['datetime']))
+        if decimate:
+            cumulative_pnl = SERIES_CACHE.decimate(cumulative_pnl, width, name='cumulative_pnl', method=decimate)
+        ax2.plot(cumulative_pnl.index, cumulative_pnl.to_numpy(), label='Cumulative PnL', color='blue')
+
+        if decimate:
+            def redecimate(ax):
+                start, end = (pd.Timestamp(mdates.num2date(limit)) for limit in ax.get_xlim())
+                if df.index.tz is None:
+                    start, end = start.tz_localize(None), end.tz_localize(None)
+                window = SERIES_CACHE.decimate(close_prices, width, name='Close', start=start, end=end,
+                                               method=decimate, keep=trade_times)
+                close_line.set_data(window.index, window.to_numpy())
+            ax1.callbacks.connect('xlim_changed', redecimate)
 
         lines1, labels1 = ax1.get_legend_handles_labels()
         lines2, labels2 = ax2.get_legend_handles_labels()
@@ -42,27 +87,18 @@ class PositionManager:
         plt.title('Trade Plotting')
 
         if plot_levels:
-            # Integrate level plotting logic
-            pivot_high_label, pivot_low_label = True, True
-            for i in range(len(df)):
-                if not np.isnan(df['pivot_high'].iloc[i]):
-                    ax1.hlines(y=df['pivot_high'].iloc[i], xmin=df.index[i - self.srf.left_bars], xmax=df.index[i + self.srf.right_bars], color='red', linestyle='--', linewidth=0.8, alpha=0.7, label='Pivot High' if pivot_high_label else "")
-                    pivot_high_label = False
-                if not np.isnan(df['pivot_low'].iloc[i]):
-                    ax1.hlines(y=df['pivot_low'].iloc[i], xmin=df.index[i - self.srf.left_bars], xmax=df.index[i + self.srf.right_bars], color='blue', linestyle='--', linewidth=0.8, alpha=0.7, label='Pivot Low' if pivot_low_label else "")
-                    pivot_low_label = False
+            # Integrate level plotting logic: each kind of level is one LineCollection
+            for column, color, label in (('pivot_high', 'red', 'Pivot High'), ('pivot_low', 'blue', 'Pivot Low')):
+                levels, xmin, xmax = _level_segments(df, column, self.srf.left_bars, self.srf.right_bars)
+                if len(levels):
+                    ax1.hlines(y=levels, xmin=xmin, xmax=xmax, color=color, linestyle='--', linewidth=0.8, alpha=0.7, label=label)
 
             # Plot confluence levels
-            confluence_support_label = True
-            for level, details in self.srf.support_levels.items():
-                if details['count'] >= self.srf.min_confluence_count:
-                    ax1.hlines(y=level, xmin=details['time'], xmax=df.index[-1], color='green', linestyle='-', linewidth=0.5 * details['count'], alpha=0.8, label='Confluence Support' if confluence_support_label else "")
-                    confluence_support_label = False
-            confluence_resistance_label = True
-            for level, details in self.srf.resistance_levels.items():
-                if details['count'] >= self.srf.min_confluence_count:
-                    ax1.hlines(y=level, xmin=details['time'], xmax=df.index[-1], color='red', linestyle='-', linewidth=0.5 * details['count'], alpha=0.8, label='Confluence Resistance' if confluence_resistance_label else "")
-                    confluence_resistance_label = False
+            for levels, color, label in ((self.srf.support_levels, 'green', 'Confluence Support'),
+                                         (self.srf.resistance_levels, 'red', 'Confluence Resistance')):
+                y, xmin, widths = _confluence_segments(levels, self.srf.min_confluence_count)
+                if y:
+                    ax1.hlines(y=list(y), xmin=list(xmin), xmax=df.index[-1], color=color, linestyle='-', linewidth=list(widths), alpha=0.8, label=label)
 
         if show_position_size:
             # Create another subplot for showing position sizes
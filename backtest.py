@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+import pnl_engine
+from marks import pair_spec
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+OPEN, CLOSE = 0, 1
+
+
+def _simulate(signal, stop, target, high, low, fill):
+    # The one path-dependent part: whether a bar's signal opens a trade depends on the position
+    # left by every earlier bar. Plain scalar loop over bars, compiled when numba is installed.
+    n = len(signal)
+    event_bar = np.empty(2 * n, dtype=np.int64)
+    event_direction = np.empty(2 * n, dtype=np.int64)
+    event_action = np.empty(2 * n, dtype=np.int64)
+    event_price = np.empty(2 * n, dtype=np.float64)
+    count = 0
+    position = 0
+    entry_bar = -1
+    stop_level = np.nan
+    target_level = np.nan
+    for i in range(n):
+        if position != 0 and i > entry_bar:
+            exit_price = np.nan
+            # Both levels inside one bar: assume the stop went first
+            if position > 0:
+                if low[i] <= stop_level:
+                    exit_price = stop_level
+                elif high[i] >= target_level:
+                    exit_price = target_level
+            else:
+                if high[i] >= stop_level:
+                    exit_price = stop_level
+                elif low[i] <= target_level:
+                    exit_price = target_level
+            if not np.isnan(exit_price):
+                event_bar[count] = i
+                event_direction[count] = position
+                event_action[count] = CLOSE
+                event_price[count] = exit_price
+                count += 1
+                position = 0
+        wanted = signal[i]
+        if wanted != 0 and wanted != position and not np.isnan(fill[i]):
+            if position != 0:
+                # An opposite signal closes the position and reverses at the same fill
+                event_bar[count] = i
+                event_direction[count] = position
+                event_action[count] = CLOSE
+                event_price[count] = fill[i]
+                count += 1
+            position = wanted
+            entry_bar = i
+            stop_level = stop[i]
+            target_level = target[i]
+            event_bar[count] = i
+            event_direction[count] = position
+            event_action[count] = OPEN
+            event_price[count] = fill[i]
+            count += 1
+    return event_bar[:count], event_direction[:count], event_action[:count], event_price[:count]
+
+
+if njit is not None:
+    _simulate = njit(cache=True)(_simulate)
+
+
+def _levels(values, n):
+    if values is None:
+        return np.full(n, np.nan)
+    return np.broadcast_to(np.asarray(values, dtype=float), (n,)).copy()
+
+
+def run_backtest(df, signal, stop=None, target=None, size=1.0, pair=None, pip_value=None, fill='close'):
+    """Backtests bar signals over df (Open/High/Low/Close) in one pass.
+
+    `signal` holds +1 (go long), -1 (go short) or 0 per bar. A signal in the direction
+    already held is ignored; an opposite one closes the position and reverses. `stop` and
+    `target` are price levels per bar (NaN for none), fixed at the entry bar and checked
+    from the next bar on against its Low/High; when one bar reaches both, the stop is
+    taken. Entries fill at the signal bar's Close, or the next bar's Open with
+    fill='next_open'. A position still open at the end stays open.
+
+    `size` is in millions of the base currency. PnL uses the pair's pips (pair_spec, so JPY
+    quotes get 100 pips per unit) and `pip_value` USD per pip per million, $100 by default.
+
+    Returns (trade_history, position_timeline) in PositionManager's layout: a DataFrame of
+    datetime, direction ('long'/'short'), action ('open'/'close'), entry_price (the fill
+    price of that row) and realized_pnl (0 on opens), and a list of (datetime, position_size)
+    after each fill.
+    """
+    n = len(df)
+    signal = np.sign(np.nan_to_num(np.asarray(signal, dtype=float))).astype(np.int64)
+    stop, target = _levels(stop, n), _levels(target, n)
+    if fill == 'next_open':
+        # Act on each bar's signal one bar later, at that bar's Open
+        signal = np.r_[0, signal[:-1]]
+        stop, target = np.r_[np.nan, stop[:-1]], np.r_[np.nan, target[:-1]]
+        fill_price = df['Open'].to_numpy(dtype=float)
+    else:
+        fill_price = df['Close'].to_numpy(dtype=float)
+    bars, directions, actions, prices = _simulate(
+        signal, stop, target, df['High'].to_numpy(dtype=float), df['Low'].to_numpy(dtype=float), fill_price)
+
+    sizes = _levels(size, n)[bars]
+    # Every close follows the open it ends, so the entry of a close is the previous event's price
+    # and its size the previous event's size
+    closes = actions == CLOSE
+    entry_of = np.r_[np.nan, prices[:-1]]
+    size_of = np.r_[np.nan, sizes[:-1]]
+    pips_per_unit = pair_spec(pair).pips_per_unit if pair is not None else pnl_engine.PIP_MULTIPLIER
+    realized = np.where(closes, pnl_engine.pnl(entry_of, prices, directions, size_of, pips_per_unit,
+                                               pip_value if pip_value is not None else pnl_engine.DOLLARS_PER_PIP_PER_MILLION), 0.0)
+
+    times = df.index[bars]
+    trade_history = pd.DataFrame({
+        'datetime': times,
+        'direction': np.where(directions > 0, 'long', 'short'),
+        'action': np.where(closes, 'close', 'open'),
+        'entry_price': prices,
+        'realized_pnl': realized,
+    })
+    # Position after each fill: +size on a long open, 0 after any close
+    position_size = np.where(closes, 0.0, directions * sizes)
+    position_timeline = list(zip(times, position_size.tolist()))
+    return trade_history, position_timeline
+
+
+def apply_backtest(position_manager, signal, stop=None, target=None, **kwargs):
+    """Runs run_backtest over position_manager.srf.df and stores the results where plot_trades reads them."""
+    position_manager.trade_history, position_manager.position_timeline = run_backtest(
+        position_manager.srf.df, signal, stop, target, **kwargs)
+    return position_manager
@@ -0,0 +1,195 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+BAR_DTYPE = np.dtype([
+    ('start_ns', 'i8'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('ticks', 'i8'),
+    ('spread_mean', 'f8'),
+    ('spread_max', 'f8'),
+])
+
+
+class _IntervalState:
+    __slots__ = ('name', 'width', 'start', 'open', 'high', 'low', 'close', 'ticks',
+                 'spread_sum', 'spread_max', 'ring', 'head', 'count', 'reopened')
+
+    def __init__(self, name, capacity):
+        self.name = name
+        self.width = pd.Timedelta(name).value
+        self.start = -1
+        self.ticks = 0
+        self.ring = np.zeros(capacity, dtype=BAR_DTYPE)
+        self.head = 0
+        self.count = 0
+        self.reopened = False
+
+
+class BarBuilder:
+    """Builds OHLC bars for one instrument at several intervals at once from raw ticks.
+
+    The open bar of each interval is a handful of Python floats; a closed bar is written
+    into a fixed-size ring buffer and handed to subscribers as subscriber(interval, bar).
+    A bar closes when the first tick of a later bucket arrives, or on `flush`;
+    `start_flushing` does that on a timer so the last bar closes in a quiet market too.
+    A tick that still lands in a bar closed by a flush reopens it with everything it had,
+    and the bar is reissued in its ring slot, so a bucket is never split into two bars.
+    """
+
+    def __init__(self, intervals=('1s', '1min', '5min'), capacity=10_000):
+        self.states = [_IntervalState(name, capacity) for name in intervals]
+        self._by_name = {state.name: state for state in self.states}
+        self.subscribers = []
+        # Ticks arrive on the feed thread, timed flushes on the flusher
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._flusher = None
+
+    def subscribe(self, callback, interval=None):
+        self.subscribers.append((interval, callback))
+
+    def on_tick(self, ts_ns, bid, ask):
+        price = (bid + ask) * 0.5
+        spread = ask - bid
+        with self._lock:
+            for state in self.states:
+                start = ts_ns - ts_ns % state.width
+                if start != state.start:
+                    if state.ticks:
+                        self._close(state)
+                    state.start = start
+                    state.open = state.high = state.low = state.close = price
+                    state.ticks = 1
+                    state.spread_sum = state.spread_max = spread
+                    continue
+                if not state.ticks:
+                    # The bar was closed by a flush; its open/high/low/spreads are still in the state
+                    state.ticks = int(state.ring[state.head - 1]['ticks'])
+                    state.reopened = True
+                if price > state.high:
+                    state.high = price
+                elif price < state.low:
+                    state.low = price
+                state.close = price
+                state.ticks += 1
+                state.spread_sum += spread
+                if spread > state.spread_max:
+                    state.spread_max = spread
+
+    def _close(self, state):
+        ring = state.ring
+        if state.reopened:
+            slot = (state.head - 1) % len(ring)
+            state.reopened = False
+        else:
+            slot = state.head
+            state.head = (slot + 1) % len(ring)
+            state.count = min(state.count + 1, len(ring))
+        ring[slot] = (state.start, state.open, state.high, state.low, state.close, state.ticks,
+                      state.spread_sum / state.ticks, state.spread_max)
+        state.ticks = 0
+        bar = ring[slot]
+        for interval, callback in self.subscribers:
+            if interval is None or interval == state.name:
+                callback(state.name, bar)
+
+    def flush(self, now_ns=None):
+        # Close open bars whose bucket has ended by now_ns (all open bars if now_ns is None),
+        # then let buffering subscribers (those with a flush method, e.g. FrameAppender) catch up
+        with self._lock:
+            for state in self.states:
+                if state.ticks and (now_ns is None or now_ns >= state.start + state.width):
+                    self._close(state)
+            for _, callback in self.subscribers:
+                if hasattr(callback, 'flush'):
+                    callback.flush()
+
+    def _flush_loop(self, interval):
+        while not self._stop.wait(interval):
+            self.flush(time.time_ns())
+
+    def start_flushing(self, interval=1.0):
+        """Closes ended bars every `interval` seconds of wall-clock time on a background thread."""
+        if self._flusher is None:
+            self._stop.clear()
+            self._flusher = threading.Thread(target=self._flush_loop, args=(interval,), name='BarFlusher', daemon=True)
+            self._flusher.start()
+
+    def stop_flushing(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+
+    def bars(self, interval):
+        state = self._by_name[interval]
+        if state.count < len(state.ring):
+            return state.ring[:state.count].copy()
+        return np.roll(state.ring, -state.head)
+
+    def to_frame(self, interval):
+        bars = self.bars(interval)
+        return pd.DataFrame({
+            'Open': bars['open'],
+            'High': bars['high'],
+            'Low': bars['low'],
+            'Close': bars['close'],
+            'Ticks': bars['ticks'],
+            'SpreadMean': bars['spread_mean'],
+            'SpreadMax': bars['spread_max'],
+        }, index=pd.DatetimeIndex(bars['start_ns'].view('datetime64[ns]'), name='datetime'))
+
+
+class FrameAppender:
+    """Subscriber that appends closed bars of one interval to `srf.df`.
+
+    Only final bars are appended: the newest bar can still be reissued (see BarBuilder),
+    so it is held back until a bar with a later start closes, and rows in the frame never
+    change after `on_append` has seen them. Final bars are buffered and appended
+    `batch_size` at a time with one concat, since growing a DataFrame copies it; `flush`
+    (called by BarBuilder.flush and its timer) appends a partial batch.
+    `on_append(srf, timestamp)` is called after each append with the newest bar's
+    timestamp so level logic, e.g. pivots.PivotTracker, can update from the new rows.
+    """
+
+    def __init__(self, srf, interval, on_append=None, batch_size=16):
+        self.srf = srf
+        self.interval = interval
+        self.on_append = on_append
+        self.batch_size = batch_size
+        self._pending = []
+        self._held = None
+
+    def __call__(self, interval, bar):
+        if interval != self.interval:
+            return
+        row = (int(bar['start_ns']), float(bar['open']), float(bar['high']), float(bar['low']), float(bar['close']))
+        # A reissue of the held bar replaces it; a later bar makes it final
+        if self._held is not None and self._held[0] != row[0]:
+            self._pending.append(self._held)
+        self._held = row
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        starts, opens, highs, lows, closes = zip(*pending)
+        df = self.srf.df
+        index = pd.DatetimeIndex(np.array(starts, dtype='datetime64[ns]'), name=df.index.name)
+        if df.index.tz is not None:
+            index = index.tz_localize('UTC').tz_convert(df.index.tz)
+        rows = pd.DataFrame({'Open': opens, 'High': highs, 'Low': lows, 'Close': closes}, index=index)
+        self.srf.df = pd.concat([df, rows]) if len(df) else rows.reindex(columns=df.columns.union(rows.columns, sort=False))
+        if self.on_append is not None:
+            self.on_append(self.srf, index[-1])
+
+    def attach(self, builder):
+        builder.subscribe(self, self.interval)
+        return self
@@ -0,0 +1,69 @@
+import threading
+import numpy as np
+
+
+class Conflator:
+    """Merges raw ticks per instrument and publishes only the latest quote once per window.
+
+    The QuoteBook already holds the latest bid/ask, so a tick only flags its row as dirty
+    and bumps a collapsed-tick counter. Every `window` seconds (or 1/`frequency`) the dirty
+    rows are published as publish(instrument_name, bid, ask, ticks).
+    """
+
+    def __init__(self, book, publish, window=0.05, frequency=None, start=True):
+        self.book = book
+        self.publish = publish
+        self.window = 1.0 / frequency if frequency else window
+        self.dirty = np.zeros(len(book), dtype=bool)
+        self.ticks = np.zeros(len(book), dtype=np.int64)
+        self.raw_ticks = 0
+        self.published = 0
+        # mark() and flush() run on different threads; += on a NumPy cell is a read-modify-write
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if start:
+            self.start()
+
+    def mark(self, row):
+        with self._lock:
+            self.dirty[row] = True
+            self.ticks[row] += 1
+
+    def flush(self):
+        with self._lock:
+            rows = np.flatnonzero(self.dirty)
+            if not len(rows):
+                return 0
+            # Clear the flags before reading the book so a tick landing mid-flush is republished next window
+            self.dirty[rows] = False
+            ticks = self.ticks[rows]
+            self.ticks[rows] = 0
+        quotes = self.book.view()[rows]
+        instruments = self.book.instruments
+        for row, bid, ask, n in zip(rows.tolist(), quotes['bid'].tolist(), quotes['ask'].tolist(), ticks.tolist()):
+            self.publish(instruments[row], bid, ask, n)
+        self.raw_ticks += int(ticks.sum())
+        self.published += len(rows)
+        return len(rows)
+
+    def _run(self):
+        while not self._stop.wait(self.window):
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='Conflator', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        # Publish whatever arrived since the last window so the final state is never lost
+        self.flush()
+
+    def ratio(self):
+        return self.raw_ticks / self.published if self.published else 0.0
@@ -1,78 +1,303 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-from datetime import datetime, date
-import json
+import contextlib
+import os
 import uuid
+import pnl_engine
+import trade_io
+from marks import BoardMarks, ManualMarks, MarkTable, SimulatedMarks
+from risk import RiskEngine
+from shared_board import SharedBoardReader
+from shared_book import ConflictError, SharedBook
+from trade_db import TradeDB
+from trade_io import BookReader
+
+# Constants
+CURRENCY_PAIRS = ['AUDUSD', 'EURUSD', 'GBPUSD', 'USDCAD', 'USDJPY', 'USDCHF', 'NZDUSD', 'EURGBP', 'EURJPY', 'GBPJPY']
+POSITION_TYPES = ['Long', 'Short']
+
+# Trade book persistence: one SQLite connection and one in-memory book per server process,
+# shared by every session
+TRADE_DB_PATH = os.environ.get('TRADE_DB_PATH', 'trade_book.db')
+CLOSED_PAGE_SIZE = 20
+GROUPS_PER_PAGE = 10
+SUMMARY_PAGE_SIZE = 500
+BOOK_POLL_SECONDS = 2.0
+
+@st.cache_resource
+def get_shared_book(path):
+    return SharedBook(TradeDB(path), pairs=CURRENCY_PAIRS)
+
+book = get_shared_book(TRADE_DB_PATH)
+db = book.db
+book.poll_db()
+# This run renders the book at one version; every later read checks it is still there (see `consistent`)
+with book.read() as rendered_version:
+    store = book.store
+# Writes from this run's widgets are checked against the book version they were rendered from
+seen_version = st.session_state.get('book_version', rendered_version)
+st.session_state.book_version = rendered_version
 
 # Initialize session state
-if 'trade_groups' not in st.session_state:
-    st.session_state.trade_groups = []
-if 'current_market_price' not in st.session_state:
-    st.session_state.current_market_price = 0.6650
 if 'strategy_notes' not in st.session_state:
-    st.session_state.strategy_notes = ''
+    st.session_state.strategy_notes = db.get_setting('strategy_notes', '')
 if 'default_tp_pips' not in st.session_state:
-    st.session_state.default_tp_pips = 20
+    st.session_state.default_tp_pips = db.get_setting('default_tp_pips', 20)
 if 'default_sl_pips' not in st.session_state:
-    st.session_state.default_sl_pips = 20
+    st.session_state.default_sl_pips = db.get_setting('default_sl_pips', 20)
+if 'live_board' not in st.session_state:
+    st.session_state.live_board = ''
 
-# Constants
-CURRENCY_PAIRS = ['AUDUSD', 'EURUSD', 'GBPUSD', 'USDCAD', 'USDJPY', 'USDCHF', 'NZDUSD', 'EURGBP', 'EURJPY', 'GBPJPY']
-POSITION_TYPES = ['Long', 'Short']
+if 'mark_table' not in st.session_state:
+    st.session_state.mark_table = MarkTable(CURRENCY_PAIRS)
+mark_table = st.session_state.mark_table
+if 'risk_engine' not in st.session_state:
+    st.session_state.risk_engine = RiskEngine(mark_table)
+risk_engine = st.session_state.risk_engine
 
 # Helper functions
-def calculate_pnl(entry_price, exit_price, trade_type, size):
+def calculate_pnl(entry_price, exit_price, trade_type, size, pair=None):
     direction = 1 if trade_type == 'Long' else -1
     price_diff = (exit_price - entry_price) * direction
-    pips = price_diff * 10000
-    return pips * 100 * size  # $100 per million per pip
-
-def calculate_weighted_average(trades):
-    total_size = sum(float(trade['size']) * (1 if trade['type'] == 'Long' else -1) for trade in trades if trade['result'] == 'Open')
-    weighted_sum = sum(float(trade['entryPrice']) * float(trade['size']) * (1 if trade['type'] == 'Long' else -1) for trade in trades if trade['result'] == 'Open')
-    return weighted_sum / total_size if total_size != 0 else 0
+    if pair is None:
+        pips = price_diff * 10000
+        return pips * 100 * size  # $100 per million per pip
+    # The pair's own pip (0.01 for JPY quotes) and USD pip value at the current marks
+    pips = price_diff * mark_table.spec(pair).pips_per_unit
+    return pips * mark_table.pip_value(pair) * size
 
-def calculate_tp_sl(entry_price, trade_type, tp_pips, sl_pips):
+def calculate_tp_sl(entry_price, trade_type, tp_pips, sl_pips, pair=None):
+    spec = mark_table.spec(pair or CURRENCY_PAIRS[0])
     if trade_type == 'Long':
-        tp = entry_price + (tp_pips * 0.0001)
-        sl = entry_price - (sl_pips * 0.0001)
+        tp = entry_price + (tp_pips * spec.pip)
+        sl = entry_price - (sl_pips * spec.pip)
     else:
-        tp = entry_price - (tp_pips * 0.0001)
-        sl = entry_price + (sl_pips * 0.0001)
-    return round(tp, 5), round(sl, 5)
+        tp = entry_price - (tp_pips * spec.pip)
+        sl = entry_price + (sl_pips * spec.pip)
+    return round(tp, spec.digits), round(sl, spec.digits)
 
-def update_group_stats(group, current_price):
-    open_trades = [trade for trade in group['trades'] if trade['result'] == 'Open']
-    closed_trades = [trade for trade in group['trades'] if trade['result'] == 'Closed']
-    
-    group['totalSize'] = sum(float(trade['size']) * (1 if trade['type'] == 'Long' else -1) for trade in open_trades)
-    group['weightedAvgPrice'] = calculate_weighted_average(open_trades)
-    group['netDirection'] = 'Long' if group['totalSize'] > 0 else 'Short' if group['totalSize'] < 0 else 'Flat'
-    
-    # Calculate realized PNL
-    group['realizedPnL'] = sum(calculate_pnl(trade['entryPrice'], trade['closePrice'], trade['type'], trade['size']) for trade in closed_trades)
-    
-    # Calculate unrealized PNL
-    group['unrealizedPnL'] = sum(calculate_pnl(trade['entryPrice'], current_price, trade['type'], trade['size']) for trade in open_trades)
-    
-    # Calculate total PNL
-    group['totalPnL'] = group['realizedPnL'] + group['unrealizedPnL']
-    
-    # Calculate average entry and exit prices
-    long_entries = [trade for trade in group['trades'] if trade['type'] == 'Long']
-    short_entries = [trade for trade in group['trades'] if trade['type'] == 'Short']
-    
-    group['avgEntryPrice'] = calculate_weighted_average(long_entries) if long_entries else 0
-    group['avgClosePrice'] = calculate_weighted_average(short_entries) if short_entries else 0
-    group['totalSizeEntered'] = sum(float(trade['size']) for trade in group['trades'])
-    
-    if group['totalSize'] == 0:
-        group['status'] = 'Closed'
-    else:
-        group['status'] = 'Open'
+def default_price(pair):
+    # The pair's current mark, for prefilling price inputs; 0 until the source has quoted it
+    mark = mark_table.mark(pair)
+    return round(mark, mark_table.spec(pair).digits) if np.isfinite(mark) else 0.0
+
+@st.cache_resource
+def get_board_reader(name):
+    # One attachment per server process, shared by every session and rerun
+    return SharedBoardReader(name)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def closed_group_page(_db, version, pairs, opened_from, opened_to, page):
+    # A page of closed groups straight from the database as read-only summary rows; the
+    # store version is part of the cache key so closing or deleting a group refreshes it.
+    # The cache is shared by every session, so nothing priced at a session's marks goes in it
+    groups = _db.load_groups(status='Closed', pair=list(pairs) or None, opened_from=opened_from, opened_to=opened_to,
+                             limit=CLOSED_PAGE_SIZE, offset=(page - 1) * CLOSED_PAGE_SIZE)
+    rows = [{
+        'Group': f"#{group['seq']}",
+        'Pair': group['trades'][0]['pair'],
+        'Opened': min((trade['date'] for trade in group['trades']), default=''),
+        'Trades': len(group['trades']),
+        'Size Entered (M)': sum(float(trade['size']) for trade in group['trades']),
+    } for group in groups]
+    return groups, pd.DataFrame(rows)
+
+def closed_realized(groups):
+    # Realized PnL of a page of closed groups at this session's pip values
+    return [sum(calculate_pnl(float(trade['entryPrice']), float(trade['closePrice']), trade['type'], float(trade['size']), trade['pair'])
+                for trade in group['trades']) for group in groups]
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def export_trades(_db, version, fmt, settings):
+    # Built on the first download click and reused until the book or the settings change
+    return trade_io.export_book(_db, dict(settings), fmt)
+
+# Running per-group aggregates, so a sub-trade add/modify/delete/close is O(1). They only hold
+# what does not depend on the marks (sizes, status, direction); every price-dependent figure
+# (weighted average, realized/unrealized/total PnL) comes from the vectorized pass alone
+AGG_KEYS = ('longOpenSize', 'longOpenWeighted', 'shortOpenSize', 'shortOpenWeighted', 'totalSizeEntered')
+SIZE_EPSILON = 1e-9  # running sums of sizes drift by float rounding; treat anything smaller as flat
+
+def trade_contribution(trade):
+    size = float(trade['size'])
+    entry = float(trade['entryPrice'])
+    contribution = dict.fromkeys(AGG_KEYS, 0.0)
+    contribution['totalSizeEntered'] = size
+    if trade['result'] == 'Open':
+        side = 'long' if trade['type'] == 'Long' else 'short'
+        contribution[f'{side}OpenSize'] = size
+        contribution[f'{side}OpenWeighted'] = entry * size
+    return contribution
+
+def apply_trade(group, trade, sign=1):
+    # sign=1 when a trade enters the group (or after it changes), -1 before it leaves or changes
+    agg = group['agg']
+    for key, value in trade_contribution(trade).items():
+        agg[key] += sign * value
+    refresh_group_stats(group)
+    move_risk(trade, sign)
+
+# Open trades this run's write added (+1) or removed (-1), for the risk engine's per-pair sums
+risk_moves = []
+
+def move_risk(trade, sign=1):
+    if trade['result'] == 'Open':
+        risk_moves.append((trade, sign))
+
+def refresh_group_stats(group):
+    agg = group['agg']
+    total_size = agg['longOpenSize'] - agg['shortOpenSize']
+    if abs(total_size) < SIZE_EPSILON:
+        total_size = 0.0
+    group['totalSize'] = total_size
+    group['netDirection'] = 'Long' if total_size > 0 else 'Short' if total_size < 0 else 'Flat'
+    group['avgEntryPrice'] = agg['longOpenWeighted'] / agg['longOpenSize'] if agg['longOpenSize'] > SIZE_EPSILON else 0
+    group['avgClosePrice'] = agg['shortOpenWeighted'] / agg['shortOpenSize'] if agg['shortOpenSize'] > SIZE_EPSILON else 0
+    group['totalSizeEntered'] = agg['totalSizeEntered']
+    group['status'] = 'Closed' if total_size == 0 else 'Open'
+    first_trade = store.first_trade(group['id'])
+    group['initialDirection'] = first_trade['type'] if first_trade else 'Flat'
+    group['pair'] = first_trade['pair'] if first_trade else ''
+    # The earliest trade date, the same definition TradeDB filters closed groups by
+    group['opened'] = store.group_opened(group['id'])
+
+def rebuild_group_aggregates(group):
+    group['agg'] = dict.fromkeys(AGG_KEYS, 0.0)
+    for trade in store.group_trades(group['id']):
+        for key, value in trade_contribution(trade).items():
+            group['agg'][key] += value
+    refresh_group_stats(group)
+
+@contextlib.contextmanager
+def book_write(group_ids=()):
+    # If another session changed these groups since this page was rendered, nothing is
+    # written and the page reloads with a warning instead
+    try:
+        with book.update(group_ids, expected=seen_version) as shared:
+            # The risk sums follow this session's own writes by their trade deltas; if another
+            # session wrote since they were last synced, the next sync rebuilds them instead
+            risk_synced = risk_engine.in_sync(shared)
+            risk_moves.clear()
+            yield shared
+            if risk_synced:
+                for trade, sign in risk_moves:
+                    risk_engine.apply_trade(trade['pair'], 1 if trade['type'] == 'Long' else -1,
+                                            float(trade['size']), float(trade['entryPrice']), sign)
+                risk_engine.mark_synced(shared)
+    except ConflictError as e:
+        st.session_state.book_notice = f"Not saved: {e}. The page has been reloaded."
+        st.rerun()
+
+def consistent(read):
+    # The store and its group dicts are shared and written by other sessions: read() runs under
+    # the book's lock, and only while the book is still at the version this run renders, so
+    # nothing on the page mixes two versions. Otherwise the whole app reruns at the new one
+    with book.read() as version:
+        if version == rendered_version:
+            return read()
+    st.rerun(scope='app')
+
+def watch_book():
+    # Picks up changes from other sessions, or other processes writing the database, without a manual reload
+    book.poll_db()
+    if book.version != st.session_state.book_version:
+        changed = book.changes_since(st.session_state.book_version)
+        if changed is None:
+            st.session_state.book_notice = "The trade book was reloaded in another session."
+        elif changed:
+            st.session_state.book_notice = f"{len(changed)} trade group(s) changed in another session."
+        st.rerun(scope='app')
+
+def marked_book():
+    # One vectorized PnL pass per book version and set of marks, shared by the full run and
+    # every fragment that reruns on the same tick. The columns are the store's, cached per
+    # version for all sessions; the PnL depends on this session's marks, so it is kept here
+    key = (book.version, mark_table.version)
+    cached = st.session_state.get('marked_book')
+    if cached is None or cached[0] != key:
+        book_columns = store.columns()
+        trade_marks, trade_pips, trade_pip_values = mark_table.arrays(store.pairs, book_columns['pair'])
+        cached = (key, (book_columns, pnl_engine.compute_book_pnl(book_columns, trade_marks, trade_pips, trade_pip_values)))
+        st.session_state.marked_book = cached
+    return cached[1]
+
+def book_totals(book_columns, book_pnl):
+    # Realized PnL of closed groups comes from the database, so it covers the pages not loaded;
+    # the per-pair point sums only change with the book, their USD value with the marks.
+    # Trades in a pair with no mark (or no USD rate for its pip value) are left out of the
+    # sums and their pairs returned, so one missing quote doesn't blank every total
+    closed_points = book.derived(('closed_realized',), lambda: db.realized_by_pair(status='Closed'))
+    closed_usd = {pair: points * mark_table.spec(pair).pips_per_unit * mark_table.pip_value(pair)
+                  for pair, points in closed_points.items()}
+    open_groups = np.bincount(book_columns['group'], weights=book_columns['is_open'], minlength=book_columns['n_groups']) > 0
+    realized_trade = np.where(open_groups[book_columns['group']], book_pnl['realized_trade'], 0.0)
+    unrealized_trade = book_pnl['unrealized_trade']
+    unmarked = np.isnan(realized_trade) | np.isnan(unrealized_trade)
+    unmarked_pairs = {store.pairs[code] for code in np.unique(book_columns['pair'][unmarked]).tolist()}
+    unmarked_pairs.update(pair for pair, usd in closed_usd.items() if not np.isfinite(usd))
+    realized = float(np.nansum(realized_trade)) + sum(usd for usd in closed_usd.values() if np.isfinite(usd))
+    unrealized = float(np.nansum(unrealized_trade))
+    return realized + unrealized, realized, unrealized, sorted(unmarked_pairs)
 
-    # Set initial direction based on first trade
-    group['initialDirection'] = group['trades'][0]['type'] if group['trades'] else 'Flat'
+def color_pnl(values):
+    # Styler.apply colouring: one call per column, or per table with axis=None, rather than per cell
+    colors = np.where(values.to_numpy() >= 0, 'color: #4CAF50', 'color: #f44336')
+    return pd.DataFrame(colors, index=values.index, columns=values.columns) if values.ndim == 2 else colors
+
+def pnl_span(value):
+    return f"<span style='color: {'#4CAF50' if value >= 0 else '#f44336'};'>${value:.2f}</span>"
+
+def render_pnl_metrics():
+    if auto_refresh:
+        mark_table.refresh()
+    total_pnl, realized_pnl, unrealized_pnl, unmarked_pairs = consistent(lambda: book_totals(*marked_book()))
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total PNL", f"${total_pnl:.2f}")
+    col2.metric("Realized PNL", f"${realized_pnl:.2f}")
+    col3.metric("Unrealized PNL", f"${unrealized_pnl:.2f}")
+    if unmarked_pairs:
+        st.caption(f"Not in the totals, no mark yet: {', '.join(unmarked_pairs)}")
+
+def group_pnl(group_id):
+    # The group's fields, the book's columns and PnL and the group's rows in them, all from one version
+    group = store.groups.get(group_id)
+    if group is None:
+        return None
+    book_columns, book_pnl = marked_book()
+    return dict(group), book_columns, book_pnl, book_columns['row_of_slot'][list(group['slots'])]
+
+def render_group_pnl(group_id):
+    # The group summary and the PnL of each of its trades, as one fragment per group
+    if auto_refresh:
+        mark_table.refresh()
+    snapshot = consistent(lambda: group_pnl(group_id))
+    if snapshot is None:
+        return
+    group, book_columns, book_pnl, flat_index = snapshot
+    position = book_columns['group'][flat_index[0]]
+    unrealized = float(book_pnl['group_unrealized'][position])
+    st.markdown(f"""
+        <div style='background-color: #2D2D2D; padding: 10px; border-radius: 5px; margin-bottom: 10px;'>
+            <h3 style='margin: 0;'>Group Summary</h3>
+            <p><strong>Status:</strong> {group['status']}</p>
+            <p><strong>Total Size:</strong> {abs(group['totalSize']):.2f}M {group['netDirection']}</p>
+            <p><strong>Weighted Avg Price:</strong> {float(book_pnl['group_weighted_avg'][position]):.5f}</p>
+            <p><strong>Mark:</strong> {mark_table.mark(group['pair']):.5f}</p>
+            <p><strong>Realized PnL:</strong> {pnl_span(float(book_pnl['group_realized'][position]))}</p>
+            {f"<p><strong>Unrealized PnL:</strong> {pnl_span(unrealized)}</p>" if group['status'] == 'Open' else ''}
+            <p><strong>Total PnL:</strong> {pnl_span(float(book_pnl['group_total'][position]))}</p>
+        </div>
+    """, unsafe_allow_html=True)
+    # Opposite-direction trades are realized against the group average, the rest marked to market
+    trade_pnl = pd.DataFrame({
+        'Trade': np.arange(1, len(flat_index) + 1),
+        'Type': np.where(book_columns['direction'][flat_index] > 0, 'Long', 'Short'),
+        'Size (M)': book_columns['size'][flat_index],
+        'PNL Type': np.where(book_pnl['display_realized'][flat_index], 'Realized PNL', 'Unrealized PNL'),
+        'PNL': book_pnl['display_pnl'][flat_index],
+    })
+    st.dataframe(trade_pnl.style.format({'Size (M)': '{:.2f}', 'PNL': '${:.2f}'}).apply(color_pnl, subset=['PNL']), hide_index=True)
 
 # Styling
 st.set_page_config(layout="wide")
@@ -128,8 +353,41 @@ st.title('Perfected Trading Performance Dashboard')
 with st.expander("Strategy Notes", expanded=False):
     st.session_state.strategy_notes = st.text_area("", st.session_state.strategy_notes, height=150)
 
-# Current market price input
-st.session_state.current_market_price = st.number_input("Current Market Price", value=st.session_state.current_market_price, format="%.5f", step=0.00001)
+# Marks: one mid per pair from a manual table, a local simulation, or a streaming process's shared quote board
+col1, col2, col3 = st.columns(3)
+with col1:
+    price_source = st.radio("Price Source", ['Manual', 'Simulated', 'Live board'], horizontal=True, key='price_source')
+with col2:
+    auto_refresh = st.checkbox("Auto-refresh PnL", value=True, help="Re-render only the PnL figures on every price tick")
+with col3:
+    refresh_seconds = st.number_input("Refresh every (s)", min_value=0.5, value=1.0, step=0.5)
+if price_source == 'Live board':
+    st.session_state.live_board = st.text_input("Live Price Board", value=st.session_state.live_board, help="Shared memory name passed as shared_board to the Eikon streaming classes")
+    live_reader = None
+    if st.session_state.live_board:
+        try:
+            live_reader = get_board_reader(st.session_state.live_board)
+        except (FileNotFoundError, ValueError) as e:
+            st.warning(f"Live price board unavailable: {e}")
+    if live_reader is not None and getattr(mark_table.source, 'reader', None) is not live_reader:
+        mark_table.set_source(BoardMarks(live_reader))
+    if live_reader is not None and mark_table.source.unmapped:
+        st.warning(f"Live board rows with no known pair, not used as marks: {', '.join(mark_table.source.unmapped)}")
+elif price_source == 'Simulated':
+    mark_table.set_source(st.session_state.setdefault('simulated_marks', SimulatedMarks()))
+else:
+    manual_marks = st.session_state.setdefault('manual_marks', ManualMarks())
+    with st.expander("Manual Marks", expanded=False):
+        edited_marks = st.data_editor(pd.DataFrame({'Pair': list(manual_marks.values), 'Mark': list(manual_marks.values.values())}),
+                                      disabled=['Pair'], hide_index=True, key='manual_marks_editor')
+        manual_marks.values = dict(zip(edited_marks['Pair'], edited_marks['Mark'].astype(float)))
+    mark_table.set_source(manual_marks)
+mark_table.refresh(force=True)
+# Fragments rerun on their own timer without rerunning the script, so forms and expanders are left alone
+live_fragment = st.fragment(run_every=refresh_seconds if auto_refresh and price_source != 'Manual' else None)
+st.fragment(run_every=BOOK_POLL_SECONDS)(watch_book)()
+if 'book_notice' in st.session_state:
+    st.info(st.session_state.pop('book_notice'))
 
 # Default TP/SL settings
 col1, col2 = st.columns(2)
@@ -138,20 +396,52 @@ with col1:
 with col2:
     st.session_state.default_sl_pips = st.number_input("Default SL (pips)", value=st.session_state.default_sl_pips, min_value=1)
 
+settings = {key: st.session_state[key] for key in ('strategy_notes', 'default_tp_pips', 'default_sl_pips')}
+if settings != st.session_state.get('saved_settings'):
+    db.set_settings(settings)
+    st.session_state.saved_settings = settings
+
 # Calculate statistics
-current_price = st.session_state.current_market_price
-for group in st.session_state.trade_groups:
-    update_group_stats(group, current_price)
+def book_snapshot():
+    # Copies of the group dicts, so the page renders the version it read even if a write lands meanwhile.
+    # One vectorized PnL pass over the store's columns at each trade's pair mark; the group labels
+    # and the summary table below read from it by display position, the live fragments from its
+    # per-tick refresh. Nothing priced at this session's marks is written into the shared group dicts
+    groups = store.group_list()
+    for group in groups:
+        if 'agg' not in group:
+            rebuild_group_aggregates(group)
+    return [dict(group) for group in groups], *marked_book()
 
-total_pnl = sum(group['totalPnL'] for group in st.session_state.trade_groups)
-realized_pnl = sum(group['realizedPnL'] for group in st.session_state.trade_groups)
-unrealized_pnl = sum(group['unrealizedPnL'] for group in st.session_state.trade_groups)
+trade_groups, book_columns, book_pnl = consistent(book_snapshot)
 
 # Display statistics
-col1, col2, col3 = st.columns(3)
-col1.metric("Total PNL", f"${total_pnl:.2f}")
-col2.metric("Realized PNL", f"${realized_pnl:.2f}")
-col3.metric("Unrealized PNL", f"${unrealized_pnl:.2f}")
+live_fragment(render_pnl_metrics)()
+
+# Currency exposure and shock scenarios over the open groups
+with st.expander("Risk: Currency Exposure & Scenarios", expanded=False):
+    col1, col2 = st.columns(2)
+    with col1:
+        shock_range = st.number_input("Shock range (pips)", min_value=10, value=200, step=10)
+    with col2:
+        shock_step = st.number_input("Shock step (pips)", min_value=1, value=10, step=1)
+    shock_pips = np.arange(-shock_range, shock_range + 1, shock_step, dtype=float)
+    if not np.array_equal(shock_pips, risk_engine.shock_pips):
+        risk_engine.shock_pips = shock_pips
+    consistent(lambda: risk_engine.sync(store))
+    exposure = risk_engine.exposure()
+    if exposure['currency']:
+        st.dataframe(pd.DataFrame({'Currency': exposure['currency'], 'Net Amount': exposure['amount'], 'USD Value': exposure['usd']})
+                     .style.format({'Net Amount': '{:,.0f}', 'USD Value': '${:,.0f}'}, na_rep='-'), hide_index=True)
+        grid_pairs, grid_shocks, grid = risk_engine.scenario_grid()
+        # Only pairs whose move changes the book's value: traded pairs and the USD pairs that convert them
+        sensitive = np.flatnonzero(np.nan_to_num(np.abs(grid)).max(axis=1) > 0)
+        grid_df = pd.DataFrame(grid[sensitive], index=[grid_pairs[i] for i in sensitive.tolist()],
+                               columns=[f"{shock:+.0f}" for shock in grid_shocks])
+        st.caption("Change in unrealized PnL ($) when one pair moves by the given pips, all else fixed")
+        st.dataframe(grid_df.style.format('{:,.0f}', na_rep='-').apply(color_pnl, axis=None))
+    else:
+        st.write("No open exposure.")
 
 # New trade group form
 with st.expander("Add New Trade Group", expanded=False):
@@ -161,10 +451,10 @@ with st.expander("Add New Trade Group", expanded=False):
         new_type = st.selectbox("Type", POSITION_TYPES)
         new_pair = st.selectbox("Pair", CURRENCY_PAIRS)
     with col2:
-        new_entry_price = st.number_input("Entry Price", value=current_price, format="%.5f", step=0.00001)
+        new_entry_price = st.number_input("Entry Price", value=default_price(new_pair), format="%.5f", step=0.00001)
         new_size = st.number_input("Size (M)", value=1.0, step=0.1)
     with col3:
-        new_tp, new_sl = calculate_tp_sl(new_entry_price, new_type, st.session_state.default_tp_pips, st.session_state.default_sl_pips)
+        new_tp, new_sl = calculate_tp_sl(new_entry_price, new_type, st.session_state.default_tp_pips, st.session_state.default_sl_pips, new_pair)
         new_tp = st.number_input("TP Level", value=new_tp, format="%.5f", step=0.00001)
         new_sl = st.number_input("SL Level", value=new_sl, format="%.5f", step=0.00001)
     with col4:
@@ -185,42 +475,84 @@ with st.expander("Add New Trade Group", expanded=False):
                 'result': 'Open',
                 'comment': ''
             }
-            new_group = {
-                'id': str(uuid.uuid4()),
-                'trades': [new_trade],
-                'weightedAvgPrice': new_entry_price,
-                'totalSize': new_size,
-                'tpLevel': new_tp,
-                'slLevel': new_sl,
-                'netDirection': new_type,
-                'initialDirection': new_type,
-                'status': 'Open',
-                'realizedPnL': 0,
-                'unrealizedPnL': 0,
-                'totalPnL': 0,
-                'avgEntryPrice': new_entry_price,
-                'avgClosePrice': 0,
-                'totalSizeEntered': new_size
-            }
-            st.session_state.trade_groups.insert(0, new_group)  # Insert at the beginning of the list
-            update_group_stats(new_group, current_price)
+            with book_write() as store:
+                new_group = store.add_group(
+                    new_trade,
+                    **{
+                    'totalSize': new_size,
+                    'tpLevel': new_tp,
+                    'slLevel': new_sl,
+                    'netDirection': new_type,
+                    'initialDirection': new_type,
+                    'status': 'Open',
+                    'avgEntryPrice': new_entry_price,
+                    'avgClosePrice': 0,
+                    'totalSizeEntered': new_size
+                })  # Shown at the top of the list
+                book.touch(new_group['id'])
+                rebuild_group_aggregates(new_group)
+                move_risk(new_trade)
             st.success("New trade group added successfully!")
-            st.experimental_rerun()
+            st.rerun()
         else:
             st.warning("Please enter both Entry Price and Size.")
 
 # Display trade groups
 st.subheader("Trade Groups")
-for group_index, group in enumerate(st.session_state.trade_groups):
-    update_group_stats(group, current_price)
-    
+# Widgets are only built for the current page of the filtered groups; closed history is a
+# read-only table from the database unless a group is picked for editing
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    show_closed = st.checkbox("Show closed groups", value=False)
+with col2:
+    filter_pairs = st.multiselect("Pairs", CURRENCY_PAIRS)
+with col3:
+    opened_range = st.date_input("Opened between", value=(), key='opened_range')
+with col4:
+    group_page = st.number_input("Page", min_value=1, value=1, key='group_page')
+opened_from = str(opened_range[0]) if len(opened_range) > 0 else None
+opened_to = str(opened_range[1] + pd.Timedelta(days=1)) if len(opened_range) > 1 else None
+
+visible_groups = [
+    (group_index, group) for group_index, group in enumerate(trade_groups)
+    if (show_closed or group['status'] == 'Open')
+    and (not filter_pairs or group['pair'] in filter_pairs)
+    and (opened_from is None or group['opened'] >= opened_from)
+    and (opened_to is None or group['opened'] < opened_to)
+]
+page_count = max(1, -(-len(visible_groups) // GROUPS_PER_PAGE))
+group_page = min(group_page, page_count)
+st.caption(f"{len(visible_groups)} groups, page {group_page} of {page_count}")
+page_groups = visible_groups[(group_page - 1) * GROUPS_PER_PAGE:group_page * GROUPS_PER_PAGE]
+page_trades = consistent(lambda: {group['id']: store.group_trades(group['id']) for _, group in page_groups})
+
+if show_closed:
+    with st.expander("Closed Group History", expanded=True):
+        closed_count = db.count_groups(status='Closed', pair=filter_pairs or None, opened_from=opened_from, opened_to=opened_to)
+        history_page = st.number_input("History Page", min_value=1, value=1, key='history_page',
+                                       help=f"{closed_count} closed groups, {CLOSED_PAGE_SIZE} per page")
+        history_page = min(history_page, max(1, -(-closed_count // CLOSED_PAGE_SIZE)))
+        closed_groups, closed_df = closed_group_page(db, book.version, tuple(filter_pairs), opened_from, opened_to, history_page)
+        if closed_df.empty:
+            st.write("No closed groups.")
+        else:
+            closed_df = closed_df.assign(**{'Realized PNL': closed_realized(closed_groups)})
+            st.dataframe(closed_df.style.format({'Size Entered (M)': '{:.2f}', 'Realized PNL': '${:.2f}'}), hide_index=True)
+            edit_group = st.selectbox("Edit a closed group", [None] + [group['id'] for group in closed_groups],
+                                      format_func=lambda group_id: '' if group_id is None else f"#{next(g['seq'] for g in closed_groups if g['id'] == group_id)}")
+            if edit_group is not None and edit_group not in store.groups:
+                # Kept in memory while recently edited, then unloaded again by the book
+                book.load_closed([group for group in closed_groups if group['id'] == edit_group])
+                st.rerun()
+
+for group_index, group in page_groups:
     # Construct the label string
     direction_symbol = "🟢" if group['initialDirection'] == 'Long' else "🔴" if group['initialDirection'] == 'Short' else "⚪"
-    pnl_color = "profit" if group['totalPnL'] >= 0 else "loss"
+    group_total = float(book_pnl['group_total'][group_index])
     if group['status'] == 'Closed':
-        label = f"{direction_symbol} Group {group_index + 1}: {group['trades'][0]['pair']} - Closed | Total PnL: ${group['totalPnL']:.2f} | Avg Entry: {group['avgEntryPrice']:.5f} | Avg Close: {group['avgClosePrice']:.5f} | Total Size: {group['totalSizeEntered']:.2f}M"
+        label = f"{direction_symbol} Group {group_index + 1}: {group['pair']} - Closed | Total PnL: ${group_total:.2f} | Avg Entry: {group['avgEntryPrice']:.5f} | Avg Close: {group['avgClosePrice']:.5f} | Total Size: {group['totalSizeEntered']:.2f}M"
     else:
-        label = f"{direction_symbol} Group {group_index + 1}: {group['trades'][0]['pair']} - {abs(group['totalSize']):.2f}M {group['netDirection']} @ {group['weightedAvgPrice']:.5f} | PnL: ${group['totalPnL']:.2f}"
+        label = f"{direction_symbol} Group {group_index + 1}: {group['pair']} - {abs(group['totalSize']):.2f}M {group['netDirection']} @ {float(book_pnl['group_weighted_avg'][group_index]):.5f} | PnL: ${group_total:.2f}"
 
     # Color code the group based on its direction
     group_color = '#4CAF50' if group['netDirection'] == 'Long' else '#f44336' if group['netDirection'] == 'Short' else '#808080'
@@ -228,53 +560,34 @@ for group_index, group in enumerate(st.session_state.trade_groups):
     with st.expander(label, expanded=True):
         st.markdown(f"<div class='trade-group-container' style='border-left: 5px solid {group_color};'>", unsafe_allow_html=True)
         
-        # Display group summary
-        st.markdown(f"""
-            <div style='background-color: #2D2D2D; padding: 10px; border-radius: 5px; margin-bottom: 10px;'>
-                <h3 style='margin: 0;'>Group Summary</h3>
-                <p><strong>Status:</strong> {group['status']}</p>
-                <p><strong>Total Size:</strong> {abs(group['totalSize']):.2f}M {group['netDirection']}</p>
-                <p><strong>Weighted Avg Price:</strong> {group['weightedAvgPrice']:.5f}</p>
-                <p><strong>Realized PnL:</strong> <span style='color: {"#4CAF50" if group["realizedPnL"] >= 0 else "#f44336"};'>${group['realizedPnL']:.2f}</span></p>
-                {"<p><strong>Unrealized PnL:</strong> <span style='color: " + ("#4CAF50" if group["unrealizedPnL"] >= 0 else "#f44336") + f";'>${group['unrealizedPnL']:.2f}</span></p>" if group['status'] == 'Open' else ''}
-                <p><strong>Total PnL:</strong> <span style='color: {"#4CAF50" if group["totalPnL"] >= 0 else "#f44336"};'>${group['totalPnL']:.2f}</span></p>
-            </div>
-        """, unsafe_allow_html=True)
+        # Group summary and trade PnL; one fragment for the group, refreshed on its own with the marks
+        live_fragment(render_group_pnl)(group['id'])
         
         # Display individual trades
-        for trade_index, trade in enumerate(group['trades']):
+        for trade_number, trade in enumerate(page_trades[group['id']], 1):
             with st.container():
                 st.markdown(f"<div class='trade-container'>", unsafe_allow_html=True)
-                col1, col2, col3, col4, col5, col6, col7 = st.columns([2, 2, 2, 2, 2, 2, 2])
-                col1.write(f"**Date:** {trade['date']}")
-                col2.write(f"**Type:** {trade['type']}")
-                col3.write(f"**Entry Price:** {trade['entryPrice']:.5f}")
-                col4.write(f"**Size:** {trade['size']:.2f}M")
-                col5.write(f"**Result:** {trade['result']}")
-                col6.write(f"**Close Price:** {trade.get('closePrice', '-')}")
-                
-                if trade['type'] != group['initialDirection']:
-                    # Realized PNL for opposite direction trades
-                    trade_pnl = calculate_pnl(group['weightedAvgPrice'], trade['entryPrice'], group['initialDirection'], trade['size'])
-                    pnl_type = "Realized PNL"
-                else:
-                    # Unrealized PNL for same direction trades
-                    trade_pnl = calculate_pnl(trade
-                    else:
-                    # Unrealized PNL for same direction trades
-                    trade_pnl = calculate_pnl(trade['entryPrice'], current_price, trade['type'], trade['size'])
-                    pnl_type = "Unrealized PNL"
-                
-                pnl_color = "#4CAF50" if trade_pnl >= 0 else "#f44336"
-                col7.markdown(f"**{pnl_type}:** <span style='color: {pnl_color};'>${trade_pnl:.2f}</span>", unsafe_allow_html=True)
+                col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 2, 2, 2, 2, 2, 2])
+                col1.write(f"**#{trade_number}**")
+                col2.write(f"**Date:** {trade['date']}")
+                col3.write(f"**Type:** {trade['type']}")
+                col4.write(f"**Entry Price:** {trade['entryPrice']:.5f}")
+                col5.write(f"**Size:** {trade['size']:.2f}M")
+                col6.write(f"**Result:** {trade['result']}")
+                col7.write(f"**Close Price:** {trade.get('closePrice', '-')}")
                 
                 # Add modify and delete buttons for both open and closed groups
                 if st.button(f"Modify", key=f"modify_{trade['id']}"):
                     st.session_state[f"modify_trade_{trade['id']}"] = True
                 if st.button(f"Delete", key=f"delete_{trade['id']}"):
-                    group['trades'].remove(trade)
-                    update_group_stats(group, current_price)
-                    st.experimental_rerun()
+                    # Writes go to the store's own group dict; `group` is this run's copy
+                    with book_write([group['id']]) as store:
+                        shared_group = store.groups[group['id']]
+                        apply_trade(shared_group, trade, -1)
+                        store.delete_trade(trade['id'])
+                        if group['id'] in store.groups:
+                            refresh_group_stats(shared_group)
+                    st.rerun()
                 
                 # Modify trade form
                 if st.session_state.get(f"modify_trade_{trade['id']}", False):
@@ -285,34 +598,37 @@ for group_index, group in enumerate(st.session_state.trade_groups):
                         if trade['result'] == 'Closed':
                             mod_close_price = st.number_input("New Close Price", value=float(trade.get('closePrice', trade['entryPrice'])), format="%.5f", step=0.00001)
                         if st.form_submit_button("Save Changes"):
-                            trade['entryPrice'] = mod_entry_price
-                            trade['size'] = mod_size
+                            changes = {'entryPrice': mod_entry_price, 'size': mod_size}
                             if trade['result'] == 'Closed':
-                                trade['closePrice'] = mod_close_price
-                            update_group_stats(group, current_price)
+                                changes['closePrice'] = mod_close_price
+                            with book_write([group['id']]) as store:
+                                shared_group = store.groups[group['id']]
+                                apply_trade(shared_group, trade, -1)
+                                store.modify_trade(trade['id'], **changes)
+                                apply_trade(shared_group, store.trade(trade['id']))
                             st.session_state[f"modify_trade_{trade['id']}"] = False
-                            st.experimental_rerun()
+                            st.rerun()
                 
                 st.markdown("</div>", unsafe_allow_html=True)
         
         # Add sub-trade form within group
         if group['status'] == 'Open':
-            with st.form(f"add_sub_trade_form_{group_index}"):
+            with st.form(f"add_sub_trade_form_{group['id']}"):
                 st.subheader("Add Sub-Trade to Group")
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                    sub_type = st.selectbox(f"Type", POSITION_TYPES, key=f"type_{group_index}")
-                    sub_pair = st.selectbox(f"Pair", CURRENCY_PAIRS, key=f"pair_{group_index}")
+                    sub_type = st.selectbox(f"Type", POSITION_TYPES, key=f"type_{group['id']}")
+                    sub_pair = st.selectbox(f"Pair", CURRENCY_PAIRS, key=f"pair_{group['id']}")
                 with col2:
-                    sub_entry_price = st.number_input(f"Entry Price", value=current_price, format="%.5f", step=0.00001, key=f"entry_{group_index}")
-                    sub_size = st.number_input(f"Size (M)", value=1.0, step=0.1, key=f"size_{group_index}")
+                    sub_entry_price = st.number_input(f"Entry Price", value=default_price(group['pair']), format="%.5f", step=0.00001, key=f"entry_{group['id']}")
+                    sub_size = st.number_input(f"Size (M)", value=1.0, step=0.1, key=f"size_{group['id']}")
                 with col3:
-                    sub_tp, sub_sl = calculate_tp_sl(sub_entry_price, sub_type, st.session_state.default_tp_pips, st.session_state.default_sl_pips)
-                    sub_tp = st.number_input(f"TP Level", value=sub_tp, format="%.5f", step=0.00001, key=f"tp_{group_index}")
-                    sub_sl = st.number_input(f"SL Level", value=sub_sl, format="%.5f", step=0.00001, key=f"sl_{group_index}")
+                    sub_tp, sub_sl = calculate_tp_sl(sub_entry_price, sub_type, st.session_state.default_tp_pips, st.session_state.default_sl_pips, sub_pair)
+                    sub_tp = st.number_input(f"TP Level", value=sub_tp, format="%.5f", step=0.00001, key=f"tp_{group['id']}")
+                    sub_sl = st.number_input(f"SL Level", value=sub_sl, format="%.5f", step=0.00001, key=f"sl_{group['id']}")
                 with col4:
-                    sub_date = st.date_input(f"Date", key=f"date_{group_index}")
-                    sub_time = st.time_input(f"Time", key=f"time_{group_index}")
+                    sub_date = st.date_input(f"Date", key=f"date_{group['id']}")
+                    sub_time = st.time_input(f"Time", key=f"time_{group['id']}")
 
                 if st.form_submit_button(f"Add Sub-Trade to Group {group_index + 1}"):
                     if sub_entry_price and sub_size:
@@ -328,25 +644,27 @@ for group_index, group in enumerate(st.session_state.trade_groups):
                             'result': 'Open',
                             'comment': ''
                         }
-                        group['trades'].append(sub_trade)
-                        update_group_stats(group, current_price)
+                        with book_write([group['id']]) as store:
+                            store.add_trade(group['id'], sub_trade)
+                            apply_trade(store.groups[group['id']], sub_trade)
                         st.success("Sub-trade added successfully!")
-                        st.experimental_rerun()
+                        st.rerun()
                     else:
                         st.warning("Please enter both Entry Price and Size.")
 
         # Close entire trade group button
         if group['status'] == 'Open':
-            if st.button(f"Close Entire Group {group_index + 1}", key=f"close_{group_index}"):
-                close_price = st.number_input(f"Close Price for Group {group_index + 1}", value=current_price, format="%.5f", step=0.00001, key=f"group_close_price_{group_index}")
-                if st.button(f"Confirm Close Group {group_index + 1}", key=f"confirm_close_{group_index}"):
-                    for trade in group['trades']:
-                        if trade['result'] == 'Open':
-                            trade['result'] = 'Closed'
-                            trade['closePrice'] = close_price
-                    update_group_stats(group, current_price)
-                    st.success(f"Group {group_index + 1} closed successfully! Total Realized PnL: ${group['realizedPnL']:.2f}")
-                    st.experimental_rerun()
+            if st.button(f"Close Entire Group {group_index + 1}", key=f"close_{group['id']}"):
+                close_price = st.number_input(f"Close Price for Group {group_index + 1}", value=default_price(group['pair']), format="%.5f", step=0.00001, key=f"group_close_price_{group['id']}")
+                if st.button(f"Confirm Close Group {group_index + 1}", key=f"confirm_close_{group['id']}"):
+                    with book_write([group['id']]) as store:
+                        for trade in store.group_trades(group['id']):
+                            move_risk(trade, -1)
+                        store.close_group(group['id'], close_price)
+                        rebuild_group_aggregates(store.groups[group['id']])
+                        book.keep_closed([group['id']])
+                    st.success(f"Group {group_index + 1} closed successfully!")
+                    st.rerun()
 
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -354,72 +672,83 @@ for group_index, group in enumerate(st.session_state.trade_groups):
 with st.expander("Export/Import Trade Data", expanded=False):
     col1, col2 = st.columns(2)
     with col1:
-        trade_data = {
-            'trade_groups': st.session_state.trade_groups,
-            'strategy_notes': st.session_state.strategy_notes,
-            'default_tp_pips': st.session_state.default_tp_pips,
-            'default_sl_pips': st.session_state.default_sl_pips
-        }
-        trade_data_json = json.dumps(trade_data, indent=2)
-        st.download_button(label="Export Trades", data=trade_data_json, file_name='trade_data.json', mime='application/json')
+        export_formats = list(trade_io.FORMATS) if trade_io.columnar_available() else ['json']
+        export_format = st.selectbox("Export Format", export_formats)
+        export_settings = tuple(settings.items())
+        st.download_button(label="Export Trades", file_name=f'trade_data.{export_format}', mime=trade_io.FORMATS[export_format],
+                           data=lambda: export_trades(db, db.version(), export_format, export_settings))
     with col2:
-        uploaded_file = st.file_uploader("Import Trade Data", type=['json'])
-        if uploaded_file is not None:
-            trade_data = json.loads(uploaded_file.read())
-            st.session_state.trade_groups = trade_data['trade_groups']
-            st.session_state.strategy_notes = trade_data['strategy_notes']
-            st.session_state.default_tp_pips = trade_data['default_tp_pips']
-            st.session_state.default_sl_pips = trade_data['default_sl_pips']
-            st.success("Trade data imported successfully!")
-            st.experimental_rerun()
+        import_mode = st.radio("Import Mode", ['Replace', 'Merge'], horizontal=True,
+                               help="Merge adds new groups and updates existing ones by id")
+        uploaded_file = st.file_uploader("Import Trade Data", type=['json', 'parquet', 'arrow', 'feather'])
+        # The uploader keeps its file across reruns; import each upload once
+        if uploaded_file is not None and st.session_state.get('imported_file') != uploaded_file.file_id:
+            reader = BookReader.for_file(uploaded_file)
+            try:
+                imported = book.import_groups(reader.groups(), replace=import_mode == 'Replace')
+            except ValueError as e:
+                st.error(f"Import failed, nothing was changed: {e}")
+            else:
+                st.session_state.imported_file = uploaded_file.file_id
+                # The book reloads open groups from the database for every session; aggregates are rebuilt from the trades
+                for key, value in reader.settings.items():
+                    st.session_state[key] = value
+                st.success(f"Imported {imported} trade groups.")
+                st.rerun()
 
 # Display summary table
 st.subheader("Trade Summary")
-summary_data = []
-for group_index, group in enumerate(st.session_state.trade_groups):
-    group_id = f"Group {group_index + 1}"
-    for trade in group['trades']:
-        if trade['type'] != group['initialDirection']:
-            trade_pnl = calculate_pnl(group['weightedAvgPrice'], trade['entryPrice'], group['initialDirection'], trade['size'])
-            pnl_type = "Realized PNL"
-        else:
-            trade_pnl = calculate_pnl(trade['entryPrice'], current_price, trade['type'], trade['size'])
-            pnl_type = "Unrealized PNL"
-        
-        summary_data.append({
-            'Group': group_id,
-            'Date': trade['date'],
-            'Pair': trade['pair'],
-            'Type': trade['type'],
-            'Entry Price': float(trade['entryPrice']),
-            'Size (M)': float(trade['size']),
-            'Result': trade['result'],
-            'Close Price': trade.get('closePrice', '-'),
-            'PNL Type': pnl_type,
-            'PNL': trade_pnl,
-            'Comment': trade['comment']
-        })
-
-summary_df = pd.DataFrame(summary_data)
-
-# Apply color coding to PNL column
-def color_pnl(val):
-    if isinstance(val, str) or pd.isna(val):
-        return ''
-    color = '#4CAF50' if float(val) >= 0 else '#f44336'
-    return f'color: {color}'
-
-if not summary_df.empty:
-    st.dataframe(summary_df.style
-                 .format({
-                     'Entry Price': '{:.5f}',
-                     'Size (M)': '{:.2f}',
-                     'Close Price': lambda x: '{:.5f}'.format(x) if isinstance(x, (int, float)) else x,
-                     'PNL': '${:.2f}'
-                 })
-                 .applymap(color_pnl, subset=['PNL'])
-                 .set_properties(**{'text-align': 'right'})
-                 .set_table_styles([{'selector': 'th', 'props': [('text-align', 'left')]}])
-    )
+
+def summary_frame():
+    # Columns that only change with the book, built column-wise from the store once per book version
+    # for all sessions; a stable sort on display position keeps each group's trade order
+    def build():
+        book_frame = store.frame()
+        group_position = store.columns()['group']
+        summary_order = np.argsort(group_position, kind='stable')
+        frame = pd.DataFrame({
+            'Group': 'Group ' + (group_position + 1).astype(str).astype(object),
+            'Date': book_frame['date'].astype(str).where(book_frame['date'].notna(), ''),
+            'Pair': book_frame['pair'].astype(str),
+            'Type': book_frame['type'].astype(str),
+            'Entry Price': book_frame['entry_price'],
+            'Size (M)': book_frame['size'],
+            'Result': book_frame['result'].astype(str),
+            'Close Price': book_frame['close_price'].where(book_frame['result'] == 'Closed'),
+            'PNL Type': '',
+            'PNL': 0.0,
+            'Comment': book_frame['comment'],
+        }).iloc[summary_order].reset_index(drop=True)
+        return frame, summary_order
+    return book.derived(('summary',), build)
+
+def summary_page(page):
+    # The styled page is cached with the marks it was priced at; a new tick only refills the two PnL columns
+    key = (book.version, mark_table.version, page)
+    cached = st.session_state.get('summary_page')
+    if cached is None or cached[0] != key:
+        frame, summary_order = summary_frame()
+        rows = slice((page - 1) * SUMMARY_PAGE_SIZE, page * SUMMARY_PAGE_SIZE)
+        page_order = summary_order[rows]
+        page_df = frame.iloc[rows].copy()
+        page_df['PNL Type'] = np.where(book_pnl['display_realized'][page_order], 'Realized PNL', 'Unrealized PNL')
+        page_df['PNL'] = book_pnl['display_pnl'][page_order]
+        styler = (page_df.style
+                  .format({'Entry Price': '{:.5f}', 'Size (M)': '{:.2f}', 'Close Price': '{:.5f}', 'PNL': '${:.2f}'}, na_rep='-')
+                  .apply(color_pnl, subset=['PNL'])
+                  .set_properties(**{'text-align': 'right'})
+                  .set_table_styles([{'selector': 'th', 'props': [('text-align', 'left')]}]))
+        cached = (key, styler)
+        st.session_state.summary_page = cached
+    return cached[1]
+
+summary_rows = len(book_columns['group'])
+if summary_rows:
+    summary_pages = max(1, -(-summary_rows // SUMMARY_PAGE_SIZE))
+    summary_at = 1
+    if summary_pages > 1:
+        summary_at = st.number_input("Summary page", min_value=1, max_value=summary_pages, value=1, step=1, key='summary_page_number')
+        st.caption(f"{summary_rows} trades, page {summary_at} of {summary_pages}")
+    st.dataframe(consistent(lambda: summary_page(int(summary_at))))
 else:
-    st.write("No trades to display.")
\ No newline at end of file
+    st.write("No trades to display.")
@@ -0,0 +1,158 @@
+import collections
+import weakref
+import numpy as np
+import pandas as pd
+
+
+def _bucket_ids(x, buckets):
+    # Equal-width buckets over x (one per pixel column), not equal counts, so gaps stay gaps
+    span = x[-1] - x[0]
+    if span <= 0:
+        return np.zeros(len(x), dtype=np.int64)
+    return np.minimum(((x - x[0]) * (buckets / span)).astype(np.int64), buckets - 1)
+
+
+def minmax_indices(x, y, buckets):
+    """Positions of the first, last, lowest and highest point in each of `buckets` x-buckets, sorted.
+
+    A line through them covers exactly the vertical extent the full series would in each
+    pixel column, so no spike is lost. NaNs in y are skipped.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= 4 * buckets:
+        return valid
+    xv, yv = x[valid], y[valid]
+    ids = _bucket_ids(xv, buckets)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(ids)] - 1
+    # Per-bucket min/max values, then the first point hitting each, all without a Python loop
+    lows = np.minimum.reduceat(yv, starts)
+    highs = np.maximum.reduceat(yv, starts)
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(ids)]))
+    first_low = _first_per_bucket(np.flatnonzero(yv == lows[bucket]), bucket)
+    first_high = _first_per_bucket(np.flatnonzero(yv == highs[bucket]), bucket)
+    return valid[np.unique(np.concatenate([starts, ends, first_low, first_high]))]
+
+
+def _first_per_bucket(hits, bucket):
+    # hits are ascending and buckets never decrease along x, so a bucket's first hit is where its id changes
+    ids = bucket[hits]
+    return hits[np.r_[True, ids[1:] != ids[:-1]]]
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: `threshold` points that keep the series' visual shape.
+
+    Each bucket keeps the point forming the largest triangle with the point kept before it
+    and the mean of the next bucket. Buckets depend on the previous choice, so this loops
+    over buckets (not points); each bucket's search is vectorized.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if threshold >= n or threshold < 3:
+        return valid
+    xv, yv = x[valid], y[valid]
+    # Bucket b covers edges[b]:edges[b + 1]; the first and last points are kept on their own
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        next_hi = edges[b + 2] if b + 2 < len(edges) else n
+        next_x = xv[hi:next_hi].mean()
+        next_y = yv[hi:next_hi].mean()
+        areas = np.abs((xv[previous] - next_x) * (yv[lo:hi] - yv[previous])
+                       - (xv[previous] - xv[lo:hi]) * (next_y - yv[previous]))
+        previous = lo + int(np.argmax(areas))
+        kept[b + 1] = previous
+    return valid[kept]
+
+
+def _as_float(index):
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(float)
+    return np.asarray(index, dtype=float)
+
+
+class DecimationCache:
+    """Decimated series kept per (series, time range, width, method), least recently used evicted.
+
+    A series is identified by the caller's `name` together with its length, first and last
+    index values and either the caller's `version` or a hash of its values, so appending bars
+    or replacing the series with another on the same index gives a new entry rather than a
+    stale one. The hash is taken once per series object (and `keep` array) and remembered
+    while that object lives, so repeat calls with the same object, e.g. on every zoom, are
+    a dictionary lookup; pass `version` instead when the caller mutates a series in place.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._content_keys = {}
+
+    def _content_key(self, values):
+        # id() alone could be reused by a later object; the weakref confirms it is the same one
+        # and drops the entry when that object goes
+        object_id = id(values)
+        remembered = self._content_keys.get(object_id)
+        if remembered is not None and remembered[0]() is values and remembered[1] == len(values):
+            return remembered[2]
+        content_key = hash(np.ascontiguousarray(np.asarray(values)).tobytes())
+        try:
+            ref = weakref.ref(values, lambda dead: self._forget(object_id, dead))
+        except TypeError:
+            return content_key
+        self._content_keys[object_id] = (ref, len(values), content_key)
+        return content_key
+
+    def _forget(self, object_id, dead):
+        remembered = self._content_keys.get(object_id)
+        if remembered is not None and remembered[0] is dead:
+            del self._content_keys[object_id]
+
+    def decimate(self, series, width, name=None, start=None, end=None, method='minmax', keep=None, version=None):
+        """`series` (indexed by time or any numeric x) cut to about `width` buckets between start and end.
+
+        method is 'minmax' (up to 4 points per bucket, extremes exact) or 'lttb' (`width` points).
+        Index values in `keep`, e.g. trade times, are always kept. Returns a Series.
+        """
+        if len(series) == 0:
+            return series
+        keep_key = None if keep is None else self._content_key(keep)
+        values_key = ('version', version) if version is not None else self._content_key(series)
+        key = (name if name is not None else id(series), len(series), series.index[0], series.index[-1],
+               values_key, start, end, int(width), method, keep_key)
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            return cached
+        lo = series.index.searchsorted(start, 'left') if start is not None else 0
+        hi = series.index.searchsorted(end, 'right') if end is not None else len(series)
+        # One point either side of the window, so the line still runs to the edges of the axes
+        lo, hi = max(lo - 1, 0), min(hi + 1, len(series))
+        window = series.iloc[lo:hi]
+        x = _as_float(window.index)
+        if method == 'lttb':
+            positions = lttb_indices(x, window.to_numpy(dtype=float), int(width))
+        else:
+            positions = minmax_indices(x, window.to_numpy(dtype=float), int(width))
+        if keep is not None and len(keep):
+            # The index is sorted, so a binary search per kept value beats hashing millions of rows
+            keep = pd.Index(keep)
+            wanted = window.index.searchsorted(keep)
+            found = wanted < len(window)
+            wanted, keep = wanted[found], keep[found]
+            positions = np.union1d(positions, wanted[window.index[wanted] == keep])
+        result = window.iloc[positions]
+        self._entries[key] = result
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return result
+
+
+SERIES_CACHE = DecimationCache()
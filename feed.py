@@ -0,0 +1,168 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 86_400 * 1_000_000_000
+
+
+class SimulatedFeed:
+    """Local stand-in for `ek.StreamingPrices` that replays recorded or synthetic ticks.
+
+    Takes the same constructor arguments and drives the same callbacks, so a pricer
+    can be pointed at it through its `feed_factory`. The first two `fields` are
+    treated as bid and ask. `rate` is the total ticks/s across all instruments
+    (None = as fast as the callbacks allow).
+    """
+
+    def __init__(self, instruments, fields=('CF_BID', 'CF_ASK'), on_refresh=None, on_update=None,
+                 on_status=None, on_complete=None, rate=None, n_ticks=1_000_000, ticks=None,
+                 speed=None, start_price=1.0, spread=0.0002, volatility=0.00005, seed=0,
+                 chunk_size=8192, record_latency=False, stamp_field=None):
+        self.instruments = list(instruments)
+        self.fields = list(fields)
+        self.on_refresh = on_refresh
+        self.on_update = on_update
+        self.on_status = on_status
+        self.on_complete = on_complete
+        self.rate = rate
+        self.speed = speed
+        self.n_ticks = n_ticks if ticks is None else len(ticks[0])
+        self.ticks = ticks
+        self.start_price = start_price
+        self.spread = spread
+        self.volatility = volatility
+        self.chunk_size = chunk_size
+        self.record_latency = record_latency
+        # When set, each update carries its send time under this field as a source timestamp, in
+        # QUOTIM_MS form (ms since UTC midnight, here with a sub-ms fraction)
+        self.stamp_field = stamp_field
+        self._rng = np.random.default_rng(seed)
+
+        n = len(self.instruments)
+        self._bid = np.full(n, start_price - spread / 2)
+        self._ask = np.full(n, start_price + spread / 2)
+        self.sent = 0
+        self.elapsed = 0.0
+        # Lag of each callback's completion behind its scheduled send time, in ns
+        self.latencies_ns = np.zeros(self.n_ticks if record_latency else 0, dtype=np.int64)
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_records(cls, ts_ns, instruments, bid, ask, **kwargs):
+        # Recorded ticks as parallel arrays; `instruments` holds one RIC per tick
+        names, codes = np.unique(np.asarray(instruments), return_inverse=True)
+        ticks = (np.asarray(ts_ns, dtype=np.int64), codes, np.asarray(bid, dtype=float), np.asarray(ask, dtype=float))
+        return cls(list(names), ticks=ticks, **kwargs)
+
+    def _synthetic_chunk(self, size):
+        n = len(self.instruments)
+        codes = self._rng.integers(0, n, size)
+        steps = self._rng.normal(0.0, self.volatility, size)
+        bid = np.empty(size)
+        ask = np.empty(size)
+        # Random walk per instrument; the loop runs in NumPy-sized chunks, not per tick
+        for code in range(n):
+            mask = codes == code
+            if not mask.any():
+                continue
+            path = self._bid[code] + np.cumsum(steps[mask])
+            bid[mask] = path
+            ask[mask] = path + self.spread
+            self._bid[code] = path[-1]
+            self._ask[code] = path[-1] + self.spread
+        return codes, bid, ask
+
+    def _chunks(self):
+        for start in range(0, self.n_ticks, self.chunk_size):
+            stop = min(start + self.chunk_size, self.n_ticks)
+            if self.ticks is None:
+                codes, bid, ask = self._synthetic_chunk(stop - start)
+                ts = None
+            else:
+                ts, codes, bid, ask = (column[start:stop] for column in self.ticks)
+            yield start, ts, codes, bid, ask
+
+    def _schedule(self, index, ts_ns):
+        # Seconds after the start of replay at which tick `index` is due, or None for flat out
+        if self.speed and self.ticks is not None:
+            return (ts_ns - self.ticks[0][0]) / 1e9 / self.speed
+        if self.rate:
+            return index / self.rate
+        return None
+
+    def open(self, with_updates=True):
+        bid_field, ask_field = self.fields[0], self.fields[1]
+        if self.on_refresh is not None:
+            for code, instrument in enumerate(self.instruments):
+                self.on_refresh(self, instrument, {bid_field: float(self._bid[code]), ask_field: float(self._ask[code])})
+        if self.on_complete is not None:
+            self.on_complete(self)
+        if with_updates:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name='SimulatedFeed', daemon=True)
+            self._thread.start()
+
+    def run(self):
+        on_update = self.on_update
+        instruments = self.instruments
+        bid_field, ask_field = self.fields[0], self.fields[1]
+        latencies = self.latencies_ns
+        record_latency = self.record_latency
+        stamp_field = self.stamp_field
+        time_ns = time.time_ns
+        paced = bool(self.rate or (self.speed and self.ticks is not None))
+        perf_ns = time.perf_counter_ns
+        start_ns = perf_ns()
+
+        for offset, ts, codes, bid, ask in self._chunks():
+            if self._stop.is_set():
+                break
+            if self.ticks is not None:
+                self._bid[codes] = bid
+                self._ask[codes] = ask
+            codes, bid, ask = codes.tolist(), bid.tolist(), ask.tolist()
+            ts = ts.tolist() if ts is not None else None
+            for i in range(len(codes)):
+                index = offset + i
+                due_ns = start_ns
+                if paced:
+                    due_ns = start_ns + int(self._schedule(index, ts[i] if ts is not None else None) * 1e9)
+                    wait = due_ns - perf_ns()
+                    if wait > 200_000:
+                        time.sleep(wait / 1e9)
+                elif record_latency:
+                    due_ns = perf_ns()
+                if on_update is not None:
+                    fields = {bid_field: bid[i], ask_field: ask[i]}
+                    if stamp_field is not None:
+                        fields[stamp_field] = time_ns() % NS_PER_DAY / 1e6
+                    on_update(self, instruments[codes[i]], fields)
+                if record_latency:
+                    latencies[index] = perf_ns() - due_ns
+                self.sent = index + 1
+
+        self.elapsed = (perf_ns() - start_ns) / 1e9
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self.on_status is not None:
+            for instrument in self.instruments:
+                self.on_status(self, instrument, {'status': 'Closed', 'code': 'SimulatedFeed'})
+
+    def get_snapshot(self):
+        return pd.DataFrame({
+            'Instrument': self.instruments,
+            self.fields[0]: self._bid,
+            self.fields[1]: self._ask,
+        })
+
+    def throughput(self):
+        return self.sent / self.elapsed if self.elapsed else 0.0
@@ -0,0 +1,86 @@
+import argparse
+import io
+import numpy as np
+
+from feed import SimulatedFeed
+from log_sink import LogSink
+
+
+class NullStream(io.TextIOBase):
+    def write(self, s):
+        return len(s)
+
+
+def eik_pricer(rics):
+    from Eik import EikonStreamingPrices
+    pricer = EikonStreamingPrices(None, sink=LogSink(stream=NullStream()), instruments=rics)
+    return pricer, pricer.display_updated_fields, ('CF_BID', 'CF_ASK')
+
+
+def eik2_pricer(rics):
+    from Eik2 import eikon_pricing, pricing
+    # Eik2 keys its book by the first six characters of the RIC
+    pricer = eikon_pricing(pricing([ric[:6] for ric in rics]), None, sink=LogSink(stream=NullStream()))
+    return pricer, pricer.on_feed_update, ('BID', 'ASK')
+
+
+PRICERS = {'eik': eik_pricer, 'eik2': eik2_pricer}
+
+
+def run_once(make_pricer, n_rics, n_ticks, rate=None, seed=0):
+    rics = [f"R{i:05d}" for i in range(n_rics)]
+    pricer, on_update, fields = make_pricer(rics)
+    feed = SimulatedFeed(rics, fields=fields, on_update=on_update, rate=rate, n_ticks=n_ticks,
+                         seed=seed, record_latency=True)
+    feed.run()
+    pricer.sink.close()
+    lat = feed.latencies_ns[:feed.sent] / 1e3
+    return {
+        'rate': rate,
+        'ticks': feed.sent,
+        'ticks_per_s': feed.throughput(),
+        'p50_us': float(np.percentile(lat, 50)),
+        'p99_us': float(np.percentile(lat, 99)),
+        'max_us': float(lat.max()),
+        # Paced runs that finish late could not keep up with the offered rate
+        'behind': bool(rate) and feed.elapsed > 1.05 * n_ticks / rate,
+        'sink_dropped': pricer.sink.dropped,
+    }
+
+
+def sustained_rate(make_pricer, n_rics, n_ticks, rates):
+    # Step the offered rate up until the pricer finishes late; return the last rate it kept up with
+    results = []
+    sustained = 0.0
+    for rate in rates:
+        result = run_once(make_pricer, n_rics, n_ticks, rate=rate)
+        results.append(result)
+        if result['behind']:
+            break
+        sustained = rate
+    return sustained, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline throughput/latency harness for the streaming pricers")
+    parser.add_argument('--pricer', choices=sorted(PRICERS), default='eik')
+    parser.add_argument('--rics', type=int, default=200)
+    parser.add_argument('--ticks', type=int, default=200_000)
+    parser.add_argument('--rates', type=float, nargs='*', default=[10_000, 50_000, 100_000, 200_000])
+    args = parser.parse_args()
+
+    make_pricer = PRICERS[args.pricer]
+    flat_out = run_once(make_pricer, args.rics, args.ticks)
+    print(f"{args.pricer}: {flat_out['ticks_per_s']:,.0f} ticks/s flat out across {args.rics} RICs "
+          f"(p50 {flat_out['p50_us']:.1f}us, p99 {flat_out['p99_us']:.1f}us)")
+
+    sustained, results = sustained_rate(make_pricer, args.rics, args.ticks, args.rates)
+    for result in results:
+        print(f"  offered {result['rate']:>10,.0f}/s -> {result['ticks_per_s']:>10,.0f}/s "
+              f"lag p50 {result['p50_us']:.1f}us p99 {result['p99_us']:.1f}us max {result['max_us']:.1f}us"
+              f"{' BEHIND' if result['behind'] else ''}")
+    print(f"Sustained: {sustained:,.0f} ticks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# Log-linear buckets in the HDR histogram style: 64 exact buckets, then 32 sub-buckets per
+# power of two, i.e. about 3% relative precision up to 2**36 ns (~68 s)
+SUB_BITS = 6
+HALF = 1 << (SUB_BITS - 1)
+N_BUCKETS = 1024
+STAGES = ('feed', 'processing', 'total')
+NS_PER_DAY = 86_400 * 1_000_000_000
+NS_PER_HOUR = 3_600 * 1_000_000_000
+
+
+def bucket_index(values):
+    values = np.maximum(np.asarray(values, dtype=np.int64), 0)
+    # bit_length via frexp is exact for the int64 range we care about
+    bits = np.frexp(values.astype(np.float64))[1].astype(np.int64)
+    shift = np.maximum(bits - SUB_BITS, 0)
+    return np.minimum(shift * HALF + (values >> shift), N_BUCKETS - 1)
+
+
+def bucket_value(index):
+    # Highest value that falls in each bucket, the figure an HDR histogram reports
+    index = np.asarray(index, dtype=np.int64)
+    shift = np.maximum(index // HALF - 1, 0)
+    mantissa = index - shift * HALF
+    return (mantissa << shift) + (1 << shift) - 1
+
+
+def source_ns(fields, field, now_ns):
+    """Source timestamp of an update as epoch ns, or 0 when `field` is missing or empty.
+
+    `field` is a quote-time field in milliseconds since UTC midnight, as Eikon's QUOTIM_MS
+    carries (fractions are kept); an update stamped just before midnight and received after it belongs to the
+    previous day.
+    """
+    value = fields.get(field) if field else None
+    if value is None or value != value:
+        return 0
+    ts_ns = now_ns - now_ns % NS_PER_DAY + int(value * 1_000_000)
+    return ts_ns - NS_PER_DAY if ts_ns > now_ns + NS_PER_HOUR else ts_ns
+
+
+class LatencyRecorder:
+    """Per-RIC latency histograms for source -> callback entry -> processing complete.
+
+    `record` only stores four integers into a preallocated buffer; every `batch` ticks the
+    buffer is folded into the histograms with a few vectorized NumPy calls, and `summary`
+    folds whatever is pending. Pass src_ns=0 when the update carries no source timestamp;
+    those ticks count towards processing only, are counted in `no_source`, and the
+    periodic report warns about them.
+    """
+
+    def __init__(self, instruments, batch=1024):
+        self.instruments = list(instruments)
+        n = len(self.instruments)
+        self.counts = {stage: np.zeros((n, N_BUCKETS), dtype=np.int64) for stage in STAGES}
+        self.max_ns = {stage: np.zeros(n, dtype=np.int64) for stage in STAGES}
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.no_source = 0
+        self.batch = batch
+        self._row = np.zeros(batch, dtype=np.int64)
+        self._src = np.zeros(batch, dtype=np.int64)
+        self._entry = np.zeros(batch, dtype=np.int64)
+        self._done = np.zeros(batch, dtype=np.int64)
+        self._n = 0
+        # The feed thread records, the report thread folds and reads
+        self._lock = threading.Lock()
+        self._reporter = None
+        self._stop = threading.Event()
+        self._last_ticks = self.ticks.copy()
+        self._last_no_source = 0
+        self._last_report = time.perf_counter()
+
+    def record(self, row, src_ns, entry_ns, done_ns):
+        with self._lock:
+            n = self._n
+            self._row[n] = row
+            self._src[n] = src_ns
+            self._entry[n] = entry_ns
+            self._done[n] = done_ns
+            self._n = n + 1
+            if n + 1 == self.batch:
+                self._fold()
+
+    def fold(self):
+        with self._lock:
+            self._fold()
+
+    def _fold(self):
+        n = self._n
+        if not n:
+            return
+        row, src, entry, done = self._row[:n], self._src[:n], self._entry[:n], self._done[:n]
+        has_src = src > 0
+        samples = {
+            'feed': (row[has_src], entry[has_src] - src[has_src]),
+            'processing': (row, done - entry),
+            'total': (row[has_src], done[has_src] - src[has_src]),
+        }
+        for stage, (rows, values) in samples.items():
+            np.add.at(self.counts[stage], (rows, bucket_index(values)), 1)
+            np.maximum.at(self.max_ns[stage], rows, values)
+        np.add.at(self.ticks, row, 1)
+        self.no_source += n - int(has_src.sum())
+        self._n = 0
+
+    def percentiles(self, stage='total', quantiles=(50, 99, 99.9)):
+        counts = self.counts[stage]
+        totals = counts.sum(axis=1)
+        cumulative = np.cumsum(counts, axis=1)
+        values = bucket_value(np.arange(N_BUCKETS))
+        frame = pd.DataFrame({'count': totals}, index=pd.Index(self.instruments, name='ric'))
+        for q in quantiles:
+            target = np.ceil(totals * q / 100.0).astype(np.int64)
+            # First bucket whose cumulative count reaches the target rank, per row
+            index = (cumulative < np.maximum(target, 1)[:, None]).sum(axis=1)
+            frame[f"p{q:g}_us"] = np.where(totals > 0, values[np.minimum(index, N_BUCKETS - 1)] / 1e3, np.nan)
+        frame['max_us'] = np.where(totals > 0, self.max_ns[stage] / 1e3, np.nan)
+        return frame
+
+    def summary(self, stage='total'):
+        with self._lock:
+            self._fold()
+            now = time.perf_counter()
+            frame = self.percentiles(stage)
+            ticks = self.ticks.copy()
+        elapsed = now - self._last_report
+        frame['ticks_per_s'] = (ticks - self._last_ticks) / elapsed if elapsed > 0 else np.nan
+        self._last_ticks = ticks
+        self._last_report = now
+        return frame
+
+    def _report_loop(self, interval, sink, stage):
+        while not self._stop.wait(interval):
+            frame = self.summary(stage)
+            no_source, self._last_no_source = self.no_source - self._last_no_source, self.no_source
+            if no_source:
+                sink.log("latency: {} ticks without a source timestamp; feed/total latency covers only the rest",
+                         no_source)
+            active = frame[frame['count'] > 0]
+            for ric, row in active.iterrows():
+                sink.log("{} latency[{}]: p50 {:.1f}us p99 {:.1f}us p99.9 {:.1f}us max {:.1f}us, {:.0f} ticks/s",
+                         ric, stage, row['p50_us'], row['p99_us'], row['p99.9_us'], row['max_us'], row['ticks_per_s'])
+
+    def start_reporting(self, sink, interval=10.0, stage='processing'):
+        if self._reporter is None:
+            self._stop.clear()
+            self._reporter = threading.Thread(target=self._report_loop, args=(interval, sink, stage),
+                                              name='LatencyReporter', daemon=True)
+            self._reporter.start()
+
+    def stop_reporting(self):
+        self._stop.set()
+        if self._reporter is not None:
+            self._reporter.join()
+            self._reporter = None
@@ -0,0 +1,142 @@
+import bisect
+from collections.abc import Mapping
+
+import numpy as np
+
+
+class LevelIndex(Mapping):
+    """Support or resistance levels kept sorted by price, merging pivots within a pip tolerance.
+
+    Reads like the {price: {'count', 'time'}} dicts srf.support_levels/resistance_levels
+    have been, so code iterating `.items()` keeps working. `add` folds a new pivot into the
+    nearest level if it lies within `tolerance_pips` (count + 1, price moves to the
+    count-weighted mean, time stays the first touch) and inserts a new level otherwise.
+    Nearest and range queries are binary searches; `confluent` filters by count over
+    arrays cached until the next change.
+    """
+
+    def __init__(self, tolerance_pips=1.0, pip=0.0001):
+        self.tolerance = tolerance_pips * pip
+        self.pip = pip
+        self._prices = []
+        self._details = []
+        self._arrays = None
+
+    @classmethod
+    def from_levels(cls, levels, tolerance_pips=1.0, pip=0.0001):
+        """Builds an index from a {price: {'count', 'time'}} dict, merging levels within tolerance."""
+        index = cls(tolerance_pips, pip)
+        for price, details in sorted(levels.items()):
+            index.add(price, details['time'], details['count'])
+        return index
+
+    def __len__(self):
+        return len(self._prices)
+
+    def __iter__(self):
+        return iter(list(self._prices))
+
+    def __getitem__(self, price):
+        position = bisect.bisect_left(self._prices, price)
+        if position < len(self._prices) and self._prices[position] == price:
+            return self._details[position]
+        raise KeyError(price)
+
+    def items(self):
+        return list(zip(self._prices, self._details))
+
+    def _nearest_position(self, price):
+        position = bisect.bisect_left(self._prices, price)
+        candidates = [p for p in (position - 1, position) if 0 <= p < len(self._prices)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda p: abs(self._prices[p] - price))
+
+    def add(self, price, time, count=1):
+        """Records `count` touches of `price` at `time`; returns the level price it now counts toward."""
+        self._arrays = None
+        position = self._nearest_position(price)
+        if position is not None and abs(self._prices[position] - price) <= self.tolerance:
+            # The mean lies between the level and the new price, and no other level is in
+            # between (this one is the nearest), so the list stays sorted
+            self._merge_into(position, price, count, time)
+        else:
+            position = bisect.bisect_left(self._prices, price)
+            self._prices.insert(position, price)
+            self._details.insert(position, {'count': count, 'time': time})
+        # A level that moved may now be within tolerance of a neighbour; fold those in too,
+        # so levels always stay more than the tolerance apart
+        while True:
+            if position + 1 < len(self._prices) and self._prices[position + 1] - self._prices[position] <= self.tolerance:
+                neighbour = position + 1
+            elif position > 0 and self._prices[position] - self._prices[position - 1] <= self.tolerance:
+                neighbour = position - 1
+            else:
+                return self._prices[position]
+            price, details = self._prices.pop(neighbour), self._details.pop(neighbour)
+            position = min(position, neighbour)
+            self._merge_into(position, price, details['count'], details['time'])
+
+    def _merge_into(self, position, price, count, time):
+        details = self._details[position]
+        total = details['count'] + count
+        self._prices[position] = (self._prices[position] * details['count'] + price * count) / total
+        details['count'] = total
+        if time is not None and (details['time'] is None or time < details['time']):
+            details['time'] = time
+
+    def nearest(self, price):
+        """(level, details) closest to `price`, or None when empty."""
+        position = self._nearest_position(price)
+        return None if position is None else (self._prices[position], self._details[position])
+
+    def between(self, low, high):
+        """(level, details) pairs with low <= level <= high, in price order."""
+        start = bisect.bisect_left(self._prices, low)
+        end = bisect.bisect_right(self._prices, high)
+        return list(zip(self._prices[start:end], self._details[start:end]))
+
+    def within(self, price, pips):
+        """Levels no more than `pips` away from `price`."""
+        return self.between(price - pips * self.pip, price + pips * self.pip)
+
+    def below(self, price, n=1):
+        """The `n` highest levels under `price` (nearest support first)."""
+        end = bisect.bisect_left(self._prices, price)
+        return list(zip(self._prices[max(end - n, 0):end], self._details[max(end - n, 0):end]))[::-1]
+
+    def above(self, price, n=1):
+        """The `n` lowest levels over `price` (nearest resistance first)."""
+        start = bisect.bisect_right(self._prices, price)
+        return list(zip(self._prices[start:start + n], self._details[start:start + n]))
+
+    def arrays(self):
+        """Prices, counts and first-touch times as arrays in price order, rebuilt only after a change."""
+        if self._arrays is None:
+            self._arrays = (np.array(self._prices, dtype=float),
+                            np.array([details['count'] for details in self._details], dtype=np.int64),
+                            np.array([details['time'] for details in self._details], dtype=object))
+        return self._arrays
+
+    def confluent(self, min_count):
+        """(prices, counts, times) of the levels touched at least `min_count` times."""
+        prices, counts, times = self.arrays()
+        keep = counts >= min_count
+        return prices[keep], counts[keep], times[keep]
+
+
+class LevelRecorder:
+    """Feeds confirmed pivots into support/resistance indexes: pivot lows are support, highs resistance.
+
+    Pass as PivotTracker's `on_confirm`, so levels grow incrementally as bars arrive.
+    """
+
+    def __init__(self, support, resistance):
+        self.support = support
+        self.resistance = resistance
+
+    def __call__(self, time, pivot_high, pivot_low):
+        if not np.isnan(pivot_high):
+            self.resistance.add(pivot_high, time)
+        if not np.isnan(pivot_low):
+            self.support.add(pivot_low, time)
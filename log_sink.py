@@ -0,0 +1,124 @@
+import atexit
+import collections
+import sys
+import threading
+
+POLICIES = ('drop', 'drop_oldest', 'sample')
+
+
+class LogSink:
+    """Bounded in-memory log queue drained by a background writer thread.
+
+    `log` only appends a (template, args) record; formatting and I/O happen on the
+    writer thread, in batches, so tick callbacks never block on stdout. Mutable dict and
+    list arguments are copied when logged, so the line shows the values at the call.
+    After `close`, records are written synchronously instead of queued.
+    """
+
+    def __init__(self, stream=None, maxsize=100_000, policy='drop', sample_every=100,
+                 batch_size=1024, flush_interval=0.05):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {POLICIES}")
+        self.stream = stream if stream is not None else sys.stdout
+        self.maxsize = maxsize
+        self.policy = policy
+        self.sample_every = max(1, int(sample_every))
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.emitted = 0
+        self.dropped = 0
+        self._overflow = 0
+        self._queue = collections.deque()
+        # _lock guards the queue and counters; _write_lock keeps the writer thread and flush()
+        # from interleaving batches on the stream
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name='LogSinkWriter', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def log(self, template, *args):
+        # Snapshot mutable arguments (e.g. a tick's fields dict) so later changes don't leak into the line
+        args = tuple(dict(arg) if isinstance(arg, dict) else list(arg) if isinstance(arg, list) else arg for arg in args)
+        if self._closed:
+            self._write([(template, args)])
+            return
+        with self._lock:
+            queue = self._queue
+            if len(queue) >= self.maxsize:
+                self._overflow += 1
+                if self.policy == 'drop' or (self.policy == 'sample' and self._overflow % self.sample_every):
+                    self.dropped += 1
+                    return
+                # drop_oldest, or the sampled record that makes it through under 'sample'
+                if queue:
+                    queue.popleft()
+                    self.dropped += 1
+            queue.append((template, args))
+            wake = len(queue) >= self.batch_size
+        if wake:
+            self._wakeup.set()
+
+    def stats(self):
+        with self._lock:
+            return {'emitted': self.emitted, 'dropped': self.dropped, 'queued': len(self._queue)}
+
+    def _write(self, records):
+        lines = []
+        for template, args in records:
+            try:
+                lines.append(template.format(*args))
+            except Exception as e:
+                lines.append(f"<unformattable log record {template!r}: {e}>")
+        lines.append('')
+        with self._write_lock:
+            self.stream.write('\n'.join(lines))
+            self.stream.flush()
+        with self._lock:
+            self.emitted += len(records)
+
+    def _drain(self):
+        with self._write_lock:
+            with self._lock:
+                queue = self._queue
+                records = [queue.popleft() for _ in range(min(len(queue), self.batch_size))]
+            if not records:
+                return 0
+            try:
+                self._write(records)
+            except Exception:
+                with self._lock:
+                    self.dropped += len(records)
+                raise
+        return len(records)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                while self._drain() and not self._closed:
+                    pass
+            except Exception:
+                # A broken stream must not kill the writer; the records are counted as dropped
+                with self._lock:
+                    self.dropped += len(self._queue)
+                    self._queue.clear()
+
+    def flush(self):
+        while self._drain():
+            pass
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join(timeout=1.0)
+        try:
+            self.flush()
+        except Exception:
+            pass
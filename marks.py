@@ -0,0 +1,175 @@
+import collections
+import math
+import re
+import time
+import numpy as np
+
+PairSpec = collections.namedtuple('PairSpec', ['pair', 'base', 'quote', 'pip', 'pips_per_unit', 'digits', 'contract'])
+
+CONTRACT_SIZE = 1_000_000  # trade sizes are in millions of the base currency
+# Starting mids for the manual and simulated sources
+DEFAULT_MARKS = {
+    'AUDUSD': 0.6650, 'EURUSD': 1.0850, 'GBPUSD': 1.2700, 'USDCAD': 1.3600, 'USDJPY': 150.00,
+    'USDCHF': 0.8800, 'NZDUSD': 0.6100, 'EURGBP': 0.8550, 'EURJPY': 162.80, 'GBPJPY': 190.50,
+}
+
+
+def pair_spec(pair):
+    quote = pair[3:6]
+    # JPY quotes to 2 decimals a pip (0.01) and 3 digits, everything else to 4 and 5
+    pips_per_unit = 100 if quote == 'JPY' else 10000
+    return PairSpec(pair, pair[:3], quote, 1.0 / pips_per_unit, pips_per_unit, 3 if quote == 'JPY' else 5, CONTRACT_SIZE)
+
+
+class ManualMarks:
+    """Price source backed by a dict the user edits."""
+
+    def __init__(self, marks=None):
+        self.values = dict(DEFAULT_MARKS if marks is None else marks)
+
+    def marks(self):
+        return dict(self.values)
+
+
+class SimulatedMarks:
+    """Local random-walk mids for trying the dashboard without a feed.
+
+    Every call advances each pair by the wall time elapsed since the last one, at
+    `volatility` (relative, per square-root second).
+    """
+
+    def __init__(self, marks=None, volatility=2e-5, seed=None):
+        self.values = dict(DEFAULT_MARKS if marks is None else marks)
+        self.volatility = volatility
+        self._rng = np.random.default_rng(seed)
+        self._last = time.monotonic()
+
+    def marks(self):
+        now = time.monotonic()
+        scale = self.volatility * math.sqrt(max(now - self._last, 0.0))
+        self._last = now
+        shocks = self._rng.standard_normal(len(self.values)) * scale
+        for (pair, mid), shock in zip(list(self.values.items()), shocks.tolist()):
+            self.values[pair] = mid * (1.0 + shock)
+        return dict(self.values)
+
+
+# Single-currency RICs, as Eik.py streams them, quote the currency against USD in market convention
+RIC_PAIRS = {
+    'AUD=': 'AUDUSD', 'EUR=': 'EURUSD', 'GBP=': 'GBPUSD', 'NZD=': 'NZDUSD', 'JPY=': 'USDJPY',
+    'CAD=': 'USDCAD', 'CHF=': 'USDCHF', 'SGD=': 'USDSGD', 'NOK=': 'USDNOK', 'SEK=': 'USDSEK',
+}
+PAIR_RIC = re.compile(r'[A-Z]{6}(=.*)?')
+
+
+def ric_pair(ric, ric_pairs=RIC_PAIRS):
+    """The pair a board row or RIC names: 'AUD=' -> AUDUSD via `ric_pairs`, 'AUDUSD=R' or 'AUDUSD' as is; else None."""
+    if ric in ric_pairs:
+        return ric_pairs[ric]
+    if PAIR_RIC.fullmatch(ric):
+        return ric[:6]
+    return None
+
+
+class BoardMarks:
+    """Mids from a shared quote board (shared_board.SharedBoardReader) published by a streaming process.
+
+    Board rows are keyed by RIC or ccy, in either streaming class's style, and mapped to pairs
+    with ric_pair; rows that map to no pair are left out and listed in `unmapped`. Rows that
+    have not ticked yet are skipped.
+    """
+
+    def __init__(self, reader, ric_pairs=RIC_PAIRS):
+        self.reader = reader
+        pairs = [ric_pair(name, ric_pairs) for name in reader.instruments]
+        self.unmapped = [name for name, pair in zip(reader.instruments, pairs) if pair is None]
+        self.rows = np.array([row for row, pair in enumerate(pairs) if pair is not None], dtype=np.int64)
+        self.pairs = [pair for pair in pairs if pair is not None]
+
+    def marks(self):
+        snapshot = self.reader.snapshot()
+        return {pair: float(mid) for pair, mid, seq in zip(self.pairs, snapshot['mid'][self.rows].tolist(),
+                                                           snapshot['seq'][self.rows].tolist()) if seq}
+
+
+class MarkTable:
+    """Per-pair mids pulled from a pluggable price source, plus pip and contract metadata.
+
+    A source is any object with a `marks()` method returning {pair: mid}. `refresh` pulls
+    from it at most every `min_interval` seconds, so several readers in one tick share a
+    pull; `version` changes whenever the mids do.
+    """
+
+    def __init__(self, pairs, source=None, min_interval=0.25):
+        self.pairs = list(pairs)
+        self.index = {pair: i for i, pair in enumerate(self.pairs)}
+        self.specs = [pair_spec(pair) for pair in self.pairs]
+        self.mids = np.full(len(self.pairs), np.nan)
+        self.source = source if source is not None else ManualMarks()
+        self.min_interval = min_interval
+        self.version = 0
+        self._refreshed = -math.inf
+
+    def set_source(self, source):
+        if source is not self.source:
+            self.source = source
+            self._refreshed = -math.inf
+
+    def _row(self, pair):
+        row = self.index.get(pair)
+        if row is None:
+            row = self.index[pair] = len(self.pairs)
+            self.pairs.append(pair)
+            self.specs.append(pair_spec(pair))
+            self.mids = np.append(self.mids, np.nan)
+        return row
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._refreshed < self.min_interval:
+            return False
+        self._refreshed = now
+        changed = False
+        for pair, mid in self.source.marks().items():
+            row = self._row(pair)
+            # A source without a usable quote (None, 0, NaN, inf) leaves the last mark in place
+            if mid is not None and math.isfinite(mid) and mid > 0 and mid != self.mids[row]:
+                self.mids[row] = mid
+                changed = True
+        if changed:
+            self.version += 1
+        return changed
+
+    def mark(self, pair):
+        return float(self.mids[self._row(pair)])
+
+    def spec(self, pair):
+        return self.specs[self._row(pair)]
+
+    def usd_per(self, currency):
+        # Value of one unit of `currency` in USD, from whichever USD pair the table has
+        if currency == 'USD':
+            return 1.0
+        direct = self.index.get(currency + 'USD')
+        if direct is not None and not np.isnan(self.mids[direct]):
+            return float(self.mids[direct])
+        inverse = self.index.get('USD' + currency)
+        if inverse is not None and not np.isnan(self.mids[inverse]):
+            return 1.0 / float(self.mids[inverse])
+        return np.nan
+
+    def pip_value(self, pair):
+        """USD value of one pip on one contract (1M base) at the current marks; $100 for XXXUSD."""
+        spec = self.spec(pair)
+        per_pip = spec.contract / spec.pips_per_unit
+        if spec.quote == 'USD':
+            return per_pip
+        return per_pip * self.usd_per(spec.quote)
+
+    def arrays(self, pairs, codes):
+        """Mark, pips per price unit and USD pip value per trade, for trades given as codes into `pairs`."""
+        rows = np.array([self._row(pair) for pair in pairs], dtype=np.int64)
+        mids = self.mids[rows]
+        pips_per_unit = np.array([self.specs[row].pips_per_unit for row in rows.tolist()], dtype=float)
+        pip_values = np.array([self.pip_value(pair) for pair in pairs], dtype=float)
+        return mids[codes], pips_per_unit[codes], pip_values[codes]
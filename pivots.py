@@ -0,0 +1,124 @@
+import collections
+import numpy as np
+import pandas as pd
+
+
+def _centered_extreme(values, left_bars, right_bars, how):
+    # Max/min over [i - left_bars, i + right_bars] at every i, NaN where the window runs off
+    # either end; pandas' rolling max/min is a single O(n) pass whatever the window
+    window = left_bars + right_bars + 1
+    rolled = getattr(pd.Series(values).rolling(window, min_periods=window), how)().to_numpy()
+    centered = np.full(len(values), np.nan)
+    centered[:len(values) - right_bars] = rolled[right_bars:]
+    return centered
+
+
+def pivot_columns(high, low, left_bars, right_bars):
+    """pivot_high/pivot_low for whole High/Low arrays in one pass.
+
+    Bar i is a pivot high when its High is the highest of the `left_bars` bars before it,
+    itself and the `right_bars` bars after it (ties count); the column holds that High, NaN
+    elsewhere. Pivot lows likewise with Low and the lowest. Bars without a full window on
+    both sides are never pivots.
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    pivot_high = np.where(high == _centered_extreme(high, left_bars, right_bars, 'max'), high, np.nan)
+    pivot_low = np.where(low == _centered_extreme(low, left_bars, right_bars, 'min'), low, np.nan)
+    return pivot_high, pivot_low
+
+
+def add_pivots(df, left_bars, right_bars):
+    """Fills df['pivot_high'] and df['pivot_low'] from its High/Low columns."""
+    df['pivot_high'], df['pivot_low'] = pivot_columns(df['High'].to_numpy(), df['Low'].to_numpy(), left_bars, right_bars)
+    return df
+
+
+class _WindowExtreme:
+    # Monotonic deque over the last `window` values: amortized O(1) per bar for the window max
+    # (or min, with sign=-1)
+    __slots__ = ('window', 'sign', 'items')
+
+    def __init__(self, window, sign):
+        self.window = window
+        self.sign = sign
+        self.items = collections.deque()
+
+    def push(self, position, value):
+        keyed = self.sign * value
+        while self.items and self.items[-1][1] <= keyed:
+            self.items.pop()
+        self.items.append((position, keyed))
+        while self.items[0][0] <= position - self.window:
+            self.items.popleft()
+
+    def extreme(self):
+        return self.sign * self.items[0][1]
+
+
+class PivotTracker:
+    """Confirms pivots as bars arrive, with the same result as pivot_columns.
+
+    A bar can only be confirmed once `right_bars` later bars exist, so each new bar settles
+    exactly one earlier bar, `right_bars` back, from the extremes of the last
+    left_bars + right_bars + 1 bars. Those are kept in monotonic deques, so a bar costs
+    O(1) amortized however wide the window is.
+
+    Called as `on_append(srf, timestamp)` (see bars.FrameAppender), it catches up on any
+    bars in srf.df it has not seen yet and writes the confirmed pivot_high/pivot_low cells,
+    then passes each confirmed bar to `on_confirm(time, pivot_high, pivot_low)` if given.
+    """
+
+    def __init__(self, left_bars, right_bars, on_confirm=None):
+        self.left_bars = left_bars
+        self.right_bars = right_bars
+        self.on_confirm = on_confirm
+        self.count = 0
+        self._highs = collections.deque(maxlen=right_bars + 1)
+        self._lows = collections.deque(maxlen=right_bars + 1)
+        self._max = _WindowExtreme(left_bars + right_bars + 1, 1)
+        self._min = _WindowExtreme(left_bars + right_bars + 1, -1)
+        self._high_nan = self._low_nan = -np.inf
+
+    def update(self, high, low):
+        """Adds one bar; returns (position, pivot_high, pivot_low) of the bar it confirms, or None."""
+        position = self.count
+        self.count += 1
+        self._highs.append(high)
+        self._lows.append(low)
+        if np.isnan(high):
+            self._high_nan = position
+        else:
+            self._max.push(position, high)
+        if np.isnan(low):
+            self._low_nan = position
+        else:
+            self._min.push(position, low)
+        candidate = position - self.right_bars
+        if candidate < self.left_bars:
+            return None
+        # As in pivot_columns, a window with a missing price has no pivot
+        window_start = candidate - self.left_bars
+        candidate_high, candidate_low = self._highs[0], self._lows[0]
+        pivot_high = candidate_high if self._high_nan < window_start and candidate_high == self._max.extreme() else np.nan
+        pivot_low = candidate_low if self._low_nan < window_start and candidate_low == self._min.extreme() else np.nan
+        return candidate, pivot_high, pivot_low
+
+    def __call__(self, srf, timestamp=None):
+        df = srf.df
+        for column in ('pivot_high', 'pivot_low'):
+            if column not in df.columns:
+                df[column] = np.nan
+        if self.count >= len(df):
+            return
+        pivot_high_col, pivot_low_col = df.columns.get_loc('pivot_high'), df.columns.get_loc('pivot_low')
+        highs = df['High'].to_numpy(dtype=float)
+        lows = df['Low'].to_numpy(dtype=float)
+        for position in range(self.count, len(df)):
+            confirmed = self.update(highs[position], lows[position])
+            if confirmed is not None:
+                row, pivot_high, pivot_low = confirmed
+                df.iat[row, pivot_high_col] = pivot_high
+                df.iat[row, pivot_low_col] = pivot_low
+                if self.on_confirm is not None:
+                    self.on_confirm(df.index[row], pivot_high, pivot_low)
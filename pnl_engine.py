@@ -0,0 +1,91 @@
+import numpy as np
+
+PIP_MULTIPLIER = 10000
+DOLLARS_PER_PIP_PER_MILLION = 100
+
+
+def pnl(entry_price, exit_price, direction, size, pips_per_unit=PIP_MULTIPLIER, pip_value=DOLLARS_PER_PIP_PER_MILLION):
+    # Same operation order as dashboard.calculate_pnl, so results match it bit for bit
+    return (exit_price - entry_price) * direction * pips_per_unit * pip_value * size
+
+
+def columns_from_groups(trade_groups):
+    """Flattens the group/trade dicts into one set of columns, in display order."""
+    group, entry, size, direction, is_open, close = [], [], [], [], [], []
+    initial_direction = np.zeros(len(trade_groups))
+    for group_index, g in enumerate(trade_groups):
+        trades = g['trades']
+        if trades:
+            initial_direction[group_index] = 1.0 if trades[0]['type'] == 'Long' else -1.0
+        for trade in trades:
+            group.append(group_index)
+            entry.append(float(trade['entryPrice']))
+            size.append(float(trade['size']))
+            direction.append(1.0 if trade['type'] == 'Long' else -1.0)
+            is_open.append(trade['result'] == 'Open')
+            close.append(float(trade['closePrice']) if trade['result'] == 'Closed' else np.nan)
+    return {
+        'group': np.array(group, dtype=np.int64),
+        'entry': np.array(entry, dtype=float),
+        'size': np.array(size, dtype=float),
+        'direction': np.array(direction, dtype=float),
+        'is_open': np.array(is_open, dtype=bool),
+        'close': np.array(close, dtype=float),
+        'initial_direction': initial_direction,
+        'n_groups': len(trade_groups),
+    }
+
+
+def _group_sum(group, values, n_groups):
+    # bincount adds in input order, like the sequential sum() of the scalar path
+    return np.bincount(group, weights=values, minlength=n_groups)
+
+
+def compute_book_pnl(columns, mark_price, pips_per_unit=PIP_MULTIPLIER, pip_value=DOLLARS_PER_PIP_PER_MILLION):
+    """Realized/unrealized PnL per trade and per group, plus book totals, in one vectorized pass.
+
+    `mark_price`, `pips_per_unit` and `pip_value` (USD per pip per million) are scalars or one
+    value per trade; the defaults are the USD-quoted pair convention. Per-trade display PnL follows the
+    dashboard's rule: trades against the group's initial direction are realized against the
+    group's weighted average price, the rest are marked to market.
+    """
+    group = columns['group']
+    entry = columns['entry']
+    size = columns['size']
+    direction = columns['direction']
+    is_open = columns['is_open']
+    n_groups = columns['n_groups']
+    mark = np.broadcast_to(np.asarray(mark_price, dtype=float), entry.shape)
+
+    signed_size = size * direction
+    open_size = _group_sum(group, np.where(is_open, signed_size, 0.0), n_groups)
+    open_weighted = _group_sum(group, np.where(is_open, entry * size * direction, 0.0), n_groups)
+    nonzero = open_size != 0
+    weighted_avg = np.divide(open_weighted, open_size, out=np.zeros(n_groups), where=nonzero)
+
+    marked = pnl(entry, mark, direction, size, pips_per_unit, pip_value)
+    realized_trade = np.where(is_open, 0.0, pnl(entry, np.where(is_open, entry, columns['close']), direction, size, pips_per_unit, pip_value))
+    unrealized_trade = np.where(is_open, marked, 0.0)
+    realized = _group_sum(group, realized_trade, n_groups)
+    unrealized = _group_sum(group, unrealized_trade, n_groups)
+    total = realized + unrealized
+
+    initial = columns['initial_direction'][group]
+    opposite = direction != initial
+    display_pnl = np.where(opposite, pnl(weighted_avg[group], entry, initial, size, pips_per_unit, pip_value), marked)
+
+    return {
+        'realized_trade': realized_trade,
+        'unrealized_trade': unrealized_trade,
+        'display_pnl': display_pnl,
+        'display_realized': opposite,
+        'group_open_size': open_size,
+        'group_weighted_avg': weighted_avg,
+        'group_realized': realized,
+        'group_unrealized': unrealized,
+        'group_total': total,
+        # Python's sum over the group list, in the same order as the scalar metrics
+        'total_pnl': sum(total.tolist()),
+        'realized_pnl': sum(realized.tolist()),
+        'unrealized_pnl': sum(unrealized.tolist()),
+    }
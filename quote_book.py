@@ -0,0 +1,101 @@
+import time
+import numpy as np
+
+QUOTE_DTYPE = np.dtype([
+    ('bid', 'f8'),
+    ('ask', 'f8'),
+    ('mid', 'f8'),
+    ('ts_ns', 'i8'),
+    ('seq', 'i8'),
+])
+
+
+class QuoteBook:
+    """Preallocated bid/ask board with one row per instrument.
+
+    `seq` is a per-row seqlock: odd while an update is being written, even once it is
+    stable, so seq // 2 is the row's update count. With `shared_name` the board lives in
+    a multiprocessing.shared_memory segment that shared_board.SharedBoardReader can
+    read from other processes. `attach=True` maps an existing shared board for writing
+    instead (e.g. a shard worker that owns a subset of the rows).
+    """
+
+    def __init__(self, instruments=None, shared_name=None, attach=False):
+        self.shm = None
+        self._owner = False
+        if shared_name and attach:
+            from shared_board import attach_board
+            self.shm, instruments, self.quotes = attach_board(shared_name)
+        elif shared_name:
+            from shared_board import create_board
+            self.shm, self.quotes = create_board(shared_name, instruments)
+            self._owner = True
+        else:
+            self.quotes = np.zeros(len(instruments), dtype=QUOTE_DTYPE)
+        self.instruments = list(instruments)
+        # RIC -> row, built once; tick handlers only ever index into it
+        self.index = {inst: row for row, inst in enumerate(self.instruments)}
+        # Per-field views so a tick writes scalars in place without touching records
+        self._bid = self.quotes['bid']
+        self._ask = self.quotes['ask']
+        self._mid = self.quotes['mid']
+        self._ts_ns = self.quotes['ts_ns']
+        self._seq = self.quotes['seq']
+
+    def __len__(self):
+        return len(self.instruments)
+
+    def __contains__(self, instrument_name):
+        return instrument_name in self.index
+
+    def __getitem__(self, instrument_name):
+        row = self.index[instrument_name]
+        return float(self._bid[row]), float(self._ask[row])
+
+    def update(self, instrument_name, bid=None, ask=None, ts_ns=None):
+        return self.update_row(self.index[instrument_name], bid, ask, ts_ns)
+
+    def update_row(self, row, bid=None, ask=None, ts_ns=None):
+        # A missing side keeps its last value, matching the partial field updates the feed sends
+        seq = self._seq
+        seq[row] += 1
+        if bid is not None:
+            self._bid[row] = bid
+        if ask is not None:
+            self._ask[row] = ask
+        self._mid[row] = (self._bid[row] + self._ask[row]) * 0.5
+        self._ts_ns[row] = time.time_ns() if ts_ns is None else ts_ns
+        seq[row] += 1
+        return row
+
+    def last(self, row):
+        return float(self._bid[row]), float(self._ask[row]), int(self._ts_ns[row])
+
+    def bid(self, instrument_name):
+        return float(self._bid[self.index[instrument_name]])
+
+    def ask(self, instrument_name):
+        return float(self._ask[self.index[instrument_name]])
+
+    def view(self):
+        # Zero-copy view of the whole board; callers must not hold it across ticks expecting a snapshot
+        return self.quotes
+
+    def snapshot(self):
+        if self.shm is not None:
+            # Other processes may be writing rows (shard workers); honour their seqlocks
+            from shared_board import consistent_snapshot
+            return consistent_snapshot(self.quotes)
+        return self.quotes.copy()
+
+    def close(self):
+        if self.shm is not None:
+            # Drop our views first; SharedMemory refuses to close while they are alive
+            self.quotes = self._bid = self._ask = self._mid = self._ts_ns = self._seq = None
+            self.shm.close()
+            if self._owner:
+                self.shm.unlink()
+            self.shm = None
+
+    def to_dict(self):
+        return {inst: [float(self._bid[row]), float(self._ask[row])] for inst, row in self.index.items()}
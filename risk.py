@@ -0,0 +1,130 @@
+import numpy as np
+
+DEFAULT_SHOCK_PIPS = np.arange(-200, 201, 10)
+
+
+class RiskEngine:
+    """Net currency exposure and shock-scenario revaluation of the open book.
+
+    Open trades are reduced to two numbers per pair, the net size (sum of direction * size)
+    and the net cost (the same weighted by entry price), so the book's value at any set of
+    mids is (mid * size - cost) * contract * USD per quote currency, summed over pairs. The
+    scenario grid shocks one pair at a time by each of `shock_pips` and revalues every
+    pair at once, including the pip value of pairs quoted in the shocked currency, in a
+    single array expression over (shocked pair, shock, pair); its cost does not depend on
+    the number of trades.
+
+    `sync` re-reduces a TradeStore when its version changes; `apply_trade` updates the
+    per-pair sums in place for callers that track trades one at a time. A caller that
+    applies every change it makes to a store can then `mark_synced`, so `sync` only
+    rebuilds when someone else changed the store in between.
+    """
+
+    def __init__(self, mark_table, shock_pips=DEFAULT_SHOCK_PIPS):
+        self.marks = mark_table
+        self.shock_pips = np.asarray(shock_pips, dtype=float)
+        self.net_size = np.zeros(len(mark_table.pairs))
+        self.net_cost = np.zeros(len(mark_table.pairs))
+        self.version = 0
+        self._synced = None
+        self._grid = None
+
+    def _fit(self):
+        # The mark table adds rows for pairs it has not seen; keep the sums the same length
+        missing = len(self.marks.pairs) - len(self.net_size)
+        if missing > 0:
+            self.net_size = np.append(self.net_size, np.zeros(missing))
+            self.net_cost = np.append(self.net_cost, np.zeros(missing))
+
+    def apply_trade(self, pair, direction, size, entry, sign=1):
+        """Adds (sign=1) or removes (sign=-1) one open trade."""
+        self.marks.spec(pair)
+        self._fit()
+        row = self.marks.index[pair]
+        self.net_size[row] += sign * direction * size
+        self.net_cost[row] += sign * direction * size * entry
+        self.version += 1
+
+    def in_sync(self, store):
+        """True if the sums reflect `store` as it is now."""
+        return self._synced == (id(store), store.version)
+
+    def mark_synced(self, store):
+        """Records that the sums reflect `store` now, after its changes were applied with apply_trade."""
+        self._synced = (id(store), store.version)
+
+    def sync(self, store):
+        """Rebuilds the per-pair sums from a TradeStore's open trades if it changed since the last call."""
+        key = (id(store), store.version)
+        if key == self._synced:
+            return False
+        rows = store.rows[:store.n]
+        open_rows = rows[rows['live'] & (rows['result'] == 0)]
+        rows_of_pairs = np.array([self.marks.index[spec.pair] for spec in map(self.marks.spec, store.pairs)], dtype=np.int64)
+        self._fit()
+        mark_rows = rows_of_pairs[open_rows['pair']] if len(rows_of_pairs) else np.zeros(0, dtype=np.int64)
+        signed = open_rows['direction'] * open_rows['size']
+        self.net_size = np.bincount(mark_rows, weights=signed, minlength=len(self.marks.pairs)).astype(float)
+        self.net_cost = np.bincount(mark_rows, weights=signed * open_rows['entry'], minlength=len(self.marks.pairs)).astype(float)
+        self._synced = key
+        self.version += 1
+        return True
+
+    def _quote_rates(self, mids):
+        # USD per unit of each pair's quote currency, read off `mids` (..., pairs) so shocked
+        # scenarios convert at their own prices; NaN where no USD pair prices the currency
+        rates = np.full(mids.shape, np.nan)
+        for row, spec in enumerate(self.marks.specs):
+            if spec.quote == 'USD':
+                rates[..., row] = 1.0
+            elif spec.quote + 'USD' in self.marks.index:
+                rates[..., row] = mids[..., self.marks.index[spec.quote + 'USD']]
+            elif 'USD' + spec.quote in self.marks.index:
+                rates[..., row] = 1.0 / mids[..., self.marks.index['USD' + spec.quote]]
+        return rates
+
+    def _active(self):
+        return (self.net_size != 0) | (self.net_cost != 0)
+
+    def book_value(self, mids):
+        """Unrealized USD value of the open book at `mids`, one mid per mark-table pair along the last axis."""
+        active = self._active()
+        contract = np.array([spec.contract for spec in self.marks.specs], dtype=float)
+        legs = (mids * self.net_size - self.net_cost) * contract * self._quote_rates(mids)
+        return np.where(active, legs, 0.0).sum(axis=-1)
+
+    def exposure(self):
+        """Net amount per currency, each pair split into its base and quote legs, with its USD value.
+
+        Returns a dict of 'currency' (list), 'amount' and 'usd' (arrays), largest USD exposure first.
+        """
+        self._fit()
+        amounts = {}
+        for row in np.flatnonzero(self._active()).tolist():
+            spec = self.marks.specs[row]
+            amounts[spec.base] = amounts.get(spec.base, 0.0) + self.net_size[row] * spec.contract
+            amounts[spec.quote] = amounts.get(spec.quote, 0.0) - self.net_cost[row] * spec.contract
+        currencies = list(amounts)
+        amount = np.array([amounts[currency] for currency in currencies], dtype=float)
+        usd = amount * np.array([self.marks.usd_per(currency) for currency in currencies], dtype=float)
+        order = np.argsort(-np.abs(np.nan_to_num(usd)), kind='stable')
+        return {'currency': [currencies[i] for i in order.tolist()], 'amount': amount[order], 'usd': usd[order]}
+
+    def scenario_grid(self):
+        """Change in the book's USD value when each pair alone moves by each of `shock_pips`.
+
+        Returns (pairs, shock_pips, grid) with grid[pair, shock], cached per book and mark version.
+        """
+        self._fit()
+        key = (self.version, self.marks.version, len(self.marks.pairs), self.shock_pips.tobytes())
+        if self._grid is not None and self._grid[0] == key:
+            return self._grid[1]
+        n = len(self.marks.pairs)
+        pips = np.array([spec.pip for spec in self.marks.specs], dtype=float)
+        mids = np.broadcast_to(self.marks.mids, (n, len(self.shock_pips), n)).copy()
+        shocked = np.arange(n)
+        mids[shocked, :, shocked] += pips[:, None] * self.shock_pips[None, :]
+        grid = self.book_value(mids) - self.book_value(self.marks.mids)
+        result = (list(self.marks.pairs), self.shock_pips, grid)
+        self._grid = (key, result)
+        return result
@@ -0,0 +1,250 @@
+import multiprocessing as mp
+import threading
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+
+from log_sink import LogSink
+from quote_book import QuoteBook
+from shared_board import attach_segment
+
+# One row per shard slot, written only by that shard's worker and read by the parent
+STATS_DTYPE = np.dtype([
+    ('ticks', 'i8'),
+    ('errors', 'i8'),
+    ('busy_ns', 'i8'),
+    ('last_tick_ns', 'i8'),
+    ('heartbeat_ns', 'i8'),
+    ('generation', 'i8'),
+])
+
+
+def _stats_array(shm, n_shards):
+    return np.ndarray((n_shards,), dtype=STATS_DTYPE, buffer=shm.buf)
+
+
+def _shard_main(shard, generation, assignment, board_name, stats_name, n_shards, feed_factory,
+                fields, app_key, stop, heartbeat):
+    # Runs in the worker process: its own subscription, its own handler, writing its rows of the shared board
+    if feed_factory is None:
+        import eikon as ek
+        if app_key:
+            ek.set_app_key(app_key)
+        feed_factory = ek.StreamingPrices
+    book = QuoteBook(shared_name=board_name, attach=True)
+    stats_shm = attach_segment(stats_name)
+    stats = _stats_array(stats_shm, n_shards)[shard:shard + 1]
+    stats['generation'] = generation
+    rows = dict(assignment)
+    bid_field, ask_field = fields
+    perf_ns = time.perf_counter_ns
+    # Counters live in locals and are published to shared memory on every tick as plain stores
+    ticks = stats['ticks']
+    busy = stats['busy_ns']
+    errors = stats['errors']
+    last_tick = stats['last_tick_ns']
+
+    def on_update(streaming_price, instrument_name, fields):
+        start = perf_ns()
+        try:
+            book.update_row(rows[instrument_name], fields.get(bid_field), fields.get(ask_field))
+        except Exception:
+            errors[0] += 1
+        ticks[0] += 1
+        last_tick[0] = time.time_ns()
+        busy[0] += perf_ns() - start
+
+    feed = feed_factory(instruments=list(rows), fields=list(fields), on_refresh=on_update, on_update=on_update)
+    feed.open()
+    stats['heartbeat_ns'] = time.time_ns()
+    try:
+        while not stop.wait(heartbeat):
+            stats['heartbeat_ns'] = time.time_ns()
+    finally:
+        feed.close()
+        del stats, ticks, busy, errors, last_tick
+        stats_shm.close()
+        book.close()
+
+
+class ShardedPricer:
+    """Partitions a RIC universe across worker processes that all write one shared quote board.
+
+    `book` must be a QuoteBook created with `shared_name`; every worker attaches to it and
+    writes only the rows of its own RICs, so the book itself is the consolidated view (and
+    any SharedBoardReader sees it too). Per-shard tick/busy counters live in a second shared
+    segment; `rebalance` moves RICs away from a saturated shard using the per-row update
+    counts the seqlock already keeps. The rebalance monitor also restarts shards whose
+    process died, and reports both to `sink`.
+    """
+
+    def __init__(self, book, rics, rows=None, n_workers=4, feed_factory=None, fields=('BID', 'ASK'),
+                 app_key=None, heartbeat=0.5, saturation=0.8, mp_context='spawn', sink=None):
+        if book.shm is None:
+            raise ValueError("ShardedPricer needs a QuoteBook created with shared_name")
+        self.book = book
+        self.rics = list(rics)
+        self.rows = list(rows) if rows is not None else [book.index[ric] for ric in self.rics]
+        self.n_workers = n_workers
+        self.feed_factory = feed_factory
+        self.fields = tuple(fields)
+        self.app_key = app_key
+        self.heartbeat = heartbeat
+        self.saturation = saturation
+        self.sink = sink if sink is not None else LogSink()
+        self._ctx = mp.get_context(mp_context)
+        self._stats_shm = shared_memory.SharedMemory(name=f"shardstats_{uuid.uuid4().hex[:12]}", create=True,
+                                                     size=n_workers * STATS_DTYPE.itemsize)
+        self.stats_array = _stats_array(self._stats_shm, n_workers)
+        self.stats_array[:] = np.zeros(n_workers, dtype=STATS_DTYPE)
+        # Round-robin to start with; rebalance() replaces it with a load-aware partition
+        self.assignment = [list(range(shard, len(self.rics), n_workers)) for shard in range(n_workers)]
+        self.workers = [None] * n_workers
+        self.restarts = [0] * n_workers
+        # workers/assignment change from the monitor thread and the caller's (stats, rebalance, stop)
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._samples = {}
+        self._monitor = None
+        self._monitor_stop = threading.Event()
+
+    def _start_shard(self, shard):
+        self._generation += 1
+        stop = self._ctx.Event()
+        assignment = [(self.rics[i], self.rows[i]) for i in self.assignment[shard]]
+        process = self._ctx.Process(
+            target=_shard_main, name=f"PricerShard-{shard}", daemon=True,
+            args=(shard, self._generation, assignment, self.book.shm.name, self._stats_shm.name,
+                  self.n_workers, self.feed_factory, self.fields, self.app_key, stop, self.heartbeat))
+        process.start()
+        self.workers[shard] = (process, stop)
+
+    def _stop_shard(self, shard, timeout=5.0):
+        if self.workers[shard] is None:
+            return
+        process, stop = self.workers[shard]
+        stop.set()
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+        self.workers[shard] = None
+
+    def start(self, rebalance_interval=None):
+        with self._lock:
+            for shard in range(self.n_workers):
+                if self.assignment[shard]:
+                    self._start_shard(shard)
+        if rebalance_interval:
+            self._monitor_stop.clear()
+            self._monitor = threading.Thread(target=self._monitor_loop, args=(rebalance_interval,),
+                                             name='ShardMonitor', daemon=True)
+            self._monitor.start()
+
+    def stop(self):
+        self._monitor_stop.set()
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+        with self._lock:
+            for shard in range(self.n_workers):
+                self._stop_shard(shard)
+
+    def close(self):
+        self.stop()
+        self.stats_array = None
+        self._stats_shm.close()
+        self._stats_shm.unlink()
+
+    def quotes(self):
+        return self.book.snapshot()
+
+    def _sample(self, key, min_elapsed=0.0):
+        # stats() and the rebalance monitor each keep their own previous sample to diff against;
+        # a window shorter than min_elapsed is too noisy, so the older sample is kept
+        now = time.perf_counter()
+        sample = (now, self.stats_array.copy(), self.book.quotes['seq'][self.rows] // 2)
+        previous = self._samples.get(key)
+        if previous is None or now - previous[0] >= min_elapsed:
+            self._samples[key] = sample
+        return previous, sample
+
+    def stats(self):
+        with self._lock:
+            previous, (now, stats, _) = self._sample('stats')
+            rics = [len(shard_rics) for shard_rics in self.assignment]
+            alive = [worker is not None and worker[0].is_alive() for worker in self.workers]
+        frame = pd.DataFrame({
+            'rics': rics,
+            'alive': alive,
+            'restarts': self.restarts,
+            'ticks': stats['ticks'],
+            'errors': stats['errors'],
+            'heartbeat_age_s': [(time.time_ns() - hb) / 1e9 if hb else np.nan for hb in stats['heartbeat_ns'].tolist()],
+        })
+        if previous is not None and now > previous[0]:
+            elapsed = now - previous[0]
+            frame['ticks_per_s'] = (stats['ticks'] - previous[1]['ticks']) / elapsed
+            # Fraction of wall time the shard's handler was busy: the saturation signal
+            frame['utilization'] = (stats['busy_ns'] - previous[1]['busy_ns']) / 1e9 / elapsed
+        frame.index.name = 'shard'
+        return frame
+
+    def rebalance(self, force=False):
+        with self._lock:
+            return self._rebalance(force)
+
+    def _rebalance(self, force):
+        # Needs two samples: the per-RIC rates come from seq deltas between them
+        previous, (now, stats, updates) = self._sample('rebalance', min_elapsed=self.heartbeat)
+        if previous is None or now - previous[0] < self.heartbeat:
+            return False
+        elapsed = now - previous[0]
+        utilization = (stats['busy_ns'] - previous[1]['busy_ns']) / 1e9 / elapsed
+        if not force and utilization.max() < self.saturation:
+            return False
+        rates = (updates - previous[2]) / elapsed
+
+        # Longest-processing-time first: heaviest RICs to the currently lightest shard
+        loads = np.zeros(self.n_workers)
+        assignment = [[] for _ in range(self.n_workers)]
+        for i in np.argsort(-rates, kind='stable').tolist():
+            shard = int(np.argmin(loads))
+            assignment[shard].append(i)
+            loads[shard] += rates[i] + 1e-9
+        changed = [shard for shard in range(self.n_workers)
+                   if sorted(assignment[shard]) != sorted(self.assignment[shard])]
+        if not changed:
+            return False
+        for shard in changed:
+            self._stop_shard(shard)
+        self.assignment = assignment
+        for shard in changed:
+            if self.assignment[shard]:
+                self._start_shard(shard)
+        return True
+
+    def restart_dead(self):
+        """Restarts shards whose worker process exited on its own; returns their numbers."""
+        with self._lock:
+            dead = [shard for shard, worker in enumerate(self.workers)
+                    if worker is not None and not worker[0].is_alive()]
+            for shard in dead:
+                self.sink.log("Pricing shard {} exited with code {}; restarting", shard, self.workers[shard][0].exitcode)
+                self.workers[shard] = None
+                self.restarts[shard] += 1
+                self._start_shard(shard)
+            return dead
+
+    def _monitor_loop(self, interval):
+        with self._lock:
+            self._sample('rebalance')
+        while not self._monitor_stop.wait(interval):
+            try:
+                self.restart_dead()
+                self.rebalance()
+            except Exception as e:
+                # Keep monitoring, but never silently: a failing rebalance leaves shards as they were
+                self.sink.log("Shard monitor error: {!r}", e)
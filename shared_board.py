@@ -0,0 +1,119 @@
+import time
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+
+from quote_book import QUOTE_DTYPE
+
+# Segment layout: 64-byte header (magic, row count), RIC names as S32, then the QUOTE_DTYPE rows.
+# Each row's `seq` is a seqlock: odd while the writer is mid-update, even once the row is stable.
+MAGIC = b'QUOTEBD1'
+HEADER_SIZE = 64
+NAME_DTYPE = np.dtype('S32')
+
+
+def _layout(buf, n_rows):
+    names_end = HEADER_SIZE + n_rows * NAME_DTYPE.itemsize
+    # Round the row block up to 64 bytes so rows never straddle the names
+    rows_start = (names_end + 63) // 64 * 64
+    names = np.ndarray((n_rows,), dtype=NAME_DTYPE, buffer=buf, offset=HEADER_SIZE)
+    quotes = np.ndarray((n_rows,), dtype=QUOTE_DTYPE, buffer=buf, offset=rows_start)
+    return names, quotes
+
+
+def _size(n_rows):
+    names_end = HEADER_SIZE + n_rows * NAME_DTYPE.itemsize
+    return (names_end + 63) // 64 * 64 + n_rows * QUOTE_DTYPE.itemsize
+
+
+def create_board(name, instruments):
+    instruments = list(instruments)
+    shm = shared_memory.SharedMemory(name=name, create=True, size=_size(len(instruments)))
+    header = np.ndarray((2,), dtype='<i8', buffer=shm.buf)
+    shm.buf[:8] = MAGIC
+    header[1] = len(instruments)
+    names, quotes = _layout(shm.buf, len(instruments))
+    names[:] = [inst.encode() for inst in instruments]
+    return shm, quotes
+
+
+def attach_segment(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 every attach registers with the resource tracker, which would
+        # unlink the writer's segment when this reader exits; skip the registration instead
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def attach_board(name):
+    shm = attach_segment(name)
+    if bytes(shm.buf[:8]) != MAGIC:
+        shm.close()
+        raise ValueError(f"Shared memory segment {name!r} is not a quote board")
+    n_rows = int(np.ndarray((2,), dtype='<i8', buffer=shm.buf)[1])
+    names, quotes = _layout(shm.buf, n_rows)
+    return shm, [n.decode() for n in names], quotes
+
+
+def read_row(quotes, row, timeout=1.0):
+    seq = quotes['seq']
+    deadline = None
+    while True:
+        before = int(seq[row])
+        if not before & 1:
+            record = quotes[row].copy()
+            if int(seq[row]) == before:
+                return record
+        # The writer was mid-update; it may have been descheduled, so yield rather than spin hot
+        if deadline is None:
+            deadline = time.monotonic() + timeout
+        elif time.monotonic() > deadline:
+            raise TimeoutError(f"Quote board row {row} did not settle")
+        time.sleep(0)
+
+
+def consistent_snapshot(quotes):
+    # Copy the whole board once, then re-read only the rows a writer touched during the copy
+    seq = quotes['seq']
+    before = seq.copy()
+    snap = quotes.copy()
+    after = seq.copy()
+    for row in np.flatnonzero((before != after) | (before & 1)).tolist():
+        snap[row] = read_row(quotes, row)
+    return snap
+
+
+class SharedBoardReader:
+    """Lock-free reader of a QuoteBook published with `shared_name`, from any process."""
+
+    def __init__(self, name):
+        self.name = name
+        self.shm, self.instruments, self.quotes = attach_board(name)
+        self.index = {inst: row for row, inst in enumerate(self.instruments)}
+
+    def view(self):
+        # Zero-copy, but rows may be torn while the writer is mid-update; use snapshot() for consistency
+        return self.quotes
+
+    def read_row(self, row, timeout=1.0):
+        return read_row(self.quotes, row, timeout)
+
+    def quote(self, instrument_name):
+        record = self.read_row(self.index[instrument_name])
+        return float(record['bid']), float(record['ask']), float(record['mid']), int(record['ts_ns'])
+
+    def snapshot(self):
+        return consistent_snapshot(self.quotes)
+
+    def close(self):
+        self.quotes = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A caller still holds a view(); the mapping goes away with it
+            pass
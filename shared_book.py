@@ -0,0 +1,194 @@
+import collections
+import contextlib
+import threading
+
+from trade_store import TradeStore
+
+
+class ConflictError(Exception):
+    """A group was changed by another session since the caller last read it."""
+
+    def __init__(self, group_ids):
+        super().__init__(f"Changed in another session: {', '.join(sorted(group_ids))}")
+        self.group_ids = group_ids
+
+
+class SharedBook:
+    """One trade book for every session in the process, over one TradeDB connection.
+
+    Sessions read the single TradeStore in place and never copy it. Writes go through
+    `update`, which holds the book's lock, rejects the write with ConflictError if any
+    group it touches changed after the version the caller read, and then records the
+    touched groups under a new version. `changes_since` gives a session the groups
+    changed since the version it last rendered (None when it must reload everything),
+    and `wait` blocks until the version moves. Results derived from one version alone (frames,
+    database totals) are shared through `derived` rather than built per session; anything
+    priced at a session's marks stays with that session.
+
+    Only open groups are loaded up front. Closed groups loaded for editing, or closed in
+    place, are kept in memory for the `closed_limit` most recent and unloaded after that.
+    """
+
+    def __init__(self, db, pairs=(), log_size=1000, derived_size=16, closed_limit=20):
+        self.db = db
+        self.pairs = tuple(pairs)
+        self.version = 0
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._log = collections.deque(maxlen=log_size)
+        self._group_versions = {}
+        self._reloaded = 0
+        self._derived = collections.OrderedDict()
+        self._derived_size = derived_size
+        self.closed_limit = closed_limit
+        self._closed = collections.OrderedDict()
+        self._touched = None
+        self.store = self._load()
+        self._data_version = db.version()[1]
+
+    def _load(self):
+        # Only open groups are loaded up front; closed ones come in on demand
+        store = TradeStore(pairs=self.pairs, db=self.db)
+        store.load(self.db.load_groups(status='Open'))
+        return store
+
+    def _commit(self, group_ids):
+        self.version += 1
+        self._log.append((self.version, group_ids))
+        if group_ids is None:
+            self._group_versions.clear()
+        else:
+            for group_id in group_ids:
+                self._group_versions[group_id] = self.version
+        self._changed.notify_all()
+
+    @contextlib.contextmanager
+    def update(self, group_ids=(), expected=None):
+        """Locks the book for a write to `group_ids` and yields the store.
+
+        With `expected`, the write is refused if any of the groups changed after that
+        version. Groups created inside the block should be passed to `touch`. The block's
+        database writes are one transaction; if it raises, they are rolled back and the
+        store, which may be partly changed, is reloaded from the database.
+        """
+        with self._lock:
+            group_ids = set(group_ids)
+            if expected is not None:
+                if self._reloaded > expected:
+                    raise ConflictError(group_ids or {'the whole book'})
+                stale = {group_id for group_id in group_ids if self._group_versions.get(group_id, 0) > expected}
+                if stale:
+                    raise ConflictError(stale)
+            self._touched = group_ids
+            try:
+                with self.db.transaction():
+                    yield self.store
+            except BaseException:
+                self._touched = None
+                self.reload()
+                raise
+            touched, self._touched = self._touched, None
+            self._commit(touched)
+            self._data_version = self.db.version()[1]
+
+    @contextlib.contextmanager
+    def read(self):
+        """Holds the book's lock for a consistent read of the store; yields the version it is at."""
+        with self._lock:
+            yield self.version
+
+    def touch(self, group_id):
+        """Adds a group to the one being recorded by the enclosing `update`."""
+        self._touched.add(group_id)
+
+    def keep_closed(self, group_ids):
+        """Records closed groups held in memory; the least recent beyond `closed_limit` are unloaded."""
+        with self._lock:
+            unloaded = self._keep_closed(group_ids)
+            if self._touched is not None:
+                self._touched |= unloaded
+            elif unloaded:
+                self._commit(unloaded)
+            return unloaded
+
+    def _keep_closed(self, group_ids):
+        for group_id in group_ids:
+            self._closed[group_id] = None
+            self._closed.move_to_end(group_id)
+        unloaded = set()
+        while len(self._closed) > self.closed_limit:
+            group_id, _ = self._closed.popitem(last=False)
+            # A group reopened by a new sub-trade since stays, like any open group
+            if group_id in self.store.groups and not self.store.has_open(group_id):
+                self.store.unload_group(group_id)
+                unloaded.add(group_id)
+        return unloaded
+
+    def load_closed(self, trade_groups):
+        """Loads closed groups (read from the database) into the store, e.g. to edit them."""
+        with self._lock:
+            trade_groups = [group for group in trade_groups if group['id'] not in self.store.groups]
+            if not trade_groups:
+                return
+            self.store.load(trade_groups)
+            loaded = {group['id'] for group in trade_groups}
+            self._commit(loaded | self._keep_closed(loaded))
+
+    def reload(self):
+        """Replaces the store from the database; every session reloads."""
+        with self._lock:
+            self.store = self._load()
+            self._closed.clear()
+            self._commit(None)
+            self._reloaded = self.version
+            self._data_version = self.db.version()[1]
+
+    def import_groups(self, trade_groups, replace=False):
+        """TradeDB.import_groups under the book's lock, then a reload; returns the count."""
+        with self._lock:
+            imported = self.db.import_groups(trade_groups, replace=replace)
+            self.reload()
+            return imported
+
+    def poll_db(self):
+        """Reloads if another connection (another process) has written to the database file."""
+        data_version = self.db.version()[1]
+        if data_version != self._data_version:
+            self.reload()
+            return True
+        return False
+
+    def changes_since(self, version):
+        """Groups changed after `version`, or None if the log no longer reaches back that far or a reload happened."""
+        with self._lock:
+            if version >= self.version:
+                return set()
+            if not self._log or self._log[0][0] > version + 1:
+                return None
+            changed = set()
+            for logged, group_ids in self._log:
+                if logged <= version:
+                    continue
+                if group_ids is None:
+                    return None
+                changed |= group_ids
+            return changed
+
+    def wait(self, version, timeout=None):
+        """Blocks until the book moves past `version`; returns the current version."""
+        with self._lock:
+            self._changed.wait_for(lambda: self.version > version, timeout)
+            return self.version
+
+    def derived(self, key, build):
+        """`build()` once per (version, key) across all sessions; the few most recent results are kept."""
+        with self._lock:
+            full_key = (self.version, key)
+            if full_key in self._derived:
+                self._derived.move_to_end(full_key)
+                return self._derived[full_key]
+            value = build()
+            self._derived[full_key] = value
+            while len(self._derived) > self._derived_size:
+                self._derived.popitem(last=False)
+            return value
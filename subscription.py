@@ -0,0 +1,185 @@
+import asyncio
+import collections
+import threading
+
+Quote = collections.namedtuple('Quote', ['ric', 'bid', 'ask', 'ts_ns', 'ticks'])
+
+POLICIES = ('drop_oldest', 'latest', 'block')
+
+
+class Subscription:
+    """One consumer's view of the hub: `async for quote in subscription`.
+
+    drop_oldest: bounded buffer that evicts the oldest quote when full.
+    latest:      keeps only the newest quote per RIC, so a slow consumer always sees current prices.
+    block:       bounded buffer; a publisher on another thread waits for room. A publisher on
+                 the event loop itself cannot wait, so there the buffer is allowed to overrun.
+    """
+
+    def __init__(self, hub, rics, maxsize, policy):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {POLICIES}")
+        self.hub = hub
+        self.rics = None if rics is None else frozenset(rics)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self.delivered = 0
+        self.closed = False
+        self._buffer = collections.deque()
+        self._latest = {}
+        self._ready = asyncio.Event()
+        self._space = threading.Semaphore(maxsize) if policy == 'block' else None
+        self._overrun = 0
+
+    def __len__(self):
+        return len(self._latest) if self.policy == 'latest' else len(self._buffer)
+
+    def _offer(self, quote):
+        # Runs on the event loop thread
+        if self.policy == 'latest':
+            if self._latest.pop(quote.ric, None) is not None:
+                self.dropped += 1
+            self._latest[quote.ric] = quote
+        else:
+            if self.policy == 'drop_oldest' and len(self._buffer) >= self.maxsize:
+                self._buffer.popleft()
+                self.dropped += 1
+            self._buffer.append(quote)
+        self._ready.set()
+
+    def _reserve(self, blocking):
+        # Runs on the publishing thread, before the quote is handed to the loop
+        if not self._space.acquire(blocking=False):
+            if not blocking:
+                self._overrun += 1
+                return
+            while not self.closed and not self._space.acquire(timeout=0.1):
+                pass
+
+    async def get(self):
+        while not len(self):
+            if self.closed:
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+        if self.policy == 'latest':
+            ric = next(iter(self._latest))
+            quote = self._latest.pop(ric)
+        else:
+            quote = self._buffer.popleft()
+            if self._space is not None:
+                if self._overrun:
+                    self._overrun -= 1
+                else:
+                    self._space.release()
+        self.delivered += 1
+        return quote
+
+    async def __aiter__(self):
+        try:
+            while True:
+                try:
+                    quote = await self.get()
+                except StopAsyncIteration:
+                    return
+                yield quote
+        finally:
+            # Reached on break, on consumer cancellation and on close()
+            self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.hub._remove(self)
+        if self._space is not None:
+            # Wake any publisher still waiting for room in this buffer
+            for _ in range(self.maxsize):
+                self._space.release()
+        self._ready.set()
+
+
+class QuoteHub:
+    """Fans quotes out to asyncio subscribers.
+
+    `publish` may be called from the feed's callback thread; quotes are handed to the
+    event loop in batches, with at most one wakeup pending at a time.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+        self._by_ric = {}
+        self._all = []
+        self._loop = None
+        self._loop_thread = None
+        self._pending = collections.deque()
+        self._scheduled = False
+
+    def subscribe(self, rics=None, maxsize=1000, policy='drop_oldest'):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._loop_thread = threading.get_ident()
+        subscription = Subscription(self, rics, maxsize, policy)
+        self.subscribers.append(subscription)
+        if subscription.rics is None:
+            self._all.append(subscription)
+        else:
+            for ric in subscription.rics:
+                self._by_ric.setdefault(ric, []).append(subscription)
+        return subscription
+
+    def _remove(self, subscription):
+        if subscription in self.subscribers:
+            self.subscribers.remove(subscription)
+        if subscription.rics is None:
+            if subscription in self._all:
+                self._all.remove(subscription)
+        else:
+            for ric in subscription.rics:
+                subs = self._by_ric.get(ric, [])
+                if subscription in subs:
+                    subs.remove(subscription)
+
+    def _targets(self, ric):
+        targets = self._by_ric.get(ric)
+        if targets:
+            return targets + self._all if self._all else targets
+        return self._all
+
+    def publish(self, ric, bid, ask, ts_ns=0, ticks=1):
+        if not self.subscribers:
+            return
+        quote = Quote(ric, bid, ask, ts_ns, ticks)
+        on_loop = threading.get_ident() == self._loop_thread
+        for subscription in self._targets(ric):
+            if subscription.policy == 'block' and not subscription.closed:
+                subscription._reserve(blocking=not on_loop)
+        if on_loop:
+            self._dispatch(quote)
+            return
+        self._pending.append(quote)
+        if not self._scheduled:
+            self._scheduled = True
+            try:
+                self._loop.call_soon_threadsafe(self._drain)
+            except RuntimeError:
+                # Loop already closed; nobody is left to consume
+                self._pending.clear()
+
+    def _drain(self):
+        # Reset the flag first so a quote appended while draining schedules its own wakeup
+        self._scheduled = False
+        pending = self._pending
+        while pending:
+            self._dispatch(pending.popleft())
+
+    def _dispatch(self, quote):
+        for subscription in self._targets(quote.ric):
+            if not subscription.closed:
+                subscription._offer(quote)
+
+    def close(self):
+        for subscription in list(self.subscribers):
+            subscription.close()
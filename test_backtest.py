@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import run_backtest
+
+
+def reference_backtest(df, signal, stop, target, size=1.0, pips_per_unit=10000, pip_value=100, fill='close'):
+    # The rules run_backtest documents, one bar at a time over plain Python rows
+    rows = []
+    position, entry_bar, entry_price = 0, -1, None
+    stop_level = target_level = None
+    for i, (time, bar) in enumerate(df.iterrows()):
+        if position and i > entry_bar:
+            exit_price = None
+            hit_stop = bar['Low'] <= stop_level if position > 0 else bar['High'] >= stop_level
+            hit_target = bar['High'] >= target_level if position > 0 else bar['Low'] <= target_level
+            if hit_stop:
+                exit_price = stop_level
+            elif hit_target:
+                exit_price = target_level
+            if exit_price is not None:
+                rows.append((time, position, 'close', exit_price, (exit_price - entry_price) * position * pips_per_unit * pip_value * size))
+                position = 0
+        source = i - 1 if fill == 'next_open' else i
+        if source < 0:
+            continue
+        wanted = signal[source]
+        price = bar['Open'] if fill == 'next_open' else bar['Close']
+        if wanted and wanted != position:
+            if position:
+                rows.append((time, position, 'close', price, (price - entry_price) * position * pips_per_unit * pip_value * size))
+            position, entry_bar, entry_price = wanted, i, price
+            stop_level, target_level = stop[source], target[source]
+            rows.append((time, position, 'open', price, 0.0))
+    return pd.DataFrame(rows, columns=['datetime', 'direction', 'action', 'entry_price', 'realized_pnl'])
+
+
+def random_bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0008, n))
+    open_ = np.r_[1.1, close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 0.0008, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.0008, n)
+    index = pd.date_range('2024-01-01', periods=n, freq='h')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close}, index=index)
+
+
+def signals_and_levels(df, seed=0):
+    rng = np.random.default_rng(seed)
+    signal = rng.choice([-1, 0, 0, 0, 0, 1], len(df))
+    close = df['Close'].to_numpy()
+    stop = close - signal * 0.0015
+    target = close + signal * 0.0020
+    return signal, np.where(signal != 0, stop, np.nan), np.where(signal != 0, target, np.nan)
+
+
+@pytest.mark.parametrize('fill', ['close', 'next_open'])
+def test_matches_reference_loop(fill):
+    df = random_bars(2000)
+    signal, stop, target = signals_and_levels(df)
+    trade_history, position_timeline = run_backtest(df, signal, stop, target, size=2.0, fill=fill)
+    expected = reference_backtest(df, signal, stop, target, size=2.0, fill=fill)
+    assert len(trade_history) == len(expected) > 50
+    assert (trade_history['datetime'] == expected['datetime']).all()
+    assert (trade_history['direction'] == np.where(expected['direction'] > 0, 'long', 'short')).all()
+    assert (trade_history['action'] == expected['action']).all()
+    np.testing.assert_allclose(trade_history['entry_price'], expected['entry_price'])
+    np.testing.assert_allclose(trade_history['realized_pnl'], expected['realized_pnl'], atol=1e-6)
+    sizes = [position for _, position in position_timeline]
+    np.testing.assert_array_equal(sizes, np.where(expected['action'] == 'open', expected['direction'] * 2.0, 0.0))
+
+
+def bars(rows):
+    index = pd.date_range('2024-01-01', periods=len(rows), freq='h')
+    return pd.DataFrame(rows, columns=['Open', 'High', 'Low', 'Close'], index=index)
+
+
+def test_stop_taken_when_bar_hits_both_levels():
+    df = bars([(1.0, 1.0, 1.0, 1.0), (1.0, 1.2, 0.8, 1.0)])
+    trade_history, _ = run_backtest(df, [1, 0], stop=0.9, target=1.1)
+    assert list(trade_history['action']) == ['open', 'close']
+    assert trade_history['entry_price'].iloc[-1] == 0.9
+
+
+def test_levels_checked_from_the_next_bar():
+    # The entry bar itself reaches the stop, which does not count
+    df = bars([(1.0, 1.0, 0.5, 1.0), (1.0, 1.0, 1.0, 1.0)])
+    trade_history, position_timeline = run_backtest(df, [1, 0], stop=0.9, target=1.1)
+    assert list(trade_history['action']) == ['open']
+    assert position_timeline[-1][1] == 1.0
+
+
+def test_opposite_signal_reverses_and_same_signal_is_ignored():
+    df = bars([(1.0, 1.0, 1.0, 1.0), (1.0, 1.0, 1.0, 1.01), (1.0, 1.0, 1.0, 1.02)])
+    trade_history, position_timeline = run_backtest(df, [1, 1, -1])
+    assert list(trade_history['action']) == ['open', 'close', 'open']
+    assert list(trade_history['direction']) == ['long', 'long', 'short']
+    assert trade_history['realized_pnl'].iloc[1] == pytest.approx(0.02 * 10000 * 100)
+    assert [position for _, position in position_timeline] == [1.0, 0.0, -1.0]
+
+
+def test_next_open_acts_one_bar_later():
+    df = bars([(1.0, 1.0, 1.0, 1.0), (1.05, 1.05, 1.05, 1.06), (1.07, 1.07, 1.07, 1.07)])
+    trade_history, _ = run_backtest(df, [1, 0, 0], fill='next_open')
+    assert list(trade_history['datetime']) == [df.index[1]]
+    assert trade_history['entry_price'].iloc[0] == 1.05
+
+
+def test_jpy_pair_uses_its_pips():
+    df = bars([(150.0, 150.0, 150.0, 150.0), (150.0, 150.0, 150.0, 150.5)])
+    trade_history, _ = run_backtest(df, [1, -1], pair='USDJPY', pip_value=66.0)
+    assert trade_history['realized_pnl'].iloc[1] == pytest.approx(0.5 * 100 * 66.0)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from decimate import DecimationCache, lttb_indices, minmax_indices
+
+
+def random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(size=n))
+
+
+def test_minmax_keeps_extremes_and_ends():
+    x = np.arange(10000, dtype=float)
+    y = random_walk(len(x))
+    y[1234] = 100.0
+    y[5678] = -100.0
+    kept = minmax_indices(x, y, 50)
+    assert len(kept) <= 200
+    assert np.all(np.diff(kept) > 0)
+    assert {0, len(x) - 1, 1234, 5678} <= set(kept.tolist())
+    # Every bucket's min and max survive
+    buckets = np.minimum((x * 50 / x[-1]).astype(int), 49)
+    for bucket in range(50):
+        values = y[buckets == bucket]
+        kept_values = y[kept[buckets[kept] == bucket]]
+        assert kept_values.max() == values.max() and kept_values.min() == values.min()
+
+
+def test_minmax_skips_nan_and_short_series():
+    y = np.array([1.0, np.nan, 3.0])
+    np.testing.assert_array_equal(minmax_indices(np.arange(3.0), y, 10), [0, 2])
+
+
+def test_lttb_returns_threshold_points():
+    x = np.arange(5000, dtype=float)
+    kept = lttb_indices(x, random_walk(len(x), seed=1), 300)
+    assert len(kept) == 300
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert np.all(np.diff(kept) > 0)
+
+
+def test_cache_keeps_requested_index_values():
+    index = pd.date_range('2024-01-01', periods=20000, freq='min')
+    series = pd.Series(random_walk(len(index), seed=2), index=index)
+    keep = index[[17, 9999, 19998]]
+    for method in ('minmax', 'lttb'):
+        result = DecimationCache().decimate(series, 100, method=method, keep=keep)
+        assert keep.isin(result.index).all()
+        assert result.index.is_monotonic_increasing
+
+
+def test_cache_distinguishes_series_content():
+    index = pd.date_range('2024-01-01', periods=10000, freq='min')
+    cache = DecimationCache()
+    first = pd.Series(random_walk(len(index), seed=3), index=index)
+    second = pd.Series(random_walk(len(index), seed=4), index=index)
+    assert cache.decimate(first, 100, name='Close').max() == first.max()
+    assert cache.decimate(second, 100, name='Close').max() == second.max()
+    assert cache.decimate(first, 100, name='Close') is cache.decimate(first, 100, name='Close')
+
+
+def test_cache_version_replaces_content_hash():
+    index = pd.date_range('2024-01-01', periods=10000, freq='min')
+    cache = DecimationCache()
+    series = pd.Series(random_walk(len(index), seed=5), index=index)
+    first = cache.decimate(series, 100, name='Close', version=1)
+    series.iloc[5000] = 1000.0
+    assert cache.decimate(series, 100, name='Close', version=1) is first
+    assert cache.decimate(series, 100, name='Close', version=2).max() == 1000.0
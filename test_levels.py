@@ -0,0 +1,70 @@
+import numpy as np
+
+from levels import LevelIndex, LevelRecorder
+
+
+def test_add_merges_within_tolerance():
+    index = LevelIndex(tolerance_pips=2, pip=0.0001)
+    index.add(1.1000, 't1')
+    level = index.add(1.1001, 't0')
+    assert len(index) == 1
+    assert np.isclose(level, 1.10005)
+    assert index[level] == {'count': 2, 'time': 't0'}
+    index.add(1.1010, 't2')
+    assert len(index) == 2
+
+
+def test_levels_stay_more_than_tolerance_apart():
+    rng = np.random.default_rng(0)
+    index = LevelIndex(tolerance_pips=3, pip=0.0001)
+    prices = 1.1 + rng.uniform(0, 0.01, 2000)
+    for i, price in enumerate(prices):
+        index.add(price, i)
+    levels = list(index)
+    assert levels == sorted(levels)
+    assert np.all(np.diff(levels) > index.tolerance)
+    assert sum(details['count'] for _, details in index.items()) == len(prices)
+
+
+def test_merged_level_folds_in_neighbour():
+    index = LevelIndex(tolerance_pips=1, pip=1.0)
+    index.add(0.0, 0)
+    index.add(1.5, 1)
+    # Merges into 0.0 (the nearer level), moving it to 0.525, within tolerance of 1.5
+    index.add(0.7, 2, count=3)
+    assert len(index) == 1
+    assert index.items()[0][1]['count'] == 5
+
+
+def test_queries():
+    index = LevelIndex(tolerance_pips=1, pip=0.0001)
+    for price in (1.1000, 1.1050, 1.1100, 1.1150):
+        index.add(price, None)
+    assert index.nearest(1.1060)[0] == 1.1050
+    assert [level for level, _ in index.between(1.1040, 1.1100)] == [1.1050, 1.1100]
+    assert [level for level, _ in index.within(1.1100, 51)] == [1.1050, 1.1100, 1.1150]
+    assert [level for level, _ in index.below(1.1100, 2)] == [1.1050, 1.1000]
+    assert [level for level, _ in index.above(1.1100, 2)] == [1.1150]
+    assert LevelIndex().nearest(1.0) is None
+
+
+def test_confluent_filters_by_count():
+    index = LevelIndex(tolerance_pips=1, pip=0.0001)
+    for price, times in ((1.1000, 3), (1.1050, 1), (1.1100, 2)):
+        for time in range(times):
+            index.add(price, time)
+    prices, counts, times = index.confluent(2)
+    np.testing.assert_allclose(prices, [1.1000, 1.1100])
+    np.testing.assert_array_equal(counts, [3, 2])
+    index.add(1.1050, 9)
+    assert len(index.confluent(2)[0]) == 3
+
+
+def test_from_levels_and_recorder():
+    index = LevelIndex.from_levels({1.1000: {'count': 2, 'time': 5}, 1.10005: {'count': 1, 'time': 3}})
+    assert len(index) == 1 and index.items()[0][1] == {'count': 3, 'time': 3}
+    support, resistance = LevelIndex(), LevelIndex()
+    recorder = LevelRecorder(support, resistance)
+    recorder('t', 1.2, np.nan)
+    recorder('u', np.nan, 1.0)
+    assert list(resistance) == [1.2] and list(support) == [1.0]
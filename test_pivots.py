@@ -0,0 +1,64 @@
+import numpy as np
+
+from pivots import PivotTracker, pivot_columns
+
+
+def naive_pivots(high, low, left_bars, right_bars):
+    pivot_high = np.full(len(high), np.nan)
+    pivot_low = np.full(len(low), np.nan)
+    for i in range(left_bars, len(high) - right_bars):
+        highs = high[i - left_bars:i + right_bars + 1]
+        lows = low[i - left_bars:i + right_bars + 1]
+        if not np.isnan(highs).any() and high[i] == highs.max():
+            pivot_high[i] = high[i]
+        if not np.isnan(lows).any() and low[i] == lows.min():
+            pivot_low[i] = low[i]
+    return pivot_high, pivot_low
+
+
+def random_bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # Rounded so ties are common
+    close = np.round(1.1 + np.cumsum(rng.normal(0, 0.0005, n)), 4)
+    return close + np.round(rng.uniform(0, 0.0005, n), 4), close - np.round(rng.uniform(0, 0.0005, n), 4)
+
+
+def test_pivot_columns_matches_naive_scan():
+    high, low = random_bars(500)
+    for left_bars, right_bars in ((1, 1), (3, 2), (5, 5)):
+        expected_high, expected_low = naive_pivots(high, low, left_bars, right_bars)
+        pivot_high, pivot_low = pivot_columns(high, low, left_bars, right_bars)
+        np.testing.assert_array_equal(pivot_high, expected_high)
+        np.testing.assert_array_equal(pivot_low, expected_low)
+
+
+def test_tracker_matches_pivot_columns():
+    high, low = random_bars(500, seed=1)
+    high[100] = low[200] = np.nan
+    expected_high, expected_low = pivot_columns(high, low, 4, 3)
+    tracker = PivotTracker(4, 3)
+    pivot_high = np.full(len(high), np.nan)
+    pivot_low = np.full(len(low), np.nan)
+    for h, l in zip(high, low):
+        confirmed = tracker.update(h, l)
+        if confirmed is not None:
+            position, pivot_high[position], pivot_low[position] = confirmed
+    np.testing.assert_array_equal(pivot_high, expected_high)
+    np.testing.assert_array_equal(pivot_low, expected_low)
+
+
+def test_window_with_nan_has_no_pivot():
+    high = np.array([1.0, 2.0, 5.0, np.nan, 1.0, 1.0, 1.0])
+    low = -high
+    pivot_high, pivot_low = pivot_columns(high, low, 2, 2)
+    assert np.isnan(pivot_high[2]) and np.isnan(pivot_low[2])
+    tracker = PivotTracker(2, 2)
+    confirmed = [tracker.update(h, l) for h, l in zip(high, low)]
+    assert confirmed[4][0] == 2 and np.isnan(confirmed[4][1]) and np.isnan(confirmed[4][2])
+
+
+def test_edges_are_never_pivots():
+    high = np.array([9.0, 1.0, 2.0, 1.0, 9.0])
+    pivot_high, _ = pivot_columns(high, high, 1, 1)
+    assert np.isnan(pivot_high[0]) and np.isnan(pivot_high[-1])
+    assert pivot_high[2] == 2.0
@@ -0,0 +1,170 @@
+import datetime
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# Fixed-width 32-byte records; the pad keeps bid/ask 8-byte aligned inside the mapping
+RECORD_DTYPE = np.dtype([
+    ('ts_ns', '<i8'),
+    ('ric_id', '<i4'),
+    ('_pad', '<i4'),
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+])
+MAGIC = b'TICKJNL1'
+HEADER_SIZE = 64
+NS_PER_DAY = 86_400 * 1_000_000_000
+
+
+def day_of(ts_ns):
+    return datetime.datetime.fromtimestamp(ts_ns / 1e9, tz=datetime.timezone.utc).strftime('%Y%m%d')
+
+
+def _segment_path(day_dir, number):
+    return os.path.join(day_dir, f"seg-{number:05d}.ticks")
+
+
+def _map_segment(path, mode, capacity=None):
+    if mode == 'w+':
+        size = HEADER_SIZE + capacity * RECORD_DTYPE.itemsize
+        raw = np.memmap(path, dtype=np.uint8, mode='w+', shape=(size,))
+        raw[:8] = np.frombuffer(MAGIC, dtype=np.uint8)
+    else:
+        raw = np.memmap(path, dtype=np.uint8, mode=mode)
+        if bytes(raw[:8]) != MAGIC:
+            raise ValueError(f"{path} is not a tick journal segment")
+    # Header: magic, then the committed record count as int64 at offset 8
+    count = raw[8:16].view('<i8')
+    records = raw[HEADER_SIZE:].view(RECORD_DTYPE)
+    return raw, count, records
+
+
+class TickJournal:
+    """Append-only tick journal: one directory per UTC day, preallocated memory-mapped segments.
+
+    `append` is a handful of scalar stores into the current mapping; nothing is serialized
+    and the OS writes pages back in the background. A segment is sealed and a new one mapped
+    once `segment_records` ticks have been written. After a restart the day's last segment is
+    reopened and appended to while it still has room.
+    """
+
+    def __init__(self, root, instruments, segment_records=1 << 20):
+        self.root = root
+        self.instruments = list(instruments)
+        self.segment_records = segment_records
+        self._raw = None
+        self._day_end_ns = -1
+        self._day_dir = None
+
+    def _open_day(self, ts_ns):
+        self.close()
+        day = day_of(ts_ns)
+        self._day_dir = os.path.join(self.root, day)
+        os.makedirs(self._day_dir, exist_ok=True)
+        start = datetime.datetime.strptime(day, '%Y%m%d').replace(tzinfo=datetime.timezone.utc)
+        self._day_end_ns = int(start.timestamp()) * 1_000_000_000 + NS_PER_DAY
+
+        # RIC ids are stable within a day: reuse the stored names and append any new ones
+        names_path = os.path.join(self._day_dir, 'rics.json')
+        names = []
+        if os.path.exists(names_path):
+            with open(names_path) as f:
+                names = json.load(f)
+        ids = {name: i for i, name in enumerate(names)}
+        for name in self.instruments:
+            if name not in ids:
+                ids[name] = len(names)
+                names.append(name)
+        with open(names_path, 'w') as f:
+            json.dump(names, f)
+        self._ids = [ids[name] for name in self.instruments]
+
+        # Records before a segment's committed count are never rewritten, so the last segment
+        # can be reopened and filled up rather than starting a fresh preallocated file per restart
+        self._segment = len([p for p in os.listdir(self._day_dir) if p.endswith('.ticks')])
+        if self._segment:
+            raw, count, records = _map_segment(_segment_path(self._day_dir, self._segment - 1), 'r+')
+            if int(count[0]) < len(records):
+                self._use(raw, count, records, int(count[0]))
+                return
+        self._map_next()
+
+    def _map_next(self):
+        if self._raw is not None:
+            self._raw.flush()
+        self._use(*_map_segment(_segment_path(self._day_dir, self._segment), 'w+', self.segment_records), 0)
+        self._segment += 1
+
+    def _use(self, raw, count, records, n):
+        self._raw, self._count = raw, count
+        self._capacity = len(records)
+        self._n = n
+        self._ts = records['ts_ns']
+        self._ric = records['ric_id']
+        self._bid = records['bid']
+        self._ask = records['ask']
+
+    def append(self, ts_ns, row, bid, ask):
+        # `row` is the instrument's position in `instruments` (the QuoteBook row)
+        if ts_ns >= self._day_end_ns:
+            self._open_day(ts_ns)
+        elif self._n == self._capacity:
+            self._map_next()
+        n = self._n
+        self._ts[n] = ts_ns
+        self._ric[n] = self._ids[row]
+        self._bid[n] = bid
+        self._ask[n] = ask
+        self._n = n + 1
+        # Publishing the count last means a reader never sees a half-written record
+        self._count[0] = n + 1
+
+    def flush(self):
+        if self._raw is not None:
+            self._raw.flush()
+
+    def close(self):
+        if self._raw is not None:
+            self._raw.flush()
+            self._raw = None
+
+
+class JournalReader:
+    """Read side of a day's journal. Single-segment days are returned without copying."""
+
+    def __init__(self, root, day):
+        self.day_dir = os.path.join(root, day)
+        with open(os.path.join(self.day_dir, 'rics.json')) as f:
+            self.instruments = json.load(f)
+        self.segments = []
+        for name in sorted(p for p in os.listdir(self.day_dir) if p.endswith('.ticks')):
+            _, count, records = _map_segment(os.path.join(self.day_dir, name), 'r')
+            self.segments.append(records[:int(count[0])])
+
+    def __len__(self):
+        return sum(len(segment) for segment in self.segments)
+
+    def records(self):
+        if len(self.segments) == 1:
+            return self.segments[0]
+        if not self.segments:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.concatenate(self.segments)
+
+    def arrays(self):
+        records = self.records()
+        return {name: records[name] for name in ('ts_ns', 'ric_id', 'bid', 'ask')}
+
+    def to_frame(self):
+        columns = self.arrays()
+        return pd.DataFrame({
+            'ric': pd.Categorical.from_codes(columns['ric_id'], categories=self.instruments),
+            'bid': columns['bid'],
+            'ask': columns['ask'],
+        }, index=pd.DatetimeIndex(columns['ts_ns'].view('datetime64[ns]'), name='datetime'), copy=False)
+
+
+def read_day(root, day, as_frame=True):
+    reader = JournalReader(root, day)
+    return reader.to_frame() if as_frame else reader.arrays()
@@ -0,0 +1,306 @@
+import contextlib
+import json
+import sqlite3
+import threading
+import uuid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'Open',
+    pair TEXT,
+    opened TEXT,
+    fields TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS trades (
+    id TEXT PRIMARY KEY,
+    group_id TEXT NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
+    date TEXT,
+    pair TEXT,
+    type TEXT NOT NULL,
+    entry_price REAL NOT NULL,
+    size REAL NOT NULL,
+    tp_level REAL,
+    sl_level REAL,
+    result TEXT NOT NULL,
+    close_price REAL,
+    comment TEXT
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS groups_status ON groups(status, seq);
+CREATE INDEX IF NOT EXISTS groups_pair ON groups(pair, seq);
+CREATE INDEX IF NOT EXISTS groups_opened ON groups(opened);
+CREATE INDEX IF NOT EXISTS trades_group ON trades(group_id);
+CREATE INDEX IF NOT EXISTS trades_date ON trades(date);
+"""
+
+TRADE_COLUMNS = ('id', 'date', 'pair', 'type', 'entry_price', 'size', 'tp_level', 'sl_level', 'result', 'close_price', 'comment')
+TRADE_KEYS = ('id', 'date', 'pair', 'type', 'entryPrice', 'size', 'tpLevel', 'slLevel', 'result', 'closePrice', 'comment')
+
+# A group is 'Open' while any of its trades is; only those are loaded eagerly
+REFRESH_GROUPS = """
+UPDATE groups SET
+    status = CASE WHEN EXISTS (SELECT 1 FROM trades t WHERE t.group_id = groups.id AND t.result = 'Open') THEN 'Open' ELSE 'Closed' END,
+    pair = (SELECT pair FROM trades t WHERE t.group_id = groups.id ORDER BY t.rowid LIMIT 1),
+    opened = (SELECT MIN(date) FROM trades t WHERE t.group_id = groups.id)
+WHERE {where}
+"""
+REFRESH_GROUP = REFRESH_GROUPS.format(where='id = :id')
+
+
+def _trade_row(group_id, trade):
+    row = {column: trade.get(key) for column, key in zip(TRADE_COLUMNS, TRADE_KEYS)}
+    row['id'] = row['id'] or str(uuid.uuid4())
+    row['group_id'] = group_id
+    if row['result'] != 'Closed':
+        row['close_price'] = None
+    return row
+
+
+def _trade_dict(row):
+    trade = {key: row[column] for column, key in zip(TRADE_COLUMNS, TRADE_KEYS)}
+    if trade['closePrice'] is None:
+        del trade['closePrice']
+    trade['comment'] = trade['comment'] or ''
+    return trade
+
+
+class TradeDB:
+    """SQLite (WAL mode) persistence for the trade book, notes and TP/SL defaults.
+
+    Every mutation is its own small transaction, so the file is always current; several can
+    be made one with `transaction`. Groups
+    are queried by status, pair and opening date through indexes; `load_groups` returns
+    the dashboard's group/trade dict layout, newest group first, with each group's `seq`.
+    """
+
+    def __init__(self, path='trade_book.db'):
+        self.path = path
+        # Streamlit reruns a session's script on different threads; the lock serializes them
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self._in_transaction = False
+        self._version = 0
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _write(self):
+        # One transaction per call, unless inside `transaction`; the version counter lets callers
+        # cache anything derived from the book
+        with self._lock:
+            if self._in_transaction:
+                yield
+                self._version += 1
+                return
+            with self.conn:
+                yield
+                self._version += 1
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Makes every write inside the block one transaction: committed together, or rolled back on error."""
+        with self._lock:
+            if self._in_transaction:
+                yield
+                return
+            self._in_transaction = True
+            try:
+                with self.conn:
+                    yield
+            finally:
+                self._in_transaction = False
+
+    def version(self):
+        """Changes whenever the book changes, through this connection or any other."""
+        with self._lock:
+            return self._version, self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def add_group(self, group_id, fields=None, trades=()):
+        with self._write():
+            cursor = self.conn.execute('INSERT INTO groups (id, fields) VALUES (?, ?)',
+                                       (group_id, json.dumps(fields or {})))
+            self._upsert_trades(group_id, trades)
+            self.conn.execute(REFRESH_GROUP, {'id': group_id})
+            return cursor.lastrowid
+
+    def _upsert_trades(self, group_id, trades):
+        # ON CONFLICT keeps the rowid, which is what orders a group's trades
+        self.conn.executemany(
+            f"INSERT INTO trades (group_id, {', '.join(TRADE_COLUMNS)}) "
+            f"VALUES (:group_id, {', '.join(':' + c for c in TRADE_COLUMNS)}) "
+            f"ON CONFLICT(id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in TRADE_COLUMNS[1:])}",
+            [_trade_row(group_id, trade) for trade in trades])
+
+    def _move_trades(self, group_id, trade_ids):
+        # Trades the book holds under another group are taken out of it and then inserted afresh,
+        # so they sort in the file's order within their new group; their old groups are noted
+        # in import_moved to be tidied up after the import
+        if not trade_ids:
+            return
+        where = f"id IN ({', '.join('?' * len(trade_ids))}) AND group_id != ?"
+        params = [*trade_ids, group_id]
+        self.conn.execute(f'INSERT OR IGNORE INTO import_moved (id) SELECT group_id FROM trades WHERE {where}', params)
+        self.conn.execute(f'DELETE FROM trades WHERE {where}', params)
+
+    def upsert_trades(self, group_id, trades):
+        with self._write():
+            self._upsert_trades(group_id, trades)
+            self.conn.execute(REFRESH_GROUP, {'id': group_id})
+
+    def delete_trade(self, trade_id):
+        with self._write():
+            row = self.conn.execute('SELECT group_id FROM trades WHERE id = ?', (trade_id,)).fetchone()
+            if row is None:
+                return
+            self.conn.execute('DELETE FROM trades WHERE id = ?', (trade_id,))
+            # Same rule as the in-memory store: a group without trades goes too
+            self.conn.execute('DELETE FROM groups WHERE id = ? AND NOT EXISTS (SELECT 1 FROM trades WHERE group_id = ?)',
+                              (row['group_id'], row['group_id']))
+            self.conn.execute(REFRESH_GROUP, {'id': row['group_id']})
+
+    def delete_group(self, group_id):
+        with self._write():
+            self.conn.execute('DELETE FROM groups WHERE id = ?', (group_id,))
+
+    def _where(self, status=None, pair=None, opened_from=None, opened_to=None, before_seq=None):
+        clauses, params = [], []
+        if before_seq is not None:
+            clauses.append('seq < ?')
+            params.append(before_seq)
+        if status is not None:
+            clauses.append('status = ?')
+            params.append(status)
+        if isinstance(pair, (list, tuple)):
+            clauses.append(f"pair IN ({', '.join('?' * len(pair))})")
+            params.extend(pair)
+        elif pair is not None:
+            clauses.append('pair = ?')
+            params.append(pair)
+        if opened_from is not None:
+            clauses.append('opened >= ?')
+            params.append(str(opened_from))
+        if opened_to is not None:
+            clauses.append('opened < ?')
+            params.append(str(opened_to))
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def count_groups(self, **filters):
+        where, params = self._where(**filters)
+        with self._lock:
+            return self.conn.execute(f'SELECT COUNT(*) FROM groups{where}', params).fetchone()[0]
+
+    def load_groups(self, limit=None, offset=0, **filters):
+        """Groups matching the filters (status, pair or list of pairs, opened_from, opened_to), newest first."""
+        where, params = self._where(**filters)
+        page = f' LIMIT {int(limit)} OFFSET {int(offset)}' if limit is not None else ''
+        with self._lock:
+            rows = self.conn.execute(f'SELECT seq, id, fields FROM groups{where} ORDER BY seq DESC{page}', params).fetchall()
+            groups = {}
+            for row in rows:
+                group = json.loads(row['fields'])
+                group.update(id=row['id'], seq=row['seq'], trades=[])
+                groups[row['id']] = group
+            # SQLite caps bound parameters, so fetch the trades of big pages in chunks
+            ids = list(groups)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                for trade in self.conn.execute(
+                        f"SELECT group_id, {', '.join(TRADE_COLUMNS)} FROM trades "
+                        f"WHERE group_id IN ({', '.join('?' * len(chunk))}) ORDER BY rowid", chunk):
+                    groups[trade['group_id']]['trades'].append(_trade_dict(trade))
+        return list(groups.values())
+
+    def iter_groups(self, chunk=2000, **filters):
+        """Like load_groups, but yields `chunk` groups at a time so the whole book is never in memory."""
+        before_seq = None
+        while True:
+            groups = self.load_groups(limit=chunk, before_seq=before_seq, **filters)
+            if not groups:
+                return
+            yield groups
+            before_seq = groups[-1]['seq']
+
+    def realized_by_pair(self, **filters):
+        """Sum of (close - entry) * direction * size over closed trades, per pair.
+
+        Price points rather than dollars: the caller applies each pair's pip size and pip value.
+        """
+        where, params = self._where(**filters)
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT pair, SUM((close_price - entry_price) * CASE type WHEN 'Long' THEN 1 ELSE -1 END * size) "
+                f"FROM trades WHERE result = 'Closed' AND group_id IN (SELECT id FROM groups{where}) GROUP BY pair", params).fetchall()
+        return {pair: points for pair, points in rows}
+
+    def import_groups(self, trade_groups, replace=False):
+        """Writes groups from any iterable, newest first, in one transaction; returns the count.
+
+        Groups are consumed one at a time, so a generator reading a large file is never held in
+        memory as a whole. With `replace` the book is emptied first; otherwise groups and
+        trades are upserted by id, and a trade the book holds in another group moves to the
+        group the file puts it in (a group left without trades goes). New groups are numbered
+        oldest first once the iterable is exhausted, so they keep the file's order. An
+        exception from the iterable rolls the whole import back.
+        """
+        with self._write():
+            # Foreign keys are checked at commit, since trades are written before their group row;
+            # the pragma only lasts for the transaction, so open it first
+            if not self.conn.in_transaction:
+                self.conn.execute('BEGIN')
+            self.conn.execute('PRAGMA defer_foreign_keys=ON')
+            if replace:
+                self.conn.execute('DELETE FROM trades')
+                self.conn.execute('DELETE FROM groups')
+            self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS import_order (ordinal INTEGER PRIMARY KEY, id TEXT NOT NULL, fields TEXT NOT NULL)')
+            self.conn.execute('DELETE FROM import_order')
+            self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS import_moved (id TEXT PRIMARY KEY)')
+            self.conn.execute('DELETE FROM import_moved')
+            count = 0
+            for group in trade_groups:
+                if not group['trades']:
+                    continue
+                group_id = group.get('id') or str(uuid.uuid4())
+                fields = {key: value for key, value in group.items() if key not in ('id', 'seq', 'trades', 'agg')}
+                self.conn.execute('INSERT INTO import_order (id, fields) VALUES (?, ?)', (group_id, json.dumps(fields)))
+                if not replace:
+                    self._move_trades(group_id, [trade['id'] for trade in group['trades'] if trade.get('id')])
+                self._upsert_trades(group_id, group['trades'])
+                count += 1
+            if not replace:
+                self.conn.execute('DELETE FROM groups WHERE id IN (SELECT id FROM import_moved) '
+                                  'AND NOT EXISTS (SELECT 1 FROM trades t WHERE t.group_id = groups.id)')
+                self.conn.execute(REFRESH_GROUPS.format(where='id IN (SELECT id FROM import_moved)'))
+                self.conn.execute('DELETE FROM import_moved')
+            self.conn.execute('UPDATE groups SET fields = (SELECT fields FROM import_order o WHERE o.id = groups.id) '
+                              'WHERE id IN (SELECT id FROM import_order)')
+            self.conn.execute('INSERT OR IGNORE INTO groups (id, fields) SELECT id, fields FROM import_order '
+                              'WHERE id NOT IN (SELECT id FROM groups) ORDER BY ordinal DESC')
+            self.conn.execute(REFRESH_GROUPS.format(where='id IN (SELECT id FROM import_order)'))
+            self.conn.execute('DELETE FROM import_order')
+        return count
+
+    def replace_all(self, trade_groups):
+        """Replaces the whole book, e.g. on an import; `trade_groups` is newest first."""
+        return self.import_groups(trade_groups, replace=True)
+
+    def get_setting(self, key, default=None):
+        with self._lock:
+            row = self.conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+        return json.loads(row['value']) if row is not None else default
+
+    def set_settings(self, settings):
+        with self._write():
+            self.conn.executemany('INSERT INTO settings (key, value) VALUES (?, ?) '
+                                  'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+                                  [(key, json.dumps(value)) for key, value in settings.items()])
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,293 @@
+import io
+import json
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+FORMATS = {'json': 'application/json', 'parquet': 'application/octet-stream', 'arrow': 'application/vnd.apache.arrow.file'}
+SETTINGS_KEYS = ('strategy_notes', 'default_tp_pips', 'default_sl_pips')
+TRADE_TYPES = ('Long', 'Short')
+TRADE_RESULTS = ('Open', 'Closed')
+
+
+def columnar_available():
+    return pa is not None
+
+
+def _arrow_schema():
+    # One row per trade, newest group first; settings ride along in the schema metadata
+    return pa.schema([
+        ('group_id', pa.string()),
+        ('group_tp_level', pa.float64()),
+        ('group_sl_level', pa.float64()),
+        ('trade_id', pa.string()),
+        ('date', pa.timestamp('ns')),
+        ('pair', pa.string()),
+        ('type', pa.string()),
+        ('result', pa.string()),
+        ('entry_price', pa.float64()),
+        ('size', pa.float64()),
+        ('tp_level', pa.float64()),
+        ('sl_level', pa.float64()),
+        ('close_price', pa.float64()),
+        ('comment', pa.string()),
+    ])
+
+
+def _optional_float(value):
+    return float(value) if value is not None and value != '' else None
+
+
+def validate_group(group, position):
+    """Checks one imported group against the trade book schema; returns it normalized."""
+    where = f"Group {position + 1}"
+    if not isinstance(group, dict) or not isinstance(group.get('trades'), list):
+        raise ValueError(f"{where}: expected an object with a 'trades' list")
+    trades = []
+    for index, trade in enumerate(group['trades']):
+        here = f"{where}, trade {index + 1}"
+        if not isinstance(trade, dict):
+            raise ValueError(f"{here}: expected an object")
+        if trade.get('type') not in TRADE_TYPES:
+            raise ValueError(f"{here}: type must be one of {TRADE_TYPES}, got {trade.get('type')!r}")
+        if trade.get('result', 'Open') not in TRADE_RESULTS:
+            raise ValueError(f"{here}: result must be one of {TRADE_RESULTS}, got {trade.get('result')!r}")
+        if not isinstance(trade.get('pair'), str) or not trade['pair']:
+            raise ValueError(f"{here}: missing pair")
+        try:
+            trade = dict(trade, entryPrice=float(trade['entryPrice']), size=float(trade['size']),
+                         tpLevel=_optional_float(trade.get('tpLevel')), slLevel=_optional_float(trade.get('slLevel')),
+                         result=trade.get('result', 'Open'), comment=trade.get('comment') or '', date=str(trade.get('date') or ''))
+            if trade['result'] == 'Closed':
+                trade['closePrice'] = float(trade['closePrice'])
+            else:
+                trade.pop('closePrice', None)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"{here}: bad or missing number ({e})") from None
+        if not np.isfinite(trade['entryPrice']) or not trade['size'] > 0:
+            raise ValueError(f"{here}: entryPrice must be finite and size positive")
+        trades.append(trade)
+    return dict(group, trades=trades)
+
+
+def _json_groups(db, chunk):
+    first = True
+    for groups in db.iter_groups(chunk=chunk):
+        for group in groups:
+            group = {key: value for key, value in group.items() if key != 'seq'}
+            yield ('' if first else ',') + json.dumps(group, separators=(',', ':'))
+            first = False
+
+
+def export_json(db, settings, chunk=2000):
+    """The whole book in the dashboard's JSON layout, without indentation, built a chunk of groups at a time."""
+    # Encoded piece by piece, so only the bytes are ever held in full, never a str copy too
+    out = io.BytesIO()
+    out.write(b'{"trade_groups":[')
+    for piece in _json_groups(db, chunk):
+        out.write(piece.encode())
+    out.write(b'],')
+    out.write(json.dumps({key: settings[key] for key in SETTINGS_KEYS}, separators=(',', ':'))[1:].encode())
+    return out.getvalue()
+
+
+def _record_batch(groups, schema):
+    columns = {name: [] for name in schema.names}
+    for group in groups:
+        for trade in group['trades']:
+            columns['group_id'].append(group['id'])
+            columns['group_tp_level'].append(_optional_float(group.get('tpLevel')))
+            columns['group_sl_level'].append(_optional_float(group.get('slLevel')))
+            columns['trade_id'].append(trade['id'])
+            columns['date'].append(trade.get('date') or None)
+            columns['pair'].append(trade['pair'])
+            columns['type'].append(trade['type'])
+            columns['result'].append(trade['result'])
+            columns['entry_price'].append(trade['entryPrice'])
+            columns['size'].append(trade['size'])
+            columns['tp_level'].append(trade.get('tpLevel'))
+            columns['sl_level'].append(trade.get('slLevel'))
+            columns['close_price'].append(trade.get('closePrice'))
+            columns['comment'].append(trade.get('comment') or '')
+    columns['date'] = pd.to_datetime(pd.Series(columns['date'], dtype=object), errors='coerce', format='ISO8601')
+    return pa.RecordBatch.from_arrays([pa.array(columns[field.name], type=field.type, from_pandas=True) for field in schema],
+                                      schema=schema)
+
+
+def export_columnar(db, settings, fmt='parquet', chunk=2000):
+    """The whole book as one row per trade in Parquet or Arrow IPC, written a chunk of groups at a time."""
+    if pa is None:
+        raise ImportError("pyarrow is required for Parquet/Arrow export")
+    schema = _arrow_schema().with_metadata({'trade_settings': json.dumps({key: settings[key] for key in SETTINGS_KEYS})})
+    sink = io.BytesIO()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(sink, schema)
+    with writer:
+        for groups in db.iter_groups(chunk=chunk):
+            writer.write_batch(_record_batch(groups, schema))
+    return sink.getvalue()
+
+
+def export_book(db, settings, fmt='json'):
+    if fmt == 'json':
+        return export_json(db, settings)
+    return export_columnar(db, settings, fmt)
+
+
+class _JsonStream:
+    # Just enough of an incremental JSON reader to walk the top-level object and decode
+    # one trade group at a time with raw_decode, refilling the buffer as it runs dry. A value
+    # longer than a chunk doubles the read each retry, so decoding it stays linear in its size
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        chunk = self.stream.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Malformed trade data: expected one of {chars!r} near offset {self.pos}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill(size)
+                size *= 2
+                continue
+            # A number ending exactly at the buffer edge may continue in the next chunk
+            if end == len(self.buf) and not self.eof:
+                self._fill(size)
+                size *= 2
+                continue
+            self.pos = end
+            return value
+
+
+class BookReader:
+    """Streams trade groups out of an uploaded JSON, Parquet or Arrow file.
+
+    `groups()` yields validated groups one at a time, newest first, so they can go straight
+    into TradeDB.import_groups. `settings` is complete once `groups()` is exhausted;
+    a JSON file may list them after the groups.
+    """
+
+    def __init__(self, stream, fmt='json', chunk_size=1 << 20):
+        self.stream = stream
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.settings = {}
+
+    @classmethod
+    def for_file(cls, uploaded_file):
+        name = uploaded_file.name.lower()
+        fmt = 'parquet' if name.endswith('.parquet') else 'arrow' if name.endswith(('.arrow', '.feather')) else 'json'
+        return cls(uploaded_file, fmt)
+
+    def groups(self):
+        raw = self._json_groups() if self.fmt == 'json' else self._columnar_groups()
+        for position, group in enumerate(raw):
+            yield validate_group(group, position)
+
+    def _json_groups(self):
+        text = io.TextIOWrapper(self.stream, encoding='utf-8') if not isinstance(self.stream, io.TextIOBase) else self.stream
+        reader = _JsonStream(text, self.chunk_size)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            if key == 'trade_groups':
+                reader.expect('[')
+                if reader.peek() == ']':
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield reader.value()
+                        if reader.expect(',]') == ']':
+                            break
+            elif key in SETTINGS_KEYS:
+                self.settings[key] = reader.value()
+            else:
+                reader.value()
+            if reader.expect(',}') == '}':
+                return
+
+    def _columnar_groups(self):
+        if pa is None:
+            raise ImportError("pyarrow is required for Parquet/Arrow import")
+        if self.fmt == 'parquet':
+            parquet = pq.ParquetFile(self.stream)
+            schema = parquet.schema_arrow
+            batches = parquet.iter_batches(batch_size=65536)
+        else:
+            ipc = pa.ipc.open_file(self.stream)
+            schema = ipc.schema
+            batches = (ipc.get_batch(i) for i in range(ipc.num_record_batches))
+        missing = [name for name in _arrow_schema().names if name not in schema.names]
+        if missing:
+            raise ValueError(f"Trade data is missing columns: {', '.join(missing)}")
+        metadata = schema.metadata or {}
+        if b'trade_settings' in metadata:
+            self.settings.update(json.loads(metadata[b'trade_settings']))
+
+        group = None
+        for batch in batches:
+            columns = {name: batch.column(name).to_pylist() for name in _arrow_schema().names}
+            for i in range(batch.num_rows):
+                if group is None or columns['group_id'][i] != group['id']:
+                    if group is not None:
+                        yield group
+                    group = {'id': columns['group_id'][i], 'tpLevel': columns['group_tp_level'][i],
+                             'slLevel': columns['group_sl_level'][i], 'trades': []}
+                date = columns['date'][i]
+                trade = {
+                    'id': columns['trade_id'][i],
+                    'date': str(pd.Timestamp(date)) if date is not None else '',
+                    'type': columns['type'][i],
+                    'pair': columns['pair'][i],
+                    'entryPrice': columns['entry_price'][i],
+                    'size': columns['size'][i],
+                    'tpLevel': columns['tp_level'][i],
+                    'slLevel': columns['sl_level'][i],
+                    'result': columns['result'][i],
+                    'comment': columns['comment'][i],
+                }
+                if columns['close_price'][i] is not None:
+                    trade['closePrice'] = columns['close_price'][i]
+                group['trades'].append(trade)
+        if group is not None:
+            yield group
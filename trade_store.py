@@ -0,0 +1,382 @@
+import bisect
+import uuid
+import numpy as np
+import pandas as pd
+
+# One row per trade ever added; deleted rows are tombstoned (live=False) and reclaimed by compaction
+TRADE_DTYPE = np.dtype([
+    ('group', 'i4'),
+    ('pair', 'i2'),
+    ('direction', 'i1'),
+    ('result', 'i1'),
+    ('live', '?'),
+    ('date', 'M8[ns]'),
+    ('entry', 'f8'),
+    ('size', 'f8'),
+    ('close', 'f8'),
+    ('tp', 'f8'),
+    ('sl', 'f8'),
+])
+TYPES = ('Long', 'Short')
+RESULTS = ('Open', 'Closed')
+# Group dict keys the store owns; everything else on a group is the caller's
+INTERNAL_GROUP_KEYS = ('code', 'slots', 'agg', 'seq')
+
+
+def _direction(trade_type):
+    return 1 if trade_type == 'Long' else -1
+
+
+def _date_ns(value):
+    try:
+        return pd.Timestamp(value).to_datetime64().astype('M8[ns]')
+    except (TypeError, ValueError):
+        return np.datetime64('NaT', 'ns')
+
+
+class TradeStore:
+    """Columnar store for trade groups, replacing the list-of-dicts in the dashboard session.
+
+    Trades are rows of a structured array with the pair/type/result columns stored as codes,
+    so PnL and group statistics are computed straight from typed columns. Trade ids and group
+    ids are hashed to their row / group, which makes add, modify and delete O(1). Each group
+    keeps its rows in an insertion-ordered dict, so a group's trades stay in the order they
+    were entered. Groups are listed newest first (highest `seq`), like the dashboard always
+    showed them.
+
+    With `db` (a trade_db.TradeDB) every mutation is written through. Groups can also be
+    loaded from the database and unloaded again without touching it, so only the part of
+    the book being looked at has to be in memory.
+    """
+
+    def __init__(self, capacity=1024, pairs=(), db=None):
+        self.rows = np.zeros(capacity, dtype=TRADE_DTYPE)
+        self.n = 0
+        self.n_live = 0
+        self.ids = []
+        self.comments = []
+        self.index = {}
+        self.pairs = list(pairs)
+        self._pair_codes = {pair: code for code, pair in enumerate(self.pairs)}
+        self.groups = {}
+        self.group_ids = []
+        self._display = []
+        self._display_keys = []
+        self._next_seq = 1
+        self.db = db
+        self.version = 0
+        self._columns = None
+
+    def __len__(self):
+        return self.n_live
+
+    def __contains__(self, trade_id):
+        return trade_id in self.index
+
+    def _touch(self):
+        self.version += 1
+        self._columns = None
+
+    def _pair_code(self, pair):
+        code = self._pair_codes.get(pair)
+        if code is None:
+            code = self._pair_codes[pair] = len(self.pairs)
+            self.pairs.append(pair)
+        return code
+
+    def _write(self, slot, trade):
+        row = self.rows[slot:slot + 1]
+        row['pair'] = self._pair_code(trade['pair'])
+        row['direction'] = _direction(trade['type'])
+        row['result'] = RESULTS.index(trade.get('result', 'Open'))
+        row['date'] = _date_ns(trade.get('date'))
+        row['entry'] = float(trade['entryPrice'])
+        row['size'] = float(trade['size'])
+        row['close'] = float(trade['closePrice']) if trade.get('result') == 'Closed' else np.nan
+        row['tp'] = float(trade['tpLevel']) if trade.get('tpLevel') is not None else np.nan
+        row['sl'] = float(trade['slLevel']) if trade.get('slLevel') is not None else np.nan
+        self.comments[slot] = trade.get('comment', '')
+
+    def _grow(self):
+        rows = np.zeros(2 * len(self.rows), dtype=TRADE_DTYPE)
+        rows[:self.n] = self.rows[:self.n]
+        self.rows = rows
+
+    def add_group(self, trade, group_id=None, seq=None, persist=True, **fields):
+        """Starts a new group, shown first, with `trade` as its first trade. Returns the group.
+
+        `seq` orders groups for display; a new group gets the next one (from the database
+        when persisting), a group loaded from the database keeps its own. The group row and
+        its first trade are written in one transaction.
+        """
+        group_id = group_id or str(uuid.uuid4())
+        if group_id in self.groups:
+            raise KeyError(f"Duplicate group id {group_id!r}")
+        if persist and self.db is not None:
+            with self.db.transaction():
+                seq = self.db.add_group(group_id, fields)
+                try:
+                    return self._add_group(trade, group_id, seq, persist, fields)
+                except Exception:
+                    # The database rolls back; don't keep a group it never got
+                    if group_id in self.groups:
+                        self._remove_group(group_id)
+                    raise
+        return self._add_group(trade, group_id, seq, persist, fields)
+
+    def _add_group(self, trade, group_id, seq, persist, fields):
+        if seq is None:
+            seq = self._next_seq
+        self._next_seq = max(self._next_seq, seq + 1)
+        group = dict(fields, id=group_id, code=len(self.group_ids), slots={}, seq=seq)
+        self.groups[group_id] = group
+        self.group_ids.append(group_id)
+        position = bisect.bisect_left(self._display_keys, -seq)
+        self._display.insert(position, group['code'])
+        self._display_keys.insert(position, -seq)
+        if trade is not None:
+            self.add_trade(group_id, trade, persist=persist)
+        self._touch()
+        return group
+
+    def add_trade(self, group_id, trade, persist=True):
+        """Appends a trade (a dashboard trade dict) to a group and returns its id."""
+        group = self.groups[group_id]
+        trade_id = trade.get('id') or str(uuid.uuid4())
+        if trade_id in self.index:
+            raise KeyError(f"Duplicate trade id {trade_id!r}")
+        if self.n == len(self.rows):
+            self._grow()
+        slot = self.n
+        self.n += 1
+        self.ids.append(trade_id)
+        self.comments.append('')
+        self._write(slot, trade)
+        self.rows['group'][slot] = group['code']
+        self.rows['live'][slot] = True
+        self.index[trade_id] = slot
+        group['slots'][slot] = None
+        self.n_live += 1
+        if persist and self.db is not None:
+            self.db.upsert_trades(group_id, [self._trade_at(slot)])
+        self._touch()
+        return trade_id
+
+    def modify_trade(self, trade_id, **changes):
+        """Updates fields of a trade, using the dashboard's trade dict keys."""
+        slot = self.index[trade_id]
+        trade = self._trade_at(slot)
+        trade.update(changes)
+        self._write(slot, trade)
+        if self.db is not None:
+            self.db.upsert_trades(self.group_ids[self.rows['group'][slot]], [self._trade_at(slot)])
+        self._touch()
+
+    def delete_trade(self, trade_id):
+        """Removes a trade; a group left without trades is removed with it."""
+        slot = self.index.pop(trade_id)
+        group = self.groups[self.group_ids[self.rows['group'][slot]]]
+        del group['slots'][slot]
+        self.rows['live'][slot] = False
+        self.ids[slot] = None
+        self.comments[slot] = None
+        self.n_live -= 1
+        if self.db is not None:
+            self.db.delete_trade(trade_id)
+        if not group['slots']:
+            self._remove_group(group['id'])
+        if self.n > 1024 and self.n_live < self.n // 2:
+            self.compact()
+        self._touch()
+
+    def delete_group(self, group_id):
+        if self.db is not None:
+            self.db.delete_group(group_id)
+        self._remove_group(group_id)
+
+    def unload_group(self, group_id):
+        """Drops a group from memory only; it stays in the database."""
+        self._remove_group(group_id)
+
+    def load(self, trade_groups):
+        """Adds groups read back from the database (with their `seq`) that aren't loaded yet."""
+        for group in trade_groups:
+            if group['id'] in self.groups or not group['trades']:
+                continue
+            fields = {key: value for key, value in group.items() if key not in INTERNAL_GROUP_KEYS + ('trades', 'id')}
+            self.add_group(group['trades'][0], group_id=group['id'], seq=group.get('seq'), persist=False, **fields)
+            for trade in group['trades'][1:]:
+                self.add_trade(group['id'], trade, persist=False)
+
+    def _remove_group(self, group_id):
+        group = self.groups.pop(group_id)
+        for slot in group['slots']:
+            del self.index[self.ids[slot]]
+            self.rows['live'][slot] = False
+            self.ids[slot] = None
+            self.comments[slot] = None
+        self.n_live -= len(group['slots'])
+        self.group_ids[group['code']] = None
+        position = bisect.bisect_left(self._display_keys, -group['seq'])
+        del self._display[position]
+        del self._display_keys[position]
+        self._touch()
+
+    def close_group(self, group_id, close_price):
+        """Closes every open trade of a group at `close_price`; returns the ids it closed."""
+        slots = self.group_slots(group_id)
+        rows = self.rows
+        to_close = slots[rows['result'][slots] == RESULTS.index('Open')]
+        rows['result'][to_close] = RESULTS.index('Closed')
+        rows['close'][to_close] = float(close_price)
+        if self.db is not None:
+            self.db.upsert_trades(group_id, [self._trade_at(slot) for slot in to_close.tolist()])
+        self._touch()
+        return [self.ids[slot] for slot in to_close.tolist()]
+
+    def compact(self):
+        # Drops tombstoned rows, keeping the order of the survivors (and so of each group's trades)
+        live = np.flatnonzero(self.rows['live'][:self.n])
+        new_slot = np.full(self.n, -1, dtype=np.int64)
+        new_slot[live] = np.arange(len(live))
+        rows = np.zeros(max(1024, 2 * len(live)), dtype=TRADE_DTYPE)
+        rows[:len(live)] = self.rows[live]
+        self.rows = rows
+        self.ids = [self.ids[slot] for slot in live.tolist()]
+        self.comments = [self.comments[slot] for slot in live.tolist()]
+        self.index = {trade_id: slot for slot, trade_id in enumerate(self.ids)}
+        for group in self.groups.values():
+            group['slots'] = dict.fromkeys(new_slot[list(group['slots'])].tolist())
+        self.n = len(live)
+        self._touch()
+
+    def group(self, group_id):
+        return self.groups[group_id]
+
+    def group_of(self, trade_id):
+        return self.groups[self.group_ids[self.rows['group'][self.index[trade_id]]]]
+
+    def group_list(self):
+        """Group dicts in display order, newest first."""
+        return [self.groups[self.group_ids[code]] for code in self._display]
+
+    def has_open(self, group_id):
+        return bool((self.rows['result'][self.group_slots(group_id)] == RESULTS.index('Open')).any())
+
+    def group_slots(self, group_id):
+        return np.fromiter(self.groups[group_id]['slots'], dtype=np.int64, count=len(self.groups[group_id]['slots']))
+
+    def group_trades(self, group_id):
+        """Trade dicts of a group in entry order, materialized from the columns."""
+        return [self._trade_at(slot) for slot in self.groups[group_id]['slots']]
+
+    def first_trade(self, group_id):
+        slots = self.groups[group_id]['slots']
+        return self._trade_at(next(iter(slots))) if slots else None
+
+    def group_opened(self, group_id):
+        """Earliest trade date of a group, as text; '' if it has none or a trade without a date, as MIN(date) in TradeDB."""
+        dates = self.rows['date'][self.group_slots(group_id)]
+        if not len(dates) or np.isnat(dates).any():
+            return ''
+        return str(pd.Timestamp(dates.min()))
+
+    def trade(self, trade_id):
+        return self._trade_at(self.index[trade_id])
+
+    def _trade_at(self, slot):
+        row = self.rows[slot]
+        result = RESULTS[row['result']]
+        trade = {
+            'id': self.ids[slot],
+            'date': str(pd.Timestamp(row['date'])) if not np.isnat(row['date']) else '',
+            'type': TYPES[0] if row['direction'] > 0 else TYPES[1],
+            'pair': self.pairs[row['pair']],
+            'entryPrice': float(row['entry']),
+            'size': float(row['size']),
+            'tpLevel': float(row['tp']),
+            'slLevel': float(row['sl']),
+            'result': result,
+            'comment': self.comments[slot],
+        }
+        if result == 'Closed':
+            trade['closePrice'] = float(row['close'])
+        return trade
+
+    def columns(self):
+        """Live trades as the column dict pnl_engine.compute_book_pnl takes, cached per version.
+
+        Rows are in storage order, which keeps each group's trades in entry order; `group`
+        is the group's display position and `row_of_slot` maps a storage slot to its row.
+        """
+        if self._columns is not None:
+            return self._columns
+        rows = self.rows[:self.n]
+        slots = np.flatnonzero(rows['live'])
+        live = rows[slots]
+        position = np.full(len(self.group_ids), -1, dtype=np.int64)
+        position[self._display] = np.arange(len(self._display))
+        row_of_slot = np.full(self.n, -1, dtype=np.int64)
+        row_of_slot[slots] = np.arange(len(slots))
+        initial_direction = np.array(
+            [float(self.rows['direction'][next(iter(self.groups[self.group_ids[code]]['slots']))])
+             for code in self._display], dtype=float)
+        self._columns = {
+            'slot': slots,
+            'row_of_slot': row_of_slot,
+            'group': position[live['group']],
+            'pair': live['pair'].astype(np.int64),
+            'entry': live['entry'],
+            'size': live['size'],
+            'direction': live['direction'].astype(float),
+            'is_open': live['result'] == RESULTS.index('Open'),
+            'close': live['close'],
+            'initial_direction': initial_direction,
+            'n_groups': len(self._display),
+        }
+        return self._columns
+
+    def frame(self):
+        """Live trades as a DataFrame with categorical pair/type/result and datetime64 dates."""
+        rows = self.rows[:self.n]
+        slots = np.flatnonzero(rows['live'])
+        live = rows[slots]
+        return pd.DataFrame({
+            'trade_id': [self.ids[slot] for slot in slots.tolist()],
+            'group_id': pd.Categorical.from_codes(live['group'], categories=[
+                group_id if group_id is not None else f"<deleted {code}>" for code, group_id in enumerate(self.group_ids)]),
+            'date': live['date'],
+            'pair': pd.Categorical.from_codes(live['pair'], categories=self.pairs),
+            'type': pd.Categorical.from_codes((live['direction'] < 0).astype(np.int8), categories=TYPES),
+            'result': pd.Categorical.from_codes(live['result'], categories=RESULTS),
+            'entry_price': live['entry'],
+            'size': live['size'],
+            'close_price': live['close'],
+            'tp_level': live['tp'],
+            'sl_level': live['sl'],
+            'comment': [self.comments[slot] for slot in slots.tolist()],
+        })
+
+    def to_groups(self):
+        """The trade_groups list-of-dicts layout used by the JSON export."""
+        groups = []
+        for group in self.group_list():
+            exported = {key: value for key, value in group.items() if key not in INTERNAL_GROUP_KEYS}
+            exported['trades'] = self.group_trades(group['id'])
+            groups.append(exported)
+        return groups
+
+    @classmethod
+    def from_groups(cls, trade_groups, pairs=()):
+        total = sum(len(group['trades']) for group in trade_groups)
+        store = cls(capacity=max(1024, total), pairs=pairs)
+        # The list is newest first; add oldest first so the display order comes out the same
+        for group in reversed(trade_groups):
+            trades = group['trades']
+            if not trades:
+                continue
+            fields = {key: value for key, value in group.items() if key not in INTERNAL_GROUP_KEYS + ('trades', 'id')}
+            added = store.add_group(trades[0], group_id=group.get('id'), persist=False, **fields)
+            for trade in trades[1:]:
+                store.add_trade(added['id'], trade, persist=False)
+        return store